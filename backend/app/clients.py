@@ -0,0 +1,154 @@
+import os
+import threading
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from .config import HTTP_POOL_MAX_CONNECTIONS, HTTP_POOL_MAX_KEEPALIVE, HTTP_KEEPALIVE_EXPIRY, EMBEDDING_MODEL
+from .config import OPENAI_CHAT_MODEL, GEMINI_MODEL, LLM_SCHEDULER_ENABLED, LLM_CALL_TIMEOUT
+from .utils.tracing import llm_metrics
+
+
+class ClientRegistry:
+    """
+    Process-wide home for the LLM, embedding and Qdrant clients.
+
+    Every client is built once, on first use or in `startup()`, and then shared; the OpenAI and
+    Qdrant clients all run over pooled keep-alive httpx sessions. `stats()` reports how often each
+    client was reused and how many requests each HTTP pool has served.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._clients = {}
+        self._usage = {}
+        self._http_requests = {}
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=HTTP_POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        )
+
+    def _count_request(self, pool):
+        self._http_requests[pool] = self._http_requests.get(pool, 0) + 1
+
+    def _http_client(self, pool):
+        def hook(request):
+            self._count_request(pool)
+        return httpx.Client(limits=self._limits(), timeout=60.0, event_hooks={"request": [hook]})
+
+    def _async_http_client(self, pool):
+        async def hook(request):
+            self._count_request(pool)
+        return httpx.AsyncClient(limits=self._limits(), timeout=60.0, event_hooks={"request": [hook]})
+
+    @staticmethod
+    def _sdk_retries(default):
+        # With the LLM scheduler on, it owns retries and backoff; SDK retries would multiply them.
+        return 0 if LLM_SCHEDULER_ENABLED else default
+
+    def get(self, name, factory):
+        with self._lock:
+            usage = self._usage.setdefault(name, {"created": 0, "reused": 0})
+            if name in self._clients:
+                usage["reused"] += 1
+            else:
+                self._clients[name] = factory()
+                usage["created"] += 1
+            return self._clients[name]
+
+    def http_client(self):
+        return self.get("http.openai", lambda: self._http_client("openai"))
+
+    def async_http_client(self):
+        return self.get("http.openai.async", lambda: self._async_http_client("openai.async"))
+
+    def chat_openai(self, model=OPENAI_CHAT_MODEL, temperature=0):
+        return self.get(f"openai.chat.{model}.{temperature}", lambda: ChatOpenAI(
+            model=model,
+            temperature=temperature,
+            http_client=self.http_client(),
+            http_async_client=self.async_http_client(),
+            callbacks=[llm_metrics],
+            timeout=LLM_CALL_TIMEOUT,
+            max_retries=self._sdk_retries(2),
+        ))
+
+    def embeddings(self, model=EMBEDDING_MODEL):
+        return self.get(f"openai.embeddings.{model}", lambda: OpenAIEmbeddings(
+            model=model,
+            openai_api_key=os.getenv("OPENAI_API_KEY"),
+            http_client=self.http_client(),
+            http_async_client=self.async_http_client(),
+        ))
+
+    def gemini(self, model=GEMINI_MODEL):
+        return self.get(f"gemini.{model}", lambda: ChatGoogleGenerativeAI(
+            model=model,
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            callbacks=[llm_metrics],
+            timeout=LLM_CALL_TIMEOUT,
+            max_retries=self._sdk_retries(6),
+        ))
+
+    def qdrant(self):
+        return self.get("qdrant", lambda: QdrantClient(
+            url=os.getenv("QDRANT_URL"),
+            api_key=os.getenv("QDRANT_API_KEY"),
+            prefer_grpc=False,
+            timeout=30,
+            limits=self._limits(),
+            event_hooks={"request": [lambda request: self._count_request("qdrant")]},
+        ))
+
+    def async_qdrant(self):
+        async def hook(request):
+            self._count_request("qdrant.async")
+
+        return self.get("qdrant.async", lambda: AsyncQdrantClient(
+            url=os.getenv("QDRANT_URL"),
+            api_key=os.getenv("QDRANT_API_KEY"),
+            prefer_grpc=False,
+            timeout=30,
+            limits=self._limits(),
+            event_hooks={"request": [hook]},
+        ))
+
+    def startup(self):
+        self.chat_openai()
+        self.embeddings()
+        self.gemini()
+        self.qdrant()
+        self.async_qdrant()
+
+    async def aclose(self):
+        with self._lock:
+            clients = self._clients
+            self._clients = {}
+        for name, client in clients.items():
+            try:
+                if isinstance(client, httpx.AsyncClient):
+                    await client.aclose()
+                elif isinstance(client, AsyncQdrantClient):
+                    await client.close()
+                elif isinstance(client, (httpx.Client, QdrantClient)):
+                    client.close()
+            except Exception as e:
+                print(f"Error while closing client {name}: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "clients": {name: dict(usage) for name, usage in self._usage.items()},
+                "http_requests": dict(self._http_requests),
+                "pool_limits": {
+                    "max_connections": HTTP_POOL_MAX_CONNECTIONS,
+                    "max_keepalive_connections": HTTP_POOL_MAX_KEEPALIVE,
+                    "keepalive_expiry": HTTP_KEEPALIVE_EXPIRY,
+                },
+            }
+
+
+registry = ClientRegistry()
@@ -0,0 +1,148 @@
+import os
+
+# Upper bound on LLM requests in flight for a single hadith validation.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "5"))
+
+# Seconds a single LLM request attempt may take before it is abandoned (and retried by the
+# scheduler); the wait for rate-limit capacity and the backoff between attempts do not count.
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "30"))
+
+# "per_ayah" sends one filter and one classification prompt per ayah;
+# "batched" scores and classifies all retrieved ayahs in a single structured-output call;
+# "early_exit" works through the ayahs best-first in waves of EARLY_EXIT_WAVE_SIZE and stops as
+# soon as EARLY_EXIT_MIN_AGREEING ayahs share a label with none against it, skipping the verdict call.
+VALIDATION_MODE = os.getenv("VALIDATION_MODE", "per_ayah")
+EARLY_EXIT_WAVE_SIZE = int(os.getenv("EARLY_EXIT_WAVE_SIZE", "3"))
+EARLY_EXIT_MIN_AGREEING = int(os.getenv("EARLY_EXIT_MIN_AGREEING", "2"))
+
+# Minimum 1-10 relevance score an ayah needs before it is classified.
+AYAH_SCORE_THRESHOLD = int(os.getenv("AYAH_SCORE_THRESHOLD", "7"))
+
+# Shared keep-alive HTTP pools used by the OpenAI and Qdrant clients.
+HTTP_POOL_MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "20"))
+HTTP_POOL_MAX_KEEPALIVE = int(os.getenv("HTTP_POOL_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# Upper bound on the estimated parameter memory held by cached NER pipelines.
+NER_CACHE_MAX_BYTES = int(os.getenv("NER_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Comma-separated NER models ("dslim", "camel") to load at startup instead of on first request.
+NER_WARMUP = [name.strip() for name in os.getenv("NER_WARMUP", "").split(",") if name.strip()]
+
+# Number of narrator phrases per padded forward pass of the CAMeL-Lab NER model.
+NER_BATCH_SIZE = int(os.getenv("NER_BATCH_SIZE", "16"))
+
+# SQLite (WAL mode) file holding the narrator-extraction results.
+RESULTS_DB_PATH = os.getenv("RESULTS_DB_PATH", "results.db")
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+
+# Embedding cache: in-process LRU tier plus an optional SQLite tier (disabled when the path is empty).
+# A TTL of 0 keeps entries until they are evicted by size.
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "2048"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", "0"))
+EMBEDDING_CACHE_DISK_PATH = os.getenv("EMBEDDING_CACHE_DISK_PATH", "")
+EMBEDDING_CACHE_DISK_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", "100000"))
+
+# End-to-end result cache for /api/quran/search: "memory", "redis" or "fakeredis" (in-process, for tests).
+# Entries are fresh for RESULT_CACHE_TTL seconds, then served stale for up to RESULT_CACHE_STALE_TTL
+# more seconds while they are recomputed in the background.
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_BACKEND = os.getenv("RESULT_CACHE_BACKEND", "memory")
+RESULT_CACHE_REDIS_URL = os.getenv("RESULT_CACHE_REDIS_URL", "redis://localhost:6379/0")
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "10000"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "86400"))
+RESULT_CACHE_STALE_TTL = float(os.getenv("RESULT_CACHE_STALE_TTL", "604800"))
+
+OPENAI_CHAT_MODEL = os.getenv("OPENAI_CHAT_MODEL", "gpt-3.5-turbo")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+
+# On-disk memo of per-(hadith, ayah) LLM scores and labels; an empty path disables it.
+JUDGEMENT_CACHE_PATH = os.getenv("JUDGEMENT_CACHE_PATH", "judgements.db")
+JUDGEMENT_CACHE_MAX_ENTRIES = int(os.getenv("JUDGEMENT_CACHE_MAX_ENTRIES", "200000"))
+
+QDRANT_COLLECTION = os.getenv("QDRANT_COLLECTION", "quran_embeddings")
+
+# "qdrant" searches the hosted collection; "local" searches a snapshot exported with
+# `python -m app.utils.local_index` into LOCAL_INDEX_PATH.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "quran_index")
+
+# Texts per embed_documents request when embedding a batch of hadiths.
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# "vector" ranks ayahs by embedding similarity only; "hybrid" fuses it with a local BM25 index
+# (built from the LOCAL_INDEX_PATH snapshot) using reciprocal-rank fusion. RETRIEVAL_LIMIT ayahs
+# are passed on to the LLM stages, out of RETRIEVAL_CANDIDATES taken from each ranking.
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "vector")
+RETRIEVAL_LIMIT = int(os.getenv("RETRIEVAL_LIMIT", "15"))
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "50"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+# Local pre-filter in front of the LLM relevance stage. Ayahs below PREFILTER_MIN_SCORE vector
+# similarity are dropped; PREFILTER_RERANKER names an optional sentence-transformers cross-encoder
+# (e.g. "cross-encoder/ms-marco-MiniLM-L-6-v2") that re-orders the rest on CPU. At most
+# PREFILTER_MAX_CANDIDATES go to the LLM; with PREFILTER_ADAPTIVE the list is also cut at the
+# largest score gap, keeping at least PREFILTER_MIN_CANDIDATES.
+PREFILTER_MIN_SCORE = float(os.getenv("PREFILTER_MIN_SCORE", "0"))
+PREFILTER_RERANKER = os.getenv("PREFILTER_RERANKER", "")
+PREFILTER_RERANK_BATCH_SIZE = int(os.getenv("PREFILTER_RERANK_BATCH_SIZE", "32"))
+PREFILTER_MAX_CANDIDATES = int(os.getenv("PREFILTER_MAX_CANDIDATES", "15"))
+PREFILTER_MIN_CANDIDATES = int(os.getenv("PREFILTER_MIN_CANDIDATES", "3"))
+PREFILTER_ADAPTIVE = os.getenv("PREFILTER_ADAPTIVE", "false").lower() == "true"
+
+# Optional OpenTelemetry export of pipeline spans: "" (off), "console", "otlp" (OTLP/HTTP, endpoint
+# from the standard OTEL_EXPORTER_OTLP_* variables) or "memory" (kept in-process, for tests).
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "hadith-validation")
+
+# Prompt compaction. Hadith text sent to the per-ayah prompts is cut to PROMPT_HADITH_MAX_TOKENS,
+# each ayah translation to PROMPT_AYAH_MAX_TOKENS, and the verdict prompt's ayah lists share
+# PROMPT_VERDICT_AYAH_BUDGET tokens. PROMPT_ARABIC controls the Arabic ayah text in the verdict
+# prompt: "full", "stripped" (harakat removed) or "none".
+PROMPT_COMPACTION = os.getenv("PROMPT_COMPACTION", "true").lower() == "true"
+PROMPT_HADITH_MAX_TOKENS = int(os.getenv("PROMPT_HADITH_MAX_TOKENS", "512"))
+PROMPT_AYAH_MAX_TOKENS = int(os.getenv("PROMPT_AYAH_MAX_TOKENS", "160"))
+PROMPT_VERDICT_AYAH_BUDGET = int(os.getenv("PROMPT_VERDICT_AYAH_BUDGET", "2000"))
+PROMPT_ARABIC = os.getenv("PROMPT_ARABIC", "stripped")
+
+# Process-wide LLM scheduler. Requests- and tokens-per-minute budgets per provider, overridable
+# per model with LLM_RATE_LIMITS="gpt-4o-mini=500/200000,gemini-2.5-pro=150/2000000"
+# (0 means unlimited). Retryable errors (429, 5xx, timeouts) are retried up to LLM_MAX_RETRIES
+# times with full-jitter exponential backoff; LLM_BREAKER_THRESHOLD consecutive such failures
+# open the circuit for LLM_BREAKER_RESET seconds. Bulk traffic may not use the last
+# LLM_BULK_RESERVE fraction of a bucket, which is kept for interactive requests.
+LLM_SCHEDULER_ENABLED = os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "150"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "2000000"))
+LLM_RATE_LIMITS = os.getenv("LLM_RATE_LIMITS", "")
+LLM_EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", "256"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+LLM_BULK_RESERVE = float(os.getenv("LLM_BULK_RESERVE", "0.2"))
+
+# Micro-batching of NER inference across concurrent requests. Inputs are collected for up to
+# NER_MICROBATCH_WINDOW_MS after the first one arrives, or until NER_MICROBATCH_MAX_SIZE are
+# waiting, and then run as one batched forward pass. A window of 0 runs every call on its own.
+NER_MICROBATCH_WINDOW_MS = float(os.getenv("NER_MICROBATCH_WINDOW_MS", "10"))
+NER_MICROBATCH_MAX_SIZE = int(os.getenv("NER_MICROBATCH_MAX_SIZE", "32"))
+
+# Rule-based isnad extraction. Chains the parser is at least ISNAD_MIN_CONFIDENCE sure of are
+# used as they are; otherwise NER runs on the uncertain names and, where a hadith's content is
+# also needed (validation), the LLM is called as a last resort. ISNAD_FAST_PATH=false always
+# uses the LLM for validation.
+ISNAD_FAST_PATH = os.getenv("ISNAD_FAST_PATH", "true").lower() == "true"
+ISNAD_MIN_CONFIDENCE = float(os.getenv("ISNAD_MIN_CONFIDENCE", "0.8"))
+
+# Narrator gazetteer: a JSON list of {"id", "name_en", "name_ar", "aliases"} that extracted names
+# are resolved against. Names within GAZETTEER_MAX_DISTANCE edits of a known one (after
+# normalisation; fewer for short names) resolve to it. The default is the seed list shipped
+# with the app; point GAZETTEER_PATH at a full rijal list to extend it.
+GAZETTEER_ENABLED = os.getenv("GAZETTEER_ENABLED", "true").lower() == "true"
+GAZETTEER_PATH = os.getenv("GAZETTEER_PATH", os.path.join(os.path.dirname(__file__), "data", "narrators.json"))
+GAZETTEER_MAX_DISTANCE = int(os.getenv("GAZETTEER_MAX_DISTANCE", "2"))
@@ -1,9 +1,35 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 from .routes.quran import router as quran_router
 from .routes.extraction import router as extraction_router
+from .clients import registry
+from .rag.open_source_models import MODEL_CACHE, NER_BATCHERS
+from .utils.results_store import get_results_store
+from .utils.embedding_cache import embedding_cache
+from .services.result_cache import result_cache
+from .rag.judgement_cache import judgement_cache
+from .rag.prefilter import prefilter_stats
+from .utils.llm_scheduler import scheduler, LLMUnavailableError
+from .utils.narrator_gazetteer import get_gazetteer
+from .utils.metrics import metrics
+from .config import NER_WARMUP, LLM_BREAKER_RESET
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    registry.startup()
+    await asyncio.to_thread(get_results_store)
+    # NER warm-up runs in the background so the search endpoint can serve straight away;
+    # /ready reports when it has finished.
+    app.state.ner_warmup = asyncio.create_task(asyncio.to_thread(MODEL_CACHE.warmup, NER_WARMUP))
+    yield
+    await registry.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,8 +43,86 @@ app.include_router(quran_router, prefix="/api/quran", tags=["Quran Search"])
 app.include_router(extraction_router, prefix="/api/extraction", tags=["Hadith & Narators Extraction"])
 
 
+@app.exception_handler(LLMUnavailableError)
+async def llm_unavailable(request: Request, error: LLMUnavailableError):
+    # The provider is down or throttling us; a verdict without its calls would be meaningless.
+    return JSONResponse(status_code=503, headers={"Retry-After": str(int(LLM_BREAKER_RESET))},
+                        content={"detail": str(error)})
+
+
+@app.get("/clients/stats", tags=["Health"])
+def client_stats():
+    return registry.stats()
+
+
+@app.get("/cache/stats", tags=["Health"])
+def cache_stats():
+    return {"embeddings": embedding_cache.stats(), "judgements": judgement_cache.stats(), **result_cache.stats()}
+
+
+metrics.gauge(
+    "hadith_cache_events", "Cumulative counters of the embedding, judgement and result caches.",
+    ["cache", "event"],
+    lambda: {
+        **{("embeddings", k): v for k, v in embedding_cache.stats().items() if k != "hit_rate"},
+        **{("judgements", k): v for k, v in judgement_cache.stats().items() if k != "hit_rate"},
+        **{(f"result.{stage}", k): v for stage, counters in result_cache.stats().items()
+           for k, v in counters.items() if k != "hit_rate"},
+    },
+)
+metrics.gauge(
+    "hadith_prefilter_ayahs", "Ayahs entering and leaving each pre-filter tier.", ["tier", "direction"],
+    lambda: {(tier, d): counts[d] for tier, counts in prefilter_stats().items() for d in ("in", "out")},
+)
+metrics.gauge(
+    "hadith_http_requests", "Requests sent through each pooled HTTP client.", ["pool"],
+    lambda: {(pool,): count for pool, count in registry.stats()["http_requests"].items()},
+)
+metrics.gauge(
+    "hadith_llm_circuit_open", "1 while the circuit of an LLM limiter is open or half-open.", ["limiter"],
+    lambda: {(key,): float(stats["circuit"] != "closed") for key, stats in scheduler.stats().items()},
+)
+
+
+@app.get("/metrics", tags=["Health"])
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/ready", tags=["Health"])
+def ready():
+    loaded = MODEL_CACHE.loaded()
+    warmup = getattr(app.state, "ner_warmup", None)
+    warming_up = warmup is not None and not warmup.done()
+    content = {
+        "status": "warming_up" if warming_up else "ready",
+        "models": {name: name in loaded for name in MODEL_CACHE.registered()},
+        "warmup": NER_WARMUP,
+    }
+    return JSONResponse(status_code=503 if warming_up else 200, content=content)
+
+
+@app.get("/models/stats", tags=["Health"])
+def model_stats():
+    return {**MODEL_CACHE.stats(), "batching": {name: b.stats() for name, b in NER_BATCHERS.items()}}
+
+
+@app.get("/prefilter/stats", tags=["Health"])
+def prefilter_stats_endpoint():
+    return prefilter_stats()
+
+
+@app.get("/gazetteer/stats", tags=["Health"])
+def gazetteer_stats():
+    return get_gazetteer().stats()
+
+
+@app.get("/scheduler/stats", tags=["Health"])
+def scheduler_stats():
+    return scheduler.stats()
+
+
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
 
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Union
 
 class AyahResult(BaseModel):
     score: float
@@ -16,9 +16,22 @@ class HadithResult(BaseModel):
     confidence: float
     supported: List[AyahResult]
     contradicted: List[AyahResult]
+    early_exit: bool = False
+    # Some ayah calls failed, so ayahs were dropped or fell back to "Weak Support"; not cached.
+    degraded: bool = False
 
 class QueryRequest(BaseModel):
     query: str
 
 class QueryResponse(BaseModel):
     results: HadithResult
+
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+
+class BatchQueryError(BaseModel):
+    error: str
+
+class BatchQueryResponse(BaseModel):
+    # One entry per query, in order: its response, or the error that stopped it.
+    responses: List[Union[QueryResponse, BatchQueryError]]
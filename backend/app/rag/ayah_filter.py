@@ -1,41 +1,106 @@
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import RegexParser
-from langchain_openai import ChatOpenAI
+from ..clients import registry
 from dotenv import load_dotenv
+from ..config import LLM_MAX_CONCURRENCY
+from ..utils.concurrency import map_bounded
+from .judgement_cache import judgement_cache, prompt_version, model_name
+from ..utils.tracing import traced
+from ..utils.llm_scheduler import scheduled, raise_if_unavailable, LLMUnavailableError
+from .prompt_budget import compact_hadith, compact_translation
 
 load_dotenv()
 
-def filter_relevant_ayahs(ayahs, hadith_text, llm=None, threshold=7):
-    if llm is None:
-        llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo" )
+prompt = PromptTemplate(
+    input_variables=["hadith", "ayah"],
+    template="""
+Only respond with a number from 1 to 10 for how closely the Quranic Ayah relates to the Hadith. Your answer must be formatted exactly like this: Score: <number>
 
-    prompt = PromptTemplate(
-        input_variables=["hadith", "ayah"],
-        template="""
 Hadith: "{hadith}"
 
 Quranic Ayah: "{ayah}"
 
-Only respond with a number from 1 to 10 for how closely this Ayah relates to the Hadith. Your answer must be formatted exactly like this: Score: <number>
 Score:
 """
-    )
+)
+
+parser = RegexParser(regex=r"(\d+)", output_keys=["score"])
+
+
+def ayah_to_text(ayah) -> str:
+    return f"{compact_translation(ayah.english_translation)} (Surah: {ayah.surah_name_english}, Ayah: {ayah.aya_number})"
 
-    parser = RegexParser(regex=r"(\d+)", output_keys=["score"])
 
-    chain = prompt | llm | parser
+@traced("filter")
+def filter_relevant_ayahs(ayahs, hadith_text, llm=None, threshold=7):
+    if llm is None:
+        llm = registry.chat_openai()
+
+    chain = prompt | scheduled(llm) | parser
+
+    hadith = compact_hadith(hadith_text)
+    version, model = prompt_version(prompt), model_name(llm)
+    scores = judgement_cache.get_many("score", hadith_text, ayahs, version, model)
+    new_scores = []
 
     filtered = []
     print("Total ayas before filtering : " , len(ayahs))
-    for ayah in ayahs:
-        ayah_text = f"{ayah.english_translation} (Surah: {ayah.surah_name_english}, Ayah: {ayah.aya_number})"
-        try:
-            result = chain.invoke({"hadith": hadith_text, "ayah": ayah_text})
-            score = int(result["score"])
-            if score >= threshold:
-                filtered.append(ayah)
-        except Exception as e:
-            print(f"Parsing error for ayah {ayah.aya_number}: {e}")
-            continue
+    for i, ayah in enumerate(ayahs):
+        if i not in scores:
+            ayah_text = ayah_to_text(ayah)
+            try:
+                result = chain.invoke({"hadith": hadith, "ayah": ayah_text})
+                scores[i] = int(result["score"])
+                new_scores.append((ayah, scores[i]))
+            except LLMUnavailableError:
+                raise
+            except Exception as e:
+                print(f"Parsing error for ayah {ayah.aya_number}: {e}")
+                continue
+        if scores[i] >= threshold:
+            filtered.append(ayah)
+    judgement_cache.put_many("score", hadith_text, new_scores, version, model)
     print("Number of filtered ayahs are : " , len(filtered))
     return filtered;
+
+
+@traced("filter")
+async def afilter_relevant_ayahs(ayahs, hadith_text, llm=None, threshold=7,
+                                 max_concurrency=LLM_MAX_CONCURRENCY, errors=None):
+    """
+    Async variant of `filter_relevant_ayahs` that scores up to `max_concurrency` ayahs at once.
+    The filtered list keeps the retrieval order of `ayahs`. Only pairs missing from the
+    judgement cache are sent to the model. Ayahs that could not be scored are left out and,
+    when `errors` is given, their exceptions are appended to it. LLMUnavailableError is raised.
+    """
+    if llm is None:
+        llm = registry.chat_openai()
+
+    chain = prompt | scheduled(llm) | parser
+    hadith = compact_hadith(hadith_text)
+
+    async def score(ayah):
+        result = await chain.ainvoke({"hadith": hadith, "ayah": ayah_to_text(ayah)})
+        return int(result["score"])
+
+    print("Total ayas before filtering : ", len(ayahs))
+    version, model = prompt_version(prompt), model_name(llm)
+    scores = await judgement_cache.aget_many("score", hadith_text, ayahs, version, model)
+    uncached = [i for i in range(len(ayahs)) if i not in scores]
+    results = await map_bounded(score, [ayahs[i] for i in uncached], max_concurrency)
+    raise_if_unavailable(results)
+
+    new_scores = []
+    for i, result in zip(uncached, results):
+        if isinstance(result, BaseException):
+            print(f"Parsing error for ayah {ayahs[i].aya_number}: {result!r}")
+            if errors is not None:
+                errors.append(result)
+            continue
+        scores[i] = result
+        new_scores.append((ayahs[i], result))
+    await judgement_cache.aput_many("score", hadith_text, new_scores, version, model)
+
+    filtered = [ayah for i, ayah in enumerate(ayahs) if i in scores and scores[i] >= threshold]
+    print("Number of filtered ayahs are : ", len(filtered))
+    return filtered
@@ -0,0 +1,164 @@
+import asyncio
+from langchain.prompts import PromptTemplate
+from langchain.output_parsers import PydanticOutputParser
+from ..clients import registry
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from .ayah_filter import ayah_to_text
+from .judgement_cache import judgement_cache, prompt_version, model_name
+from ..utils.metrics import RETRIES
+from ..utils.tracing import traced
+from ..utils.llm_scheduler import scheduled, LLMUnavailableError
+from .prompt_budget import compact_hadith
+from dotenv import load_dotenv
+
+load_dotenv()
+
+class AyahJudgement(BaseModel):
+    ayah_id: int = Field(description="The id shown in square brackets before the ayah")
+    score: int = Field(description="How closely the ayah relates to the Hadith, from 1 to 10")
+    classification: str = Field(description="One of: Supported, Weak Support, Contradicted")
+
+
+class AyahJudgementBatch(BaseModel):
+    judgements: List[AyahJudgement] = Field(description="Exactly one judgement for every ayah listed")
+
+
+parser = PydanticOutputParser(pydantic_object=AyahJudgementBatch)
+
+prompt = PromptTemplate(
+    template="""
+You are a scholar analyzing the relationship between a Hadith and several Quranic ayahs.
+
+For **every** ayah listed below, independently:
+
+1. Give a **score** from 1 to 10 for how closely the ayah relates to the Hadith.
+2. Assign exactly **one** classification:
+- **Supported** – The ayah clearly confirms or directly aligns with the message of the Hadith.
+- **Weak Support** – The ayah is somewhat related but does not directly or strongly support the Hadith.
+- **Contradicted** – The ayah clearly opposes, denies, or invalidates the message of the Hadith.
+
+Base your answers **strictly on the content** of the given ayahs and hadith. Do not rely on external sources or assumptions.
+
+Return one judgement per ayah, using the id in square brackets as `ayah_id`.
+
+Respond with:
+{format_instructions}
+
+Hadith:
+"{hadith}"
+
+Quranic Ayahs:
+{ayahs}
+""",
+    input_variables=["hadith", "ayahs"],
+    partial_variables={"format_instructions": parser.get_format_instructions()},
+)
+
+
+def _format_batch(ayahs, ids) -> str:
+    return "\n".join(f'[{i}] "{ayah_to_text(ayahs[i])}"' for i in ids)
+
+
+def _collect(ids, batch: AyahJudgementBatch) -> Optional[List[AyahJudgement]]:
+    """Returns the judgements for `ids` in order, or None when the reply does not cover every id."""
+    by_id = {j.ayah_id: j for j in batch.judgements if j.ayah_id in ids}
+    if len(by_id) != len(ids):
+        return None
+    return [by_id[i] for i in ids]
+
+
+def _cached(ayahs, hadith_text, llm):
+    version, model = prompt_version(prompt), model_name(llm)
+    cached = judgement_cache.get_many("judgement", hadith_text, ayahs, version, model)
+    judgements = {i: AyahJudgement(ayah_id=i, **value) for i, value in cached.items()}
+    uncached = [i for i in range(len(ayahs)) if i not in judgements]
+    return judgements, uncached
+
+
+def _merge(ayahs, hadith_text, llm, judgements, fresh) -> List[AyahJudgement]:
+    judgement_cache.put_many(
+        "judgement", hadith_text,
+        [(ayahs[j.ayah_id], {"score": j.score, "classification": j.classification}) for j in fresh],
+        prompt_version(prompt), model_name(llm),
+    )
+    judgements.update({j.ayah_id: j for j in fresh})
+    return [judgements[i] for i in sorted(judgements)]
+
+
+@traced("judge_batch")
+def judge_ayahs(ayahs, hadith_text, llm=None) -> List[AyahJudgement]:
+    """
+    Scores and classifies all `ayahs` against the hadith in a single structured-output call.
+
+    `ayah_id` in the returned judgements is the ayah's index in `ayahs`. When the reply cannot be
+    parsed or is missing ayahs, the batch is split in half and each half is retried; an ayah
+    that still fails on its own is left out, like a parsing error in `filter_relevant_ayahs`.
+    LLMUnavailableError is raised rather than split.
+    Ayahs with a cached judgement for this hadith are not sent to the model.
+    """
+    if llm is None:
+        llm = registry.chat_openai()
+
+    chain = prompt | scheduled(llm) | parser
+    hadith = compact_hadith(hadith_text)
+
+    def run(ids):
+        try:
+            batch = chain.invoke({"hadith": hadith, "ayahs": _format_batch(ayahs, ids)})
+            judgements = _collect(ids, batch)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Batch judgement error for ayah ids {ids}: {e}")
+            judgements = None
+        if judgements is not None:
+            return judgements
+        if len(ids) == 1:
+            return []
+        RETRIES.inc(operation="judge_batch_split")
+        middle = len(ids) // 2
+        return run(ids[:middle]) + run(ids[middle:])
+
+    judgements, uncached = _cached(ayahs, hadith_text, llm)
+    fresh = run(uncached) if uncached else []
+    return _merge(ayahs, hadith_text, llm, judgements, fresh)
+
+
+@traced("judge_batch")
+async def ajudge_ayahs(ayahs, hadith_text, llm=None, errors=None) -> List[AyahJudgement]:
+    """
+    Async variant of `judge_ayahs`; the two halves of a split batch are retried concurrently.
+    When `errors` is given, the last exception of each ayah left out is appended to it.
+    """
+    if llm is None:
+        llm = registry.chat_openai()
+
+    chain = prompt | scheduled(llm) | parser
+    hadith = compact_hadith(hadith_text)
+
+    async def run(ids):
+        error = None
+        try:
+            batch = await chain.ainvoke({"hadith": hadith, "ayahs": _format_batch(ayahs, ids)})
+            judgements = _collect(ids, batch)
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            print(f"Batch judgement error for ayah ids {ids}: {e}")
+            judgements, error = None, e
+        if judgements is not None:
+            return judgements
+        if len(ids) == 1:
+            if errors is not None:
+                errors.append(error or ValueError(f"No judgement returned for ayah id {ids[0]}"))
+            return []
+        RETRIES.inc(operation="judge_batch_split")
+        middle = len(ids) // 2
+        left, right = await asyncio.gather(run(ids[:middle]), run(ids[middle:]))
+        return left + right
+
+    # The judgement cache is SQLite; keep its I/O off the event loop.
+    judgements, uncached = await asyncio.to_thread(_cached, ayahs, hadith_text, llm)
+    fresh = await run(uncached) if uncached else []
+    return await asyncio.to_thread(_merge, ayahs, hadith_text, llm, judgements, fresh)
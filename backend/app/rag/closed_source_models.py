@@ -1,4 +1,6 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from ..clients import registry
+from ..utils.llm_scheduler import scheduled, LLMUnavailableError
+from ..config import GEMINI_MODEL
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel , Field
@@ -23,15 +25,14 @@ template = PromptTemplate(
     input_variables=['hadith_text']
 )
 def extract_narrators_chain_with_llm(hadith_text: str) -> List[str]:
-    llm = ChatGoogleGenerativeAI(model='gemini-2.5-pro',
-                                 google_api_key=os.getenv("GOOGLE_API_KEY"))
+    llm = registry.gemini()
 
     prompt = template.invoke({
         'hadith_text': hadith_text
     })
 
     try:
-        structured_output = llm.with_structured_output(HadithOuput)
+        structured_output = scheduled(llm.with_structured_output(HadithOuput), "gemini", GEMINI_MODEL)
         response = structured_output.invoke(prompt)
         content = response.hadith_content
         narators = response.narators_chain
@@ -50,5 +51,7 @@ def extract_narrators_chain_with_llm(hadith_text: str) -> List[str]:
         else:
             return [f"Unexpected narrators format: {type(narators)}"], content
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
         return [f"LLM extraction error: {str(e)}"], ""
@@ -1,10 +1,14 @@
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
+from ..clients import registry
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 from ..models.query import AyahResult
+from ..config import PROMPT_VERDICT_AYAH_BUDGET
+from . import prompt_budget
+from ..utils.tracing import traced
+from ..utils.llm_scheduler import scheduled
 
 load_dotenv()
 
@@ -28,6 +32,9 @@ Follow these strict rules for validation:
 
 Do **not** rely on any external knowledge or assumptions. Your decision must be based strictly on the ayahs given.
 
+Respond with:
+{format_instructions}
+
 Hadith:
 "{hadith}"
 
@@ -36,9 +43,6 @@ Supported Ayahs:
 
 Contradicted Ayahs:
 {contradicted_text}
-
-Respond with:
-{format_instructions}
 """
 
 prompt = PromptTemplate(
@@ -55,29 +59,60 @@ Respond in **only** this JSON format:
 )
 
 
-def format_ayahs(ayahs: List[AyahResult]) -> str:
-    if not ayahs:
-        return "None"
-    return "\n\n".join([
-        f"""→ Score: {a.score:.2f}
-- English: "{a.english_translation}"
-- Arabic: {a.arabic_diacritics}
-- Surah: {a.surah_name_english}, Ayah: {a.aya_number}"""
-        for a in ayahs
-    ])
+def format_ayah(a: AyahResult) -> str:
+    lines = [f"→ Score: {a.score:.2f}", f'- English: "{prompt_budget.compact_translation(a.english_translation)}"']
+    arabic = prompt_budget.compact_arabic(a.arabic_diacritics)
+    if arabic:
+        lines.append(f"- Arabic: {arabic}")
+    lines.append(f"- Surah: {a.surah_name_english}, Ayah: {a.aya_number}")
+    return "\n".join(lines)
 
 
+def format_ayahs(ayahs: List[AyahResult], budget: Optional[int] = None) -> str:
+    """
+    Renders ayahs for the verdict prompt. With compaction on, duplicates are dropped and, when a
+    token `budget` is given, ayahs past it are left out and counted in a closing note.
+    """
+    if not ayahs:
+        return "None"
+    if not prompt_budget.PROMPT_COMPACTION or budget is None:
+        return "\n\n".join(format_ayah(a) for a in ayahs)
+    ayahs = prompt_budget.dedupe_ayahs(ayahs)
+    rendered = prompt_budget.fit_to_budget(ayahs, format_ayah, budget)
+    omitted = len(ayahs) - len(rendered)
+    if omitted:
+        rendered.append(f"({omitted} more ayahs omitted)")
+    return "\n\n".join(rendered)
+
+
+def _verdict_inputs(hadith_result: dict) -> dict:
+    """Prompt variables; the ayah token budget is split between the two lists by their length."""
+    supported = hadith_result.get("supported", [])
+    contradicted = hadith_result.get("contradicted", [])
+    total = len(supported) + len(contradicted)
+    supported_budget = PROMPT_VERDICT_AYAH_BUDGET * len(supported) // total if total else 0
+    return {
+        "hadith": prompt_budget.compact_hadith(hadith_result["hadith"]),
+        "supported_text": format_ayahs(supported, supported_budget),
+        "contradicted_text": format_ayahs(contradicted, PROMPT_VERDICT_AYAH_BUDGET - supported_budget),
+    }
+
+
+@traced("verdict")
 def get_hadith_verdict_from_llm(hadith_result: dict, llm=None) -> HadithVerdict:
     if llm is None:
-        llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
+        llm = registry.chat_openai()
+
+    chain = prompt | scheduled(llm) | parser
 
-    chain = prompt | llm | parser
+    return chain.invoke(_verdict_inputs(hadith_result))
+
+
+@traced("verdict")
+async def aget_hadith_verdict_from_llm(hadith_result: dict, llm=None) -> HadithVerdict:
+    if llm is None:
+        llm = registry.chat_openai()
 
-    supported_text = format_ayahs(hadith_result.get("supported", []))
-    contradicted_text = format_ayahs(hadith_result.get("contradicted", []))
+    chain = prompt | scheduled(llm) | parser
 
-    return chain.invoke({
-        "hadith": hadith_result["hadith"],
-        "supported_text": supported_text,
-        "contradicted_text": contradicted_text
-    })
+    return await chain.ainvoke(_verdict_inputs(hadith_result))
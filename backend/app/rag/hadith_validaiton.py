@@ -1,7 +1,14 @@
 from langchain.prompts import PromptTemplate
 from langchain.output_parsers import PydanticOutputParser
-from langchain_openai import ChatOpenAI
+from ..clients import registry
 from pydantic import BaseModel, Field
+from ..config import LLM_MAX_CONCURRENCY
+from ..utils.concurrency import map_bounded
+from .ayah_filter import ayah_to_text
+from .judgement_cache import judgement_cache, prompt_version, model_name
+from ..utils.tracing import traced
+from ..utils.llm_scheduler import scheduled, raise_if_unavailable, LLMUnavailableError
+from .prompt_budget import compact_hadith
 
 from dotenv import load_dotenv
 
@@ -10,14 +17,11 @@ load_dotenv()
 class RelationshipOutput(BaseModel):
     classification: str = Field(description="One of: Supported, Weak Support, Contradicted")
 
-def check_relationship(hadith_text, ayah_text, llm=None):
-    if llm is None:
-        llm = ChatOpenAI(temperature=0, model="gpt-3.5-turbo")
 
-    parser = PydanticOutputParser(pydantic_object=RelationshipOutput)
+parser = PydanticOutputParser(pydantic_object=RelationshipOutput)
 
-    prompt = PromptTemplate(
-        template="""
+prompt = PromptTemplate(
+    template="""
 You are a scholar analyzing the relationship between a Hadith and a specific Quranic ayah.
 
 Your task is to carefully examine **all possible cases** and then assign the relationship to exactly **one** of the following categories:
@@ -28,24 +32,88 @@ Your task is to carefully examine **all possible cases** and then assign the rel
 
 Base your classification **strictly on the content** of the given ayah and hadith. Do not rely on external sources or assumptions.
 
+Respond with:
+{format_instructions}
+
 Hadith:
 "{hadith}"
 
 Quranic Ayah:
 "{ayah}"
-
-Respond with:
-{format_instructions}
 """,
-        input_variables=["hadith", "ayah"],
-        partial_variables={"format_instructions": parser.get_format_instructions()},
-    )
+    input_variables=["hadith", "ayah"],
+    partial_variables={"format_instructions": parser.get_format_instructions()},
+)
+
+
+@traced("classify")
+def classify_ayahs(hadith_text, ayahs, llm=None):
+    """
+    Labels each ayah against the hadith, reusing cached labels for pairs seen before.
+    Failed calls fall back to "Weak Support" and are not cached; LLMUnavailableError is raised.
+    """
+    if llm is None:
+        llm = registry.chat_openai()
 
-    chain = prompt | llm | parser
+    chain = prompt | scheduled(llm) | parser
 
-    try:
-        result = chain.invoke({"hadith": hadith_text, "ayah": ayah_text})
+    hadith = compact_hadith(hadith_text)
+    version, model = prompt_version(prompt), model_name(llm)
+    labels = judgement_cache.get_many("label", hadith_text, ayahs, version, model)
+    new_labels = []
+    for i, ayah in enumerate(ayahs):
+        if i in labels:
+            continue
+        try:
+            labels[i] = chain.invoke({"hadith": hadith, "ayah": ayah_to_text(ayah)}).classification
+            new_labels.append((ayah, labels[i]))
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            print("Error during classification:", e)
+            labels[i] = "Weak Support"
+    judgement_cache.put_many("label", hadith_text, new_labels, version, model)
+    return [labels[i] for i in range(len(ayahs))]
+
+
+def check_relationship(hadith_text, ayah, llm=None):
+    """The label of a single ayah (an AyahResult) against the hadith; see `classify_ayahs`."""
+    return classify_ayahs(hadith_text, [ayah], llm=llm)[0]
+
+
+@traced("classify")
+async def aclassify_ayahs(hadith_text, ayahs, llm=None,
+                          max_concurrency=LLM_MAX_CONCURRENCY, errors=None):
+    """
+    Async variant of `classify_ayahs`; uncached pairs are classified with bounded concurrency.
+    When `errors` is given, the exceptions behind "Weak Support" fallbacks are appended to it.
+    """
+    if llm is None:
+        llm = registry.chat_openai()
+
+    version, model = prompt_version(prompt), model_name(llm)
+    labels = await judgement_cache.aget_many("label", hadith_text, ayahs, version, model)
+    uncached = [i for i in range(len(ayahs)) if i not in labels]
+
+    chain = prompt | scheduled(llm) | parser
+    hadith = compact_hadith(hadith_text)
+
+    async def classify(ayah):
+        result = await chain.ainvoke({"hadith": hadith, "ayah": ayah_to_text(ayah)})
         return result.classification
-    except Exception as e:
-        print("Error during classification:", e)
-        return "Weak Support"
+
+    results = await map_bounded(classify, [ayahs[i] for i in uncached], max_concurrency)
+    raise_if_unavailable(results)
+
+    new_labels = []
+    for i, result in zip(uncached, results):
+        if isinstance(result, BaseException):
+            print("Error during classification:", repr(result))
+            labels[i] = "Weak Support"
+            if errors is not None:
+                errors.append(result)
+        else:
+            labels[i] = result
+            new_labels.append((ayahs[i], result))
+    await judgement_cache.aput_many("label", hadith_text, new_labels, version, model)
+    return [labels[i] for i in range(len(ayahs))]
@@ -0,0 +1,134 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional, Tuple
+from .isnad_parser import ParsedIsnad, chain_confidence, parse_isnad
+from .open_source_models import extract_isnad, extract_narrator_chain, ner_names
+from ..utils.metrics import metrics
+from ..utils.narrator_gazetteer import get_gazetteer
+from ..utils.tracing import current_span, traced
+from ..config import ISNAD_MIN_CONFIDENCE, GAZETTEER_ENABLED
+
+ISNAD_TIERS = metrics.counter(
+    "hadith_isnad_tier_total", "Isnad extractions by the tier that produced the result.", ["tier", "language"]
+)
+
+NER_MODELS = {"arabic": "camel", "english": "dslim"}
+# Names found by NER in a span the rules were unsure of are trusted about this much.
+NER_NAME_CONFIDENCE = 0.9
+
+LLMExtractor = Callable[[str], Tuple[List[str], str]]
+
+
+class ChainResult:
+    """Narrators, the hadith content (matn) when known, and which tier produced them."""
+
+    def __init__(self, narrators: List[str], content: str, tier: str, confidence: Optional[float]):
+        self.narrators = narrators
+        self.content = content
+        self.tier = tier
+        self.confidence = confidence
+
+
+def _served(result: ChainResult, language: str) -> ChainResult:
+    ISNAD_TIERS.inc(tier=result.tier, language=language)
+    span = current_span()
+    if span:
+        span.set("isnad_tier", result.tier)
+    return result
+
+
+def _gazetteer_tier(parsed: ParsedIsnad) -> Tuple[List[str], float]:
+    """
+    Trusts uncertain names that resolve to a known narrator by raising their spans' confidence,
+    so the chain passes only when every name is confident or known. Otherwise the later tiers
+    see the raised spans and only re-extract the names that are still uncertain; an unknown
+    narrator is never dropped for the sake of a confident-looking chain.
+    """
+    gazetteer = get_gazetteer()
+    for s in parsed.spans:
+        if s.confidence < ISNAD_MIN_CONFIDENCE and gazetteer.resolve(s.text):
+            s.confidence = 1.0
+    return parsed.narrators, chain_confidence([s.confidence for s in parsed.spans], parsed.matn_confidence)
+
+
+def _ner_tier(parsed: ParsedIsnad, text: str) -> Tuple[List[str], float]:
+    """Re-extracts the names the rules were unsure of with NER, keeping the confident ones."""
+    if not any(s.confidence >= ISNAD_MIN_CONFIDENCE for s in parsed.spans):
+        # The split itself is unreliable: run the NER extractor over the whole hadith.
+        extract = extract_narrator_chain if parsed.language == "arabic" else extract_isnad
+        narrators = extract(text)
+        return narrators, chain_confidence([NER_NAME_CONFIDENCE] * len(narrators), parsed.matn_confidence)
+
+    uncertain = [s for s in parsed.spans if s.confidence < ISNAD_MIN_CONFIDENCE]
+    found = dict(zip(map(id, uncertain), ner_names(NER_MODELS[parsed.language], [s.text for s in uncertain])))
+    narrators, scores = [], []
+    for s in parsed.spans:
+        names = found.get(id(s), [s.text])
+        narrators.extend(names)
+        scores.extend([NER_NAME_CONFIDENCE if id(s) in found else s.confidence] * len(names))
+    return narrators, chain_confidence(scores, parsed.matn_confidence)
+
+
+def _accept(parsed: ParsedIsnad, confidence: float, needs_content: bool) -> bool:
+    return confidence >= ISNAD_MIN_CONFIDENCE and (parsed.matn or not needs_content)
+
+
+@traced("isnad")
+def extract_chain(text: str, language: Optional[str] = None, llm: Optional[LLMExtractor] = None) -> ChainResult:
+    """
+    Extracts the narrator chain with the cheapest tier that is confident enough: the rule-based
+    parser, then the narrator gazetteer, then NER on the names the rules were unsure of, then
+    `llm(text)` if given. Without `llm` the NER tier's result is returned however confident it is.
+    With `llm` and no matn found, NER is skipped: only the LLM can supply the content.
+    """
+    parsed = parse_isnad(text, language)
+    needs_content = llm is not None
+    if _accept(parsed, parsed.confidence, needs_content):
+        return _served(ChainResult(parsed.narrators, parsed.matn, "rules", parsed.confidence), parsed.language)
+    if GAZETTEER_ENABLED:
+        narrators, confidence = _gazetteer_tier(parsed)
+        if _accept(parsed, confidence, needs_content):
+            return _served(ChainResult(narrators, parsed.matn, "gazetteer", confidence), parsed.language)
+    if needs_content and not parsed.matn:
+        # NER finds names but not the matn, so its result could not be accepted here either.
+        narrators, content = llm(text)
+        return _served(ChainResult(narrators, content, "llm", None), parsed.language)
+
+    try:
+        narrators, confidence = _ner_tier(parsed, text)
+    except Exception as e:
+        print(f"NER tier failed, falling back: {e}")
+        narrators, confidence = [], 0.0
+    if llm is None or _accept(parsed, confidence, needs_content):
+        return _served(ChainResult(narrators, parsed.matn, "ner", confidence), parsed.language)
+
+    narrators, content = llm(text)
+    return _served(ChainResult(narrators, content, "llm", None), parsed.language)
+
+
+@traced("isnad")
+async def aextract_chain(text: str, language: Optional[str] = None,
+                         llm: Optional[Callable[[str], Awaitable[Tuple[List[str], str]]]] = None) -> ChainResult:
+    """Async counterpart of `extract_chain`; NER runs in a worker thread and `llm` is awaited."""
+    parsed = parse_isnad(text, language)
+    needs_content = llm is not None
+    if _accept(parsed, parsed.confidence, needs_content):
+        return _served(ChainResult(parsed.narrators, parsed.matn, "rules", parsed.confidence), parsed.language)
+    if GAZETTEER_ENABLED:
+        narrators, confidence = _gazetteer_tier(parsed)
+        if _accept(parsed, confidence, needs_content):
+            return _served(ChainResult(narrators, parsed.matn, "gazetteer", confidence), parsed.language)
+    if needs_content and not parsed.matn:
+        # NER finds names but not the matn, so its result could not be accepted here either.
+        narrators, content = await llm(text)
+        return _served(ChainResult(narrators, content, "llm", None), parsed.language)
+
+    try:
+        narrators, confidence = await asyncio.to_thread(_ner_tier, parsed, text)
+    except Exception as e:
+        print(f"NER tier failed, falling back: {e}")
+        narrators, confidence = [], 0.0
+    if llm is None or _accept(parsed, confidence, needs_content):
+        return _served(ChainResult(narrators, parsed.matn, "ner", confidence), parsed.language)
+
+    narrators, content = await llm(text)
+    return _served(ChainResult(narrators, content, "llm", None), parsed.language)
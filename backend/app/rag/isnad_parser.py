@@ -0,0 +1,241 @@
+import re
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from ..utils.text import fold, fold_with_offsets
+from .open_source_models import NARRATOR_CONNECTORS, MATN_STARTERS
+
+CONNECTOR, MATN, NOISE = "connector", "matn", "noise"
+
+ARABIC_PATTERNS = {
+    CONNECTOR: NARRATOR_CONNECTORS + [
+        "وَحَدَّثَنَا", "وَحَدَّثَنِي", "أَخْبَرَتْنِي", "أَنْبَأَنَا", "وَأَخْبَرَنَا", "وَعَنْ", "ثَنَا",
+    ],
+    MATN: MATN_STARTERS + [
+        "قَالَ النَّبِيُّ", "عَنِ النَّبِيِّ", "عَنْ رَسُولِ اللَّهِ", "سَمِعْتُ رَسُولَ اللَّهِ", "سَمِعْتُ النَّبِيَّ",
+        "أَنَّ رَسُولَ اللهِ", "قَالَ رَسُولُ اللهِ",
+    ],
+    NOISE: ["رَضِيَ اللَّهُ عَنْهُ", "رَضِيَ اللَّهُ عَنْهَا", "رَضِيَ اللَّهُ عَنْهُمَا", "رَضِيَ اللَّهُ عَنْهُمْ", "رَحِمَهُ اللَّهُ"],
+}
+
+ENGLISH_PATTERNS = {
+    CONNECTOR: [
+        "it was narrated from", "it was narrated that", "narrated from", "narrated to us", "narrated to me",
+        "narrated", "related to me", "related to us", "related from", "reported from", "reported to us", "told us", "told me", "informed us", "informed me",
+        "from", "on the authority of", "who heard", "i heard", "heard",
+    ],
+    MATN: [
+        "that the messenger of allah", "that the prophet", "that allah's messenger",
+        "the messenger of allah said", "the messenger of allah (ﷺ) said", "the messenger of allah ﷺ said",
+        "the prophet said", "the prophet (ﷺ) said", "the prophet ﷺ said", "allah's messenger said",
+        'he said, "the prophet', "said:", "reported:",
+    ],
+    NOISE: [
+        "(may allah be pleased with him)", "(may allah be pleased with her)",
+        "(may allah be pleased with them)", "(ra)",
+    ],
+}
+
+# Words of transmission phrases and of the matn that are never part of a narrator's name. A span
+# holding one has swallowed a phrase the patterns above do not know ("Urwa that Aisha").
+FUNCTION_WORDS = {
+    "arabic": {fold(word) for word in [
+        "أَنَّ", "أَنَّهُ", "أَنَّهَا", "إِنَّ", "قَالَ", "قَالَتْ", "يَقُولُ", "سَمِعْتُ", "سَمِعَ", "حَدَّثَ", "حَدَّثَهُ",
+        "أَخْبَرَهُ", "فِي", "إِلَى", "الَّذِي", "هُوَ",
+    ]},
+    "english": {
+        "that", "said", "says", "saying", "related", "narrated", "reported", "told", "informed", "heard",
+        "to", "me", "us", "him", "her", "who", "he", "she", "it", "was", "the", "and", "when",
+    },
+}
+_WORD = re.compile(r"[\w']+")
+
+# Characters trimmed from both ends of a narrator span. Apostrophes are kept: they start
+# transliterated names such as 'Urwah.
+_TRIM = " \t\r\n،,:;.\"«»“”()[]"
+_ARABIC_LETTER = re.compile("[؀-ۿ]")
+_LATIN_LETTER = re.compile("[A-Za-z]")
+_NAME_PREFIXES = ("'", "al-", "ibn", "bin", "abu", "abi", "umm")
+
+
+class AhoCorasick:
+    """Multi-pattern matcher: finds every occurrence of every pattern in one pass over the text."""
+
+    def __init__(self, patterns: List[Tuple[str, str]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str]]] = [[]]
+        for pattern, kind in patterns:
+            node = 0
+            for char in pattern:
+                if char not in self._goto[node]:
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[node][char] = len(self._goto) - 1
+                node = self._goto[node][char]
+            self._out[node].append((len(pattern), kind))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def find_all(self, text: str) -> List[Tuple[int, int, str]]:
+        """(start, end, kind) of every match, in order of end position."""
+        matches = []
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for length, kind in self._out[node]:
+                matches.append((i + 1 - length, i + 1, kind))
+        return matches
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "'"
+
+
+def _leftmost_longest(text: str, matches: List[Tuple[int, int, str]]) -> List[Tuple[int, int, str]]:
+    """Non-overlapping whole-word matches, preferring the earliest and then the longest."""
+    selected = []
+    position = 0
+    for start, end, kind in sorted(matches, key=lambda m: (m[0], -m[1])):
+        if start < position:
+            continue
+        if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+            continue
+        if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+            continue
+        selected.append((start, end, kind))
+        position = end
+    return selected
+
+
+def _build(patterns: Dict[str, List[str]]) -> AhoCorasick:
+    return AhoCorasick([(fold(pattern), kind) for kind, items in patterns.items() for pattern in items])
+
+
+MATCHERS = {"arabic": _build(ARABIC_PATTERNS), "english": _build(ENGLISH_PATTERNS)}
+
+
+def detect_language(text: str) -> str:
+    arabic = len(_ARABIC_LETTER.findall(text))
+    return "arabic" if arabic > len(_LATIN_LETTER.findall(text)) else "english"
+
+
+class NarratorSpan:
+    def __init__(self, text: str, start: int, end: int, confidence: float):
+        self.text = text
+        self.start = start
+        self.end = end
+        self.confidence = confidence
+
+
+class ParsedIsnad:
+    """
+    Narrator spans in chain order, where the matn starts (None if not found), how sure that
+    boundary is and the chain's overall confidence.
+    """
+
+    def __init__(self, language: str, spans: List[NarratorSpan], matn_start: Optional[int], matn: str,
+                 matn_confidence: float, confidence: float):
+        self.language = language
+        self.spans = spans
+        self.matn_start = matn_start
+        self.matn = matn
+        self.matn_confidence = matn_confidence
+        self.confidence = confidence
+
+    @property
+    def narrators(self) -> List[str]:
+        return [span.text for span in self.spans]
+
+
+def span_confidence(name: str, language: str) -> float:
+    """How much `name` looks like a single narrator's name rather than leftover isnad or matn text."""
+    words = name.split()
+    score = 1.0 if len(words) <= 6 else 0.5 if len(words) <= 9 else 0.1
+    if FUNCTION_WORDS[language].intersection(_WORD.findall(fold(name))):
+        score *= 0.3
+    if language == "arabic":
+        if _LATIN_LETTER.search(name) or any(c.isdigit() for c in name):
+            score *= 0.3
+    else:
+        if _ARABIC_LETTER.search(name):
+            score *= 0.3
+        if not (name[0].isupper() or name.lower().startswith(_NAME_PREFIXES)):
+            score *= 0.4
+    return score
+
+
+def chain_confidence(span_scores: List[float], matn_factor: float) -> float:
+    if not span_scores:
+        return 0.0
+    return min(span_scores) * matn_factor * (1.0 if len(span_scores) >= 2 else 0.6)
+
+
+# Matched against folded text, hence "صلي" for "صلى".
+_MATN_INTRO = re.compile(r"^(?:said|says|saying|قال|قالت|يقول|ﷺ|\(ﷺ\)|صلي الله عليه وسلم)(?![\w'])")
+
+
+def _strip_matn_intro(text: str) -> str:
+    """The matn without the "said:" / "قال:" and quotation marks that introduce it."""
+    previous = None
+    while previous != text:
+        previous = text
+        text = text.lstrip(_TRIM + "'")
+        folded, offsets = fold_with_offsets(text)
+        intro = _MATN_INTRO.match(folded)
+        if intro:
+            text = text[offsets[intro.end()]:]
+    return text.rstrip(_TRIM + "'")
+
+
+def parse_isnad(text: str, language: Optional[str] = None) -> ParsedIsnad:
+    """
+    Splits `text` into narrator names on known transmission phrases ("حدثنا", "عن", "narrated
+    from", ...) up to the first phrase that introduces the matn, matching on a diacritic- and
+    case-folded copy so that vocalised and bare text parse alike. Each name gets a confidence
+    from its shape and wording; the chain's confidence is the lowest of them, reduced when the matn could
+    not be located or fewer than two narrators were found.
+    """
+    language = language or detect_language(text)
+    folded, offsets = fold_with_offsets(text)
+    markers = _leftmost_longest(folded, MATCHERS[language].find_all(folded))
+
+    matn = next((m for m in markers if m[2] == MATN), None)
+    matn_factor = 1.0
+    if matn is None and language == "english" and ":" in folded:
+        # English isnads often end "Narrated 'Umar:" with no phrase introducing the matn.
+        colon = folded.index(":")
+        matn = (colon, colon + 1, MATN)
+        matn_factor = 0.9
+    elif matn is None:
+        matn_factor = 0.5
+    isnad_end = matn[0] if matn else len(folded)
+
+    boundaries = [(0, 0)] + [(start, end) for start, end, kind in markers if end <= isnad_end and kind != MATN]
+    boundaries.append((isnad_end, isnad_end))
+    spans = []
+    for (_, previous_end), (next_start, _) in zip(boundaries, boundaries[1:]):
+        start, end = offsets[previous_end], offsets[next_start]
+        name = text[start:end].strip(_TRIM)
+        if not name or not any(c.isalpha() for c in name):
+            continue
+        start = text.index(name, start)
+        spans.append(NarratorSpan(name, start, start + len(name), span_confidence(name, language)))
+
+    # Without any transmission phrase the whole text is one span, which is not a chain.
+    has_connector = any(kind == CONNECTOR for _, _, kind in markers)
+    confidence = chain_confidence([s.confidence for s in spans], matn_factor) if has_connector else 0.0
+    matn_start = offsets[matn[0]] if matn else None
+    body = _strip_matn_intro(text[offsets[matn[1]]:]) if matn else ""
+    return ParsedIsnad(language, spans, matn_start, body, matn_factor, confidence)
@@ -0,0 +1,133 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..utils.text import normalize_text
+from ..utils.tracing import current_span
+from .prompt_budget import prompt_settings
+from ..config import JUDGEMENT_CACHE_PATH, JUDGEMENT_CACHE_MAX_ENTRIES
+
+
+def prompt_version(prompt) -> str:
+    """Changes with the template and with the compaction settings that shape what is filled into it."""
+    text = "\0".join([prompt.template, *map(str, prompt_settings())])
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+
+
+def model_name(llm) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+
+
+class JudgementCache:
+    """
+    Disk-backed memo of LLM judgements about a (hadith, ayah) pair.
+
+    Entries are keyed by (hadith hash, surah, aya_number, prompt version, model, kind), where
+    `kind` separates relevance scores, relationship labels and batched judgements. The SQLite
+    file keeps at most `max_entries` rows, dropping the least recently used ones.
+    """
+
+    def __init__(self, path: Optional[str], max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._counters = {"hits": 0, "misses": 0}
+        if path:
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS judgements (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS judgements_accessed ON judgements (accessed_at)")
+            finally:
+                conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    @staticmethod
+    def _key(kind, hadith_hash, ayah, version, model) -> str:
+        return f"{kind}|{hadith_hash}|{ayah.surah_name_english}|{ayah.aya_number}|{version}|{model}"
+
+    @staticmethod
+    def _hadith_hash(hadith_text: str) -> str:
+        return hashlib.sha256(normalize_text(hadith_text).encode("utf-8")).hexdigest()
+
+    def get_many(self, kind: str, hadith_text: str, ayahs: Sequence, version: str, model: str) -> Dict[int, object]:
+        """Returns {index in `ayahs`: cached value} for the pairs that are cached."""
+        if not self.path or not ayahs:
+            return {}
+        hadith_hash = self._hadith_hash(hadith_text)
+        keys = [self._key(kind, hadith_hash, ayah, version, model) for ayah in ayahs]
+        conn = self._connect()
+        try:
+            placeholders = ",".join("?" * len(keys))
+            rows = dict(conn.execute(f"SELECT key, value FROM judgements WHERE key IN ({placeholders})", keys))
+            if rows:
+                now = time.time()
+                conn.executemany("UPDATE judgements SET accessed_at = ? WHERE key = ?", [(now, k) for k in rows])
+        finally:
+            conn.close()
+
+        found = {i: json.loads(rows[key]) for i, key in enumerate(keys) if key in rows}
+        with self._lock:
+            self._counters["hits"] += len(found)
+            self._counters["misses"] += len(keys) - len(found)
+        span = current_span()
+        if span is not None:
+            span.add("cache_hits", len(found))
+            span.add("cache_misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, kind: str, hadith_text: str, items: List[Tuple[object, object]], version: str, model: str):
+        """Stores (ayah, value) pairs."""
+        if not self.path or not items:
+            return
+        hadith_hash = self._hadith_hash(hadith_text)
+        now = time.time()
+        rows = [(self._key(kind, hadith_hash, ayah, version, model), json.dumps(value), now) for ayah, value in items]
+        conn = self._connect()
+        try:
+            conn.executemany("INSERT OR REPLACE INTO judgements (key, value, accessed_at) VALUES (?, ?, ?)", rows)
+            with self._lock:
+                self._puts += 1
+                trim = self._puts % 64 == 0
+            if trim:
+                conn.execute("""
+                    DELETE FROM judgements WHERE key IN (
+                        SELECT key FROM judgements ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                """, (self.max_entries,))
+        finally:
+            conn.close()
+
+    async def aget_many(self, kind: str, hadith_text: str, ayahs: Sequence, version: str, model: str) -> Dict[int, object]:
+        """`get_many` in a worker thread, so a busy SQLite file never blocks the event loop."""
+        if not self.path or not ayahs:
+            return {}
+        return await asyncio.to_thread(self.get_many, kind, hadith_text, ayahs, version, model)
+
+    async def aput_many(self, kind: str, hadith_text: str, items: List[Tuple[object, object]], version: str, model: str):
+        if self.path and items:
+            await asyncio.to_thread(self.put_many, kind, hadith_text, items, version, model)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+judgement_cache = JudgementCache(JUDGEMENT_CACHE_PATH or None, JUDGEMENT_CACHE_MAX_ENTRIES)
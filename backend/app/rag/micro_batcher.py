@@ -0,0 +1,123 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+from ..utils.metrics import metrics
+
+BATCH_SIZES = metrics.histogram(
+    "hadith_ner_batch_size", "Inputs per batched NER forward pass.", ["model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128),
+)
+QUEUE_DEPTH = metrics.histogram(
+    "hadith_ner_queue_depth", "Inputs waiting for the NER batcher when a batch is cut.", ["model"],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+BATCH_WAIT = metrics.histogram(
+    "hadith_ner_batch_wait_seconds", "Time inputs waited in the NER batcher before inference.", ["model"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+class MicroBatcher:
+    """
+    Collects inputs submitted from concurrent threads and runs them through `run_batch` together.
+
+    A worker thread takes the first waiting input, then keeps collecting for up to `window`
+    seconds or until `max_size` inputs are in hand, and calls `run_batch(inputs)`, which must
+    return one result per input in order. Each caller gets its own result. When a batch raises,
+    its inputs are run again one at a time, so only the inputs that fail on their own get an
+    exception. With `window` 0, `map` calls `run_batch` directly on the caller's thread.
+    """
+
+    def __init__(self, name: str, run_batch: Callable[[List], List], window: float, max_size: int):
+        self.name = name
+        self.run_batch = run_batch
+        self.window = window
+        self.max_size = max(1, max_size)
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "items": 0, "max_batch": 0, "failed_batches": 0}
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop, name=f"ner-batcher-{self.name}", daemon=True)
+                self._worker.start()
+
+    def submit(self, item) -> Future:
+        future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future, time.perf_counter()))
+        return future
+
+    def map(self, items: Sequence) -> List:
+        """Results for `items`, in order, batched together with whatever other threads submit."""
+        if self.window <= 0:
+            return self._run(list(items))
+        futures = [self.submit(item) for item in items]
+        return [future.result() for future in futures]
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Whatever is already queued is taken even once the window has passed.
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            QUEUE_DEPTH.observe(self._queue.qsize() + len(batch), model=self.name)
+            now = time.perf_counter()
+            for _, _, queued_at in batch:
+                BATCH_WAIT.observe(now - queued_at, model=self.name)
+            try:
+                results = self._run([item for item, _, _ in batch])
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                else:
+                    self._run_alone(batch, e)
+                continue
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+    def _run_alone(self, batch, error):
+        # One bad input (or a shape the batch cannot pad) must not fail everyone it was batched with.
+        print(f"{self.name} batch of {len(batch)} failed, running its inputs one at a time: {error}")
+        with self._lock:
+            self._stats["failed_batches"] += 1
+        for item, future, _ in batch:
+            try:
+                future.set_result(self._run([item])[0])
+            except Exception as e:
+                future.set_exception(e)
+
+    def _run(self, items: List) -> List:
+        if not items:
+            return []
+        BATCH_SIZES.observe(len(items), model=self.name)
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["items"] += len(items)
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(items))
+        results = self.run_batch(items)
+        if len(results) != len(items):
+            raise RuntimeError(f"{self.name} returned {len(results)} results for {len(items)} inputs")
+        return results
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mean_batch"] = round(stats["items"] / stats["batches"], 2) if stats["batches"] else 0.0
+        stats["queued"] = self._queue.qsize()
+        stats["window_ms"] = self.window * 1000
+        stats["max_size"] = self.max_size
+        return stats
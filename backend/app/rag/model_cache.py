@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+
+def estimate_bytes(model) -> int:
+    """Approximate memory held by a transformers pipeline, from its parameter tensors."""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.model.parameters())
+    except Exception:
+        return 0
+
+
+class ModelCache:
+    """
+    Lazily loaded, thread-safe cache of named models.
+
+    A model is loaded by its registered loader on first `get()` and kept until the estimated
+    memory of all cached models exceeds `max_bytes`, at which point the least recently used
+    models are evicted. Load time and inference time are recorded separately per model.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._loaders: Dict[str, Callable] = {}
+        self._models = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._timings: Dict[str, dict] = {}
+
+    def register(self, name: str, loader: Callable):
+        self._loaders[name] = loader
+        self._load_locks[name] = threading.Lock()
+        self._timings[name] = {"loads": 0, "load_seconds": 0.0, "inferences": 0, "inference_seconds": 0.0}
+
+    def get(self, name: str):
+        with self._lock:
+            if name in self._models:
+                self._models.move_to_end(name)
+                return self._models[name]
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        # Only one thread loads a given model; the others wait for it instead of loading a copy.
+        with self._load_locks[name]:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name]
+            start = time.perf_counter()
+            model = self._loaders[name]()
+            elapsed = time.perf_counter() - start
+            size = estimate_bytes(model)
+            print(f"Loaded model {name} in {elapsed:.2f}s (~{size / 1024 ** 2:.0f} MB)")
+            with self._lock:
+                self._timings[name]["loads"] += 1
+                self._timings[name]["load_seconds"] += elapsed
+                self._models[name] = model
+                self._sizes[name] = size
+                self._evict()
+            return model
+
+    def _evict(self):
+        while len(self._models) > 1 and sum(self._sizes[n] for n in self._models) > self.max_bytes:
+            name, _ = self._models.popitem(last=False)
+            print(f"Evicted model {name} from cache")
+
+    @contextmanager
+    def timed(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._timings[name]["inferences"] += 1
+                self._timings[name]["inference_seconds"] += elapsed
+
+    def warmup(self, names: List[str]):
+        for name in names:
+            try:
+                self.get(name)
+            except Exception as e:
+                print(f"Error warming up model {name}: {e}")
+
+    def registered(self) -> List[str]:
+        return list(self._loaders)
+
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return list(self._models)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": list(self._models),
+                "bytes": {name: self._sizes[name] for name in self._models},
+                "max_bytes": self.max_bytes,
+                "timings": {name: dict(t) for name, t in self._timings.items()},
+            }
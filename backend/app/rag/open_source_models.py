@@ -1,17 +1,97 @@
 
-from transformers import pipeline, logging
 import re
 import json 
 import regex
 import os
 from dotenv import load_dotenv
+from .model_cache import ModelCache
+from .micro_batcher import MicroBatcher
+from ..config import NER_CACHE_MAX_BYTES, NER_BATCH_SIZE, NER_MICROBATCH_WINDOW_MS, NER_MICROBATCH_MAX_SIZE
+from ..utils.tracing import traced
 
 load_dotenv()
 
 HF_TOKEN = os.environ.get("HF_TOKEN")
 
-logging.set_verbosity_error()
 
+def _ner_pipeline(**kwargs):
+    # transformers (and torch behind it) is imported on first model load rather than at
+    # import time, so starting the app does not pay for it.
+    from transformers import pipeline, logging
+
+    logging.set_verbosity_error()
+    return pipeline("ner", token=HF_TOKEN, **kwargs)
+
+
+MODEL_CACHE = ModelCache(max_bytes=NER_CACHE_MAX_BYTES)
+
+MODEL_CACHE.register("dslim", lambda: _ner_pipeline(
+    model="dslim/bert-base-NER",
+    aggregation_strategy="simple"
+))
+
+MODEL_CACHE.register("camel", lambda: _ner_pipeline(
+    model="CAMeL-Lab/bert-base-arabic-camelbert-msa-ner",
+    grouped_entities=True
+))
+
+
+def _run_ner(name: str, texts: list[str], batch_size: int = NER_BATCH_SIZE) -> list[list[dict]]:
+    ner_pipeline = MODEL_CACHE.get(name)
+    with MODEL_CACHE.timed(name):
+        return ner_pipeline(texts, batch_size=batch_size)
+
+
+# Concurrent requests share forward passes: single hadiths from the NER routes are queued for
+# a few milliseconds and run through the pipeline together.
+NER_BATCHERS = {
+    name: MicroBatcher(name, lambda texts, name=name: _run_ner(name, texts),
+                       NER_MICROBATCH_WINDOW_MS / 1000, NER_MICROBATCH_MAX_SIZE)
+    for name in ("dslim", "camel")
+}
+
+# Common phrases that introduce the matn of an English hadith, such as "that the Prophet said" or "reported:".
+ENGLISH_MATN_STARTERS = [
+    r'that the Messenger of Allah \(ﷺ\) said',
+    r'that the Prophet \(ﷺ\) said',
+    r'that the Prophet said',
+    r'the Prophet \(ﷺ\) said',
+    r'he said, "The Prophet',
+    r'said:',
+    r'reported:'
+]
+MATN_PATTERN = re.compile(r'(?i)' + r'|'.join(ENGLISH_MATN_STARTERS))
+
+# Names the dslim model tags as persons that are not narrators.
+DSLIM_EXCLUSIONS = [
+    "prophet", "messenger of allah", "allah's messenger", "allah",
+]
+
+
+def person_names(ner_results: list[dict]) -> list[str]:
+    """dslim PER entities, without excluded terms and consecutive duplicates."""
+    names = []
+    for entity in ner_results:
+        if entity['entity_group'] != 'PER':
+            continue
+        name = entity['word'].strip()
+        if any(excluded in name.lower() for excluded in DSLIM_EXCLUSIONS):
+            continue
+        if not names or names[-1] != name:
+            names.append(name)
+    return names
+
+
+def ner_names(model: str, texts: list[str]) -> list[list[str]]:
+    """Person names found in each of `texts` by the "dslim" or "camel" model, through its batcher."""
+    if not texts:
+        return []
+    results = NER_BATCHERS[model].map(texts)
+    convert = merge_tokens if model == "camel" else person_names
+    return [convert(entities) for entities in results]
+
+
+@traced("ner_isnad")
 def extract_isnad(hadith_text: str) -> list[str]:
     """
     Extracts the chain of narrators (isnad) from a Hadith text using a pre-trained NER model.
@@ -26,19 +106,8 @@ def extract_isnad(hadith_text: str) -> list[str]:
     print(f"--- Processing Hadith ---")
     
     # 1. PRE-PROCESSING: Isolate the Isnad
-    # The isnad typically ends where the main report (matn) begins. We use regex to find common
-    # phrases that introduce the matn, such as "that the Prophet said" or "reported:".
-    matn_starters = [
-        r'that the Messenger of Allah \(ﷺ\) said',
-        r'that the Prophet \(ﷺ\) said',
-        r'that the Prophet said',
-        r'the Prophet \(ﷺ\) said',
-        r'he said, "The Prophet',
-        r'said:',
-        r'reported:'
-    ]
-    matn_pattern = re.compile(r'(?i)' + r'|'.join(matn_starters))
-    match = matn_pattern.search(hadith_text)
+    # The isnad typically ends where the main report (matn) begins, at one of MATN_PATTERN's phrases.
+    match = MATN_PATTERN.search(hadith_text)
     
     isnad_text = hadith_text
     if match:
@@ -59,27 +128,22 @@ def extract_isnad(hadith_text: str) -> list[str]:
     # into a single entity ("Abdur-Rahman").
 
     try:
-        ner_pipeline = pipeline("ner", model="dslim/bert-base-NER", aggregation_strategy="simple" , token=HF_TOKEN )
-        print("NER pipeline loaded successfully.")
+        MODEL_CACHE.get("dslim")
     except Exception as e:
         print(f"Error loading NER pipeline: {e}")
         return []
 
-    ner_results = ner_pipeline(isnad_text)
+    ner_results = NER_BATCHERS["dslim"].map([isnad_text])[0]
     print(f"NER model identified {len(ner_results)} potential entities.")
 
     narrator_chain = []
     
-    exclusion_list = [
-        "prophet", "messenger of allah", "allah's messenger", "allah", "ibn shihab",
-    ]
-
     for entity in ner_results:
         if entity['entity_group'] == 'PER':
             name = entity['word'].strip()
             
             # Check against the exclusion list (case-insensitive).
-            is_excluded = any(excluded_term in name.lower() for excluded_term in exclusion_list)
+            is_excluded = any(excluded_term in name.lower() for excluded_term in DSLIM_EXCLUSIONS)
             
             if not is_excluded:
                 # Avoid adding consecutive duplicates.
@@ -97,19 +161,6 @@ def extract_isnad(hadith_text: str) -> list[str]:
 
 
 
-try:
-    NER_PIPELINE = pipeline(
-        "ner",
-        model="CAMeL-Lab/bert-base-arabic-camelbert-msa-ner",
-        grouped_entities=True,
-        token=os.environ.get("HF_TOKEN")
-    )
-
-
-except Exception as e:
-    print(f"FATAL: Could not load NER model. Error: {e}")
-    NER_PIPELINE = None
-
 NARRATOR_CONNECTORS = [
     'حَدَّثَنَا', 'حَدَّثَنِي', 'حَدَّثَتْنَا', 'حَدَّثَتْنِي',
     'أَخْبَرَنَا', 'أَخْبَرَنِي',
@@ -149,13 +200,7 @@ def merge_tokens(ner_results):
     return names
 
 
-def extract_narrator_chain(hadith_text: str) -> list[str]:
-    if not hadith_text or not isinstance(hadith_text, str):
-        return []
-    
-    if not NER_PIPELINE:
-        raise RuntimeError("NER model is not available.")
-    
+def split_narrator_phrases(hadith_text: str) -> list[str]:
     # Extract isnad part
     isnad_text = hadith_text
     for starter in MATN_STARTERS:
@@ -175,14 +220,51 @@ def extract_narrator_chain(hadith_text: str) -> list[str]:
     if not narrator_phrases and isnad_text.strip():
         narrator_phrases.append(isnad_text.strip())
 
-    narrator_chain = []
-    for phrase in narrator_phrases:
-        if not phrase:
+    return [phrase for phrase in narrator_phrases if phrase]
+
+
+@traced("ner_chain")
+def extract_narrator_chains(hadith_texts: list[str], batch_size: int = NER_BATCH_SIZE) -> list[list[str]]:
+    """
+    Extracts the narrator chain of every hadith in `hadith_texts`.
+
+    The narrator phrases of all hadiths are sent through the CAMeL-Lab pipeline as padded
+    batches of `batch_size` instead of one forward pass per phrase, then mapped back to
+    their hadith in phrase order. Fewer phrases than a full micro-batch go through the shared
+    batcher so that they are run together with other requests' phrases. Invalid inputs yield
+    an empty chain.
+    """
+    phrases = []
+    owners = []
+    for index, hadith_text in enumerate(hadith_texts):
+        if not hadith_text or not isinstance(hadith_text, str):
             continue
+        for phrase in split_narrator_phrases(hadith_text):
+            phrases.append(phrase)
+            owners.append(index)
 
-        ner_results = NER_PIPELINE(phrase)
-        person_entities = merge_tokens(ner_results)
-        
-        narrator_chain.extend(person_entities)  
-    
-    return narrator_chain
+    chains = [[] for _ in hadith_texts]
+    if not phrases:
+        return chains
+
+    try:
+        MODEL_CACHE.get("camel")
+    except Exception as e:
+        print(f"FATAL: Could not load NER model. Error: {e}")
+        raise RuntimeError("NER model is not available.")
+
+    if len(phrases) >= NER_MICROBATCH_MAX_SIZE:
+        batch_results = _run_ner("camel", phrases, batch_size)
+    else:
+        batch_results = NER_BATCHERS["camel"].map(phrases)
+
+    for owner, ner_results in zip(owners, batch_results):
+        chains[owner].extend(merge_tokens(ner_results))
+    return chains
+
+
+def extract_narrator_chain(hadith_text: str) -> list[str]:
+    if not hadith_text or not isinstance(hadith_text, str):
+        return []
+
+    return extract_narrator_chains([hadith_text])[0]
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+import time
+from typing import List, Optional
+from .ayah_filter import ayah_to_text
+from .open_source_models import MODEL_CACHE
+from ..utils.tracing import traced
+from ..config import (
+    PREFILTER_MIN_SCORE, PREFILTER_RERANKER, PREFILTER_RERANK_BATCH_SIZE,
+    PREFILTER_MAX_CANDIDATES, PREFILTER_MIN_CANDIDATES, PREFILTER_ADAPTIVE,
+)
+
+
+def _load_reranker():
+    from sentence_transformers import CrossEncoder
+
+    return CrossEncoder(PREFILTER_RERANKER, device="cpu")
+
+
+if PREFILTER_RERANKER:
+    MODEL_CACHE.register("reranker", _load_reranker)
+
+
+_stats_lock = threading.Lock()
+_stats = {
+    tier: {"in": 0, "out": 0, "seconds": 0.0}
+    for tier in ("similarity_floor", "reranker", "cutoff")
+}
+
+
+def _record(tier: str, before: int, after: int, started: float):
+    with _stats_lock:
+        _stats[tier]["in"] += before
+        _stats[tier]["out"] += after
+        _stats[tier]["seconds"] += time.perf_counter() - started
+
+
+def prefilter_stats() -> dict:
+    with _stats_lock:
+        return {
+            tier: dict(counts, pass_rate=counts["out"] / counts["in"] if counts["in"] else 0.0)
+            for tier, counts in _stats.items()
+        }
+
+
+def largest_gap_cutoff(scores: List[float], min_keep: int, max_keep: int) -> int:
+    """Number of leading (descending) scores to keep: cut at the biggest drop between neighbours."""
+    limit = min(len(scores), max_keep)
+    start = max(1, min_keep)
+    if limit <= start:
+        return limit
+    gaps = [scores[i - 1] - scores[i] for i in range(start, limit)]
+    return start + gaps.index(max(gaps)) if max(gaps) > 0 else limit
+
+
+def _floor(ayahs, min_score):
+    started = time.perf_counter()
+    kept = [ayah for ayah in ayahs if ayah.score >= min_score]
+    _record("similarity_floor", len(ayahs), len(kept), started)
+    return kept
+
+
+def _rerank(ayahs, hadith_text) -> Optional[List[float]]:
+    if not PREFILTER_RERANKER or not ayahs:
+        return None
+    started = time.perf_counter()
+    reranker = MODEL_CACHE.get("reranker")
+    with MODEL_CACHE.timed("reranker"):
+        scores = reranker.predict(
+            [(hadith_text, ayah_to_text(ayah)) for ayah in ayahs],
+            batch_size=PREFILTER_RERANK_BATCH_SIZE,
+        )
+    _record("reranker", len(ayahs), len(ayahs), started)
+    return [float(s) for s in scores]
+
+
+def _cutoff(ayahs, scores, adaptive, max_candidates, min_candidates):
+    """
+    Keeps the best ayahs by rerank `scores`, or in their retrieval order (e.g. RRF) when `scores` is
+    None. The adaptive gap is always found on descending scores: without a reranker it picks a
+    similarity threshold, and the ayahs above it are kept in retrieval order.
+    """
+    started = time.perf_counter()
+    if scores is None:
+        ranked = [(ayah, ayah.score) for ayah in ayahs]
+    else:
+        ranked = sorted(zip(ayahs, scores), key=lambda pair: pair[1], reverse=True)
+    if adaptive:
+        descending = sorted((s for _, s in ranked), reverse=True)
+        keep = largest_gap_cutoff(descending, min_candidates, max_candidates)
+        if keep:
+            ranked = [(ayah, s) for ayah, s in ranked if s >= descending[keep - 1]]
+    else:
+        keep = min(len(ranked), max_candidates)
+    kept = [ayah for ayah, _ in ranked[:keep]]
+    _record("cutoff", len(ayahs), len(kept), started)
+    return kept
+
+
+@traced("prefilter")
+def prefilter_ayahs(ayahs, hadith_text, min_score=PREFILTER_MIN_SCORE, adaptive=PREFILTER_ADAPTIVE,
+                    max_candidates=PREFILTER_MAX_CANDIDATES, min_candidates=PREFILTER_MIN_CANDIDATES):
+    """
+    Cheap local tiers run before the LLM relevance filter:
+
+    1. similarity floor on the retrieval `score`;
+    2. optional cross-encoder rerank of the survivors, in batches on CPU;
+    3. cutoff to `max_candidates`, or adaptively at the largest gap in the (reranked) scores.
+       Without a reranker the retrieval order is kept, so hybrid retrieval's fused ranking
+       decides what is cut, not the vector similarity alone.
+
+    Returns the ayahs to send to the LLM, best first. Pass-through counts and time per tier
+    are available from `prefilter_stats()`.
+    """
+    kept = _floor(ayahs, min_score)
+    scores = _rerank(kept, hadith_text)
+    return _cutoff(kept, scores, adaptive, max_candidates, min_candidates)
+
+
+async def aprefilter_ayahs(ayahs, hadith_text, **kwargs):
+    if not PREFILTER_RERANKER:
+        return prefilter_ayahs(ayahs, hadith_text, **kwargs)
+    return await asyncio.to_thread(prefilter_ayahs, ayahs, hadith_text, **kwargs)
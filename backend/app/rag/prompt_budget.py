@@ -0,0 +1,110 @@
+import functools
+import math
+from typing import Callable, List, Sequence
+from ..models.query import AyahResult
+from ..utils.text import strip_harakat
+from ..config import (
+    OPENAI_CHAT_MODEL, PROMPT_COMPACTION, PROMPT_HADITH_MAX_TOKENS, PROMPT_AYAH_MAX_TOKENS, PROMPT_VERDICT_AYAH_BUDGET,
+    PROMPT_ARABIC,
+)
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+
+@functools.lru_cache(maxsize=8)
+def _encoding(model: str):
+    """The encoding for `model`, or None without tiktoken or when its BPE files cannot be downloaded."""
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        print(f"tiktoken encoding unavailable, estimating token counts instead: {e}")
+        return None
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough count used without tiktoken: ~4 characters per token for ASCII, ~2 for Arabic."""
+    ascii_chars = sum(1 for c in text if c < "\x80")
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 2)
+
+
+def count_tokens(text: str, model: str = OPENAI_CHAT_MODEL) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text))
+
+
+def truncate_tokens(text: str, max_tokens: int, model: str = OPENAI_CHAT_MODEL) -> str:
+    """Cuts `text` to at most about `max_tokens` tokens, on a word boundary, marking the cut with "…"."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model)
+    if encoding is not None:
+        cut = encoding.decode(encoding.encode(text)[:max_tokens])
+    else:
+        cut = text[:int(len(text) * max_tokens / estimate_tokens(text))]
+    if " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip() + " …"
+
+
+def prompt_settings() -> tuple:
+    """The settings that change what the prompts contain, for keying caches of their results."""
+    return PROMPT_COMPACTION, PROMPT_HADITH_MAX_TOKENS, PROMPT_AYAH_MAX_TOKENS, PROMPT_VERDICT_AYAH_BUDGET, PROMPT_ARABIC
+
+
+def compact_hadith(hadith_text: str) -> str:
+    """The hadith as sent to the per-ayah prompts: harakat removed and length capped."""
+    if not PROMPT_COMPACTION:
+        return hadith_text
+    return truncate_tokens(strip_harakat(hadith_text), PROMPT_HADITH_MAX_TOKENS)
+
+
+def compact_translation(text: str) -> str:
+    if not PROMPT_COMPACTION:
+        return text
+    return truncate_tokens(text, PROMPT_AYAH_MAX_TOKENS)
+
+
+def compact_arabic(text: str) -> str:
+    if not PROMPT_COMPACTION or PROMPT_ARABIC == "full":
+        return text
+    if PROMPT_ARABIC == "none":
+        return ""
+    return strip_harakat(text)
+
+
+def dedupe_ayahs(ayahs: Sequence[AyahResult]) -> List[AyahResult]:
+    seen = set()
+    unique = []
+    for ayah in ayahs:
+        key = (ayah.surah_name_english, ayah.aya_number)
+        if key not in seen:
+            seen.add(key)
+            unique.append(ayah)
+    return unique
+
+
+def fit_to_budget(items: Sequence, render: Callable[[object], str], budget: int) -> List[str]:
+    """
+    Renders items in order and keeps them while their total token count stays within `budget`.
+    The first item is always kept so that a tight budget never empties the list.
+    """
+    rendered = []
+    used = 0
+    for item in items:
+        text = render(item)
+        tokens = count_tokens(text)
+        if rendered and used + tokens > budget:
+            break
+        rendered.append(text)
+        used += tokens
+    return rendered
@@ -1,10 +1,15 @@
-from fastapi import APIRouter
-from ..rag.open_source_models import extract_isnad , extract_narrator_chain
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from ..rag.isnad_cascade import extract_chain
 from ..rag.closed_source_models import extract_narrators_chain_with_llm
-from pydantic import BaseModel
+from ..utils.concurrency import map_bounded
+from ..utils.results_store import get_results_store
+from ..utils.llm_scheduler import llm_priority
+from ..utils.narrator_gazetteer import get_gazetteer
+from ..config import LLM_MAX_CONCURRENCY, NER_MICROBATCH_MAX_SIZE, GAZETTEER_ENABLED
+from pydantic import BaseModel, ValidationError
 from typing import List, Optional
-import spacy
-from spacy.pipeline import EntityRuler
 from typing import List, Tuple
 import json
 import os
@@ -14,7 +19,56 @@ router = APIRouter()
 
 class HadithInput(BaseModel):
     hadith_text: str
-    language: Optional[str] = "english"
+    # Defaults to English when left out; an explicit null is rejected.
+    language: str = "english"
+
+
+RESULT_SOURCES = {
+    "dslim": "open_source",
+    "camel": "open_source",
+    "llm": "closed_source",
+}
+
+EXTRACTOR_LANGUAGES = {
+    "dslim": ["english"],
+    "camel": ["arabic"],
+    "llm": ["english", "arabic"],
+}
+
+
+def _append_results(source, records):
+    get_results_store().append(source, records)
+
+
+def _add_resolutions(data):
+    """Links each extracted name to its canonical narrator in the gazetteer (None where unknown)."""
+    if GAZETTEER_ENABLED:
+        data["narrators_resolved"] = get_gazetteer().resolve_chain(data["narrators_chain"])
+    return data
+
+
+def _stream_results(source, offset, limit):
+    """
+    Streams stored records as a JSON array. The store is opened and the first record read
+    before the response starts, so a failing store still reaches the route's error handling;
+    an error once streaming has begun ends the array with an {"error": ...} element.
+    """
+    records = get_results_store().iter(source, offset=offset, limit=limit)
+    first = next(records, None)
+
+    def generate():
+        yield "["
+        if first is not None:
+            yield json.dumps(first, ensure_ascii=False)
+            try:
+                for record in records:
+                    yield "," + json.dumps(record, ensure_ascii=False)
+            except Exception as e:
+                print(f"Results store read error while streaming {source}: {e}")
+                yield "," + json.dumps({"error": f"Results store read error: {str(e)}"})
+        yield "]"
+
+    return StreamingResponse(generate(), media_type="application/json")
 
 @router.post('/extract_narrators_llm')
 def extract_narrators_llm(input: HadithInput):
@@ -30,91 +84,185 @@ def extract_narrators_llm(input: HadithInput):
         'narrators_chain' : narrators,
         'hadith_content': content
     }
+    _add_resolutions(data)
 
-    file_path = "closed_source_models_results.json"
     try:
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                all_data = json.load(f)
-        else:
-            all_data = []
-        all_data.append(data)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
+        _append_results("closed_source", [data])
     except Exception as e:
-        return {"error": f"File write error: {str(e)}"}
+        return {"error": f"Results store write error: {str(e)}"}
     return data
 
 @router.post("/extract_narrators_ner_dslim")
 def extract_narrators(input: HadithInput):
     if input.language.lower() == "english":
-        narrators = extract_isnad(input.hadith_text)
+        narrators = extract_chain(input.hadith_text, "english").narrators
     data = {
         "hadith_text": input.hadith_text,
         "language": input.language,
         "narrators_chain": narrators
     }
+    _add_resolutions(data)
 
-    file_path = "open_source_models_results.json"
     try:
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                all_data = json.load(f)
-        else:
-            all_data = []
-        all_data.append(data)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
+        _append_results("open_source", [data])
     except Exception as e:
-        return {"error": f"File write error: {str(e)}"}
+        return {"error": f"Results store write error: {str(e)}"}
     return data
 
 @router.post("/extract_narrators_ner_CAMel_Lab")
 def extract_narrators(input: HadithInput):
     if input.language == "arabic":
-        narrators = extract_narrator_chain(input.hadith_text)
+        narrators = extract_chain(input.hadith_text, "arabic").narrators
     data = {
         "hadith_text": input.hadith_text,
         "language": input.language,
         "narrators_chain": narrators
     }
+    _add_resolutions(data)
 
-    file_path = "open_source_models_results.json"
     try:
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                all_data = json.load(f)
-        else:
-            all_data = []
-        all_data.append(data)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(all_data, f, ensure_ascii=False, indent=2)
+        _append_results("open_source", [data])
     except Exception as e:
-        return {"error": f"File write error: {str(e)}"}
+        return {"error": f"Results store write error: {str(e)}"}
     return data
 
 @router.get("/all_narrators_from_llm")
-def get_all_narrators_llm():
-    file_path = "closed_source_models_results.json"
+def get_all_narrators_llm(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
     try:
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                all_data = json.load(f)
-            return all_data
-        else:
-            return [] 
+        return _stream_results("closed_source", offset, limit)
     except Exception as e:
-        return {"error": f"File read error: {str(e)}"}
+        return {"error": f"Results store read error: {str(e)}"}
     
 @router.get("/all_narrators_from_ner")
-def get_all_narrators_ner():
-    file_path = "open_source_models_results.json"
+def get_all_narrators_ner(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)):
     try:
-        if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                all_data = json.load(f)
-            return all_data
-        else:
-            return [] 
+        return _stream_results("open_source", offset, limit)
     except Exception as e:
-        return {"error": f"File read error: {str(e)}"} 
\ No newline at end of file
+        return {"error": f"Results store read error: {str(e)}"}
+
+
+@router.get("/narrators/resolve")
+def resolve_narrator(name: str = Query(..., min_length=1)):
+    resolution = get_gazetteer().resolve(name)
+    return {"name": name, "match": resolution.to_dict() if resolution else None}
+
+
+def _iter_inputs(content_type: str, body: bytes):
+    """Yields (index, HadithInput or error message) from a JSON array or an NDJSON body."""
+    if "ndjson" in content_type:
+        lines = (line for line in body.splitlines() if line.strip())
+        for index, line in enumerate(lines):
+            yield index, _parse_input(line)
+        return
+
+    try:
+        items = json.loads(body)
+    except ValueError as e:
+        yield 0, f"Invalid JSON body: {e}"
+        return
+    if not isinstance(items, list):
+        items = [items]
+    for index, item in enumerate(items):
+        yield index, _parse_input(item)
+
+
+def _parse_input(raw):
+    try:
+        if isinstance(raw, (bytes, str)):
+            raw = json.loads(raw)
+        return HadithInput(**raw)
+    except (ValueError, TypeError, ValidationError) as e:
+        return f"Invalid item: {e}"
+
+
+async def _extract_chunk(extractor, inputs):
+    """Returns one narrator chain (or exception) per input, in order."""
+    if extractor in ("camel", "dslim"):
+        # The rule-based parser serves most items; NER calls for the rest are batched together
+        # by the models' micro-batchers.
+        language = "arabic" if extractor == "camel" else "english"
+
+        def extract(item):
+            return extract_chain(item.hadith_text, language).narrators
+
+        return await map_bounded(lambda i: run_in_threadpool(extract, i), inputs, NER_MICROBATCH_MAX_SIZE)
+    return await map_bounded(lambda i: run_in_threadpool(extract_narrators_chain_with_llm, i.hadith_text),
+                             inputs, LLM_MAX_CONCURRENCY)
+
+
+async def _process_chunk(extractor, chunk):
+    valid = [(index, item) for index, item in chunk
+             if isinstance(item, HadithInput) and item.language.lower() in EXTRACTOR_LANGUAGES[extractor]]
+    results = dict(zip([index for index, _ in valid], await _extract_chunk(extractor, [item for _, item in valid])))
+
+    lines = []
+    records = []
+    for index, item in chunk:
+        if isinstance(item, str):
+            lines.append({"index": index, "error": item})
+            continue
+        if index not in results:
+            lines.append({"index": index, "error": f"Language '{item.language}' is not supported by the {extractor} extractor"})
+            continue
+        result = results[index]
+        if isinstance(result, BaseException):
+            lines.append({"index": index, "error": f"Extraction error: {result!r}"})
+            continue
+        data = {
+            "hadith_text": item.hadith_text,
+            "language": item.language,
+        }
+        if extractor == "llm":
+            data["narrators_chain"], data["hadith_content"] = result
+        else:
+            data["narrators_chain"] = result
+        _add_resolutions(data)
+        records.append(data)
+        lines.append({"index": index, **data})
+
+    if records:
+        try:
+            await run_in_threadpool(_append_results, RESULT_SOURCES[extractor], records)
+        except Exception as e:
+            for line in lines:
+                if "error" not in line:
+                    line["warning"] = f"Results store write error: {str(e)}"
+    return lines
+
+
+async def _process_bulk(extractor, chunk):
+    # Set per chunk: the generator's context is not kept across yields to the response.
+    with llm_priority("bulk"):
+        return await _process_chunk(extractor, chunk)
+
+
+@router.post("/extract_narrators_batch")
+async def extract_narrators_batch(
+    request: Request,
+    extractor: str = Query("camel", pattern="^(dslim|camel|llm)$"),
+    chunk_size: int = Query(32, ge=1, le=1024),
+):
+    """
+    Runs a JSON array or NDJSON upload of hadiths through one extractor in chunks and streams
+    the results back as NDJSON, one line per input with its `index`. The next chunk is only
+    processed once the previous one has been written to the client. Items that fail
+    validation or extraction get an `error` line instead of failing the whole request.
+    """
+    # The body is read up front: Starlette listens for client disconnects on the same receive
+    # channel while a StreamingResponse is running, so it cannot be read from inside generate().
+    body = await request.body()
+    content_type = request.headers.get("content-type", "")
+
+    async def generate():
+        chunk = []
+        for index, item in _iter_inputs(content_type, body):
+            chunk.append((index, item))
+            if len(chunk) >= chunk_size:
+                for line in await _process_bulk(extractor, chunk):
+                    yield json.dumps(line, ensure_ascii=False) + "\n"
+                chunk = []
+        if chunk:
+            for line in await _process_bulk(extractor, chunk):
+                yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -1,9 +1,40 @@
+import json
 from fastapi import APIRouter
-from ..models.query import QueryRequest, QueryResponse
-from ..services.quran_services import validate_hadith
+from fastapi.responses import StreamingResponse
+from ..models.query import QueryRequest, QueryResponse, BatchQueryRequest, BatchQueryResponse
+from ..services.quran_services import avalidate_hadith, avalidate_hadiths, astream_validate_hadith
 
 router = APIRouter()
 
 @router.post("/search", response_model=QueryResponse)
 async def search_ayahs(request: QueryRequest):
-    return validate_hadith(request.query)
\ No newline at end of file
+    return await avalidate_hadith(request.query)
+
+@router.post("/search_batch", response_model=BatchQueryResponse)
+async def search_ayahs_batch(request: BatchQueryRequest):
+    return BatchQueryResponse(responses=await avalidate_hadiths(request.queries))
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/search_stream")
+async def search_ayahs_stream(request: QueryRequest):
+    """
+    Server-sent events for one validation: `narrators`, `ayahs`, one `ayah` per judged ayah
+    and a final `verdict` carrying the same body as /search. A failure ends the stream with
+    an `error` event.
+    """
+    async def generate():
+        try:
+            async for event, data in astream_validate_hadith(request.query):
+                yield _sse(event, data)
+        except Exception as e:
+            yield _sse("error", {"error": str(e)})
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,36 +1,439 @@
-from ..models.query import QueryResponse
-from ..utils.query_ayahs import get_embedding, search_ayahs
-from ..utils.get_hadith import extract_narrators_chain_with_llm
-from ..rag.ayah_filter import filter_relevant_ayahs
-from ..rag.hadith_validaiton import check_relationship
-from ..rag.final_validation import get_hadith_verdict_from_llm
+import asyncio
+import hashlib
+from ..models.query import QueryResponse, BatchQueryError
+from typing import List, Union
+from ..utils.query_ayahs import get_embedding, retrieve_ayahs, aget_embedding, aretrieve_ayahs
+from ..utils.query_ayahs import aget_embeddings, aretrieve_ayahs_batch
+from ..utils.concurrency import map_bounded
+from ..utils.get_hadith import extract_narrators_chain_with_llm, aextract_narrators_chain_with_llm
+from ..utils.get_hadith import template as extraction_prompt
+from ..utils.text import normalize_text
+from ..rag.ayah_filter import filter_relevant_ayahs, afilter_relevant_ayahs
+from ..rag.ayah_filter import prompt as filter_prompt
+from ..rag.hadith_validaiton import classify_ayahs, aclassify_ayahs
+from ..rag.hadith_validaiton import prompt as relationship_prompt
+from ..rag.batch_judgement import judge_ayahs, ajudge_ayahs
+from ..rag.batch_judgement import prompt as judgement_prompt
+from ..rag.final_validation import get_hadith_verdict_from_llm, aget_hadith_verdict_from_llm
+from ..rag.final_validation import prompt as verdict_prompt
+from ..rag.final_validation import HadithVerdict
+from ..rag.prefilter import prefilter_ayahs, aprefilter_ayahs
+from ..rag.isnad_cascade import extract_chain, aextract_chain
+from ..rag.prompt_budget import prompt_settings
+from ..config import LLM_MAX_CONCURRENCY, VALIDATION_MODE, AYAH_SCORE_THRESHOLD
+from ..config import RESULT_CACHE_ENABLED, OPENAI_CHAT_MODEL, GEMINI_MODEL, EMBEDDING_MODEL
+from ..config import RETRIEVAL_MODE, RETRIEVAL_LIMIT, EARLY_EXIT_WAVE_SIZE, EARLY_EXIT_MIN_AGREEING
+from ..config import ISNAD_FAST_PATH, ISNAD_MIN_CONFIDENCE
+from ..config import (
+    PREFILTER_MIN_SCORE, PREFILTER_RERANKER, PREFILTER_MAX_CANDIDATES, PREFILTER_MIN_CANDIDATES, PREFILTER_ADAPTIVE,
+)
+from .result_cache import result_cache
+from ..utils.tracing import traced
+from ..utils.llm_scheduler import llm_priority, llm_call_slots, LLMUnavailableError
 import os
 
-def validate_hadith(query: str):
-    narrators , query = extract_narrators_chain_with_llm(query)
+
+def _fingerprint(*parts) -> str:
+    return hashlib.sha256("\0".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:16]
+
+
+def extraction_fingerprint() -> str:
+    return _fingerprint(extraction_prompt.template, GEMINI_MODEL, ISNAD_FAST_PATH, ISNAD_MIN_CONFIDENCE)
+
+
+def _extract(query: str):
+    """Narrators and hadith content, from the rule-based parser when it is confident and Gemini otherwise."""
+    if not ISNAD_FAST_PATH:
+        return extract_narrators_chain_with_llm(query)
+    result = extract_chain(query, llm=extract_narrators_chain_with_llm)
+    return result.narrators, result.content
+
+
+async def _aextract_uncached(query: str):
+    if not ISNAD_FAST_PATH:
+        return await aextract_narrators_chain_with_llm(query)
+    result = await aextract_chain(query, llm=aextract_narrators_chain_with_llm)
+    return result.narrators, result.content
+
+
+def pipeline_fingerprint(mode: str = VALIDATION_MODE) -> str:
+    """Changes whenever a prompt, model or setting that affects the verdict changes, invalidating cached results."""
+    return _fingerprint(
+        extraction_fingerprint(),
+        filter_prompt.template,
+        relationship_prompt.template,
+        judgement_prompt.template,
+        verdict_prompt.template,
+        OPENAI_CHAT_MODEL,
+        EMBEDDING_MODEL,
+        mode,
+        AYAH_SCORE_THRESHOLD,
+        RETRIEVAL_MODE,
+        RETRIEVAL_LIMIT,
+        PREFILTER_MIN_SCORE,
+        PREFILTER_RERANKER,
+        PREFILTER_MAX_CANDIDATES,
+        PREFILTER_MIN_CANDIDATES,
+        PREFILTER_ADAPTIVE,
+        EARLY_EXIT_WAVE_SIZE,
+        EARLY_EXIT_MIN_AGREEING,
+        *prompt_settings(),
+    )
+
+
+def _cache_key(text: str, fingerprint: str) -> str:
+    return _fingerprint(normalize_text(text), fingerprint)
+
+
+def _cacheable_verdict(response: QueryResponse) -> bool:
+    return bool(response.results.hadith) and not response.results.degraded
+
+
+def _split_by_label(hadith_result: dict, ayahs, labels):
+    for ayah, label in zip(ayahs, labels):
+        if label == "Supported":
+            hadith_result["supported"].append(ayah)
+        elif label == "Contradicted":
+            hadith_result["contradicted"].append(ayah)
+
+
+def _apply_judgements(hadith_result: dict, ayahs, judgements, threshold: int):
+    print("Total ayas before filtering : ", len(ayahs))
+    relevant = [j for j in judgements if j.score >= threshold]
+    print("Number of filtered ayahs are : ", len(relevant))
+    _split_by_label(hadith_result, [ayahs[j.ayah_id] for j in relevant], [j.classification for j in relevant])
+
+
+def _decisive_label(hadith_result: dict, min_agreeing: int = EARLY_EXIT_MIN_AGREEING):
+    supported, contradicted = len(hadith_result["supported"]), len(hadith_result["contradicted"])
+    if supported >= min_agreeing and not contradicted:
+        return "Supported"
+    if contradicted >= min_agreeing and not supported:
+        return "Contradicted"
+    return None
+
+
+def _speculative_verdict(hadith_result: dict, label: str) -> HadithVerdict:
+    """
+    Verdict used instead of the final LLM call when the early-exit criterion is met.
+    Confidence is 1 - 0.5**n for n agreeing ayahs (0.75 for two, 0.875 for three).
+    """
+    agreeing = len(hadith_result[label.lower()])
+    supported = label == "Supported"
+    return HadithVerdict(
+        confidence=round(1 - 0.5 ** agreeing, 3),
+        verdict="Valid" if supported else "Invalid",
+        summary=f"The {agreeing} most relevant ayahs checked all {'support' if supported else 'contradict'} "
+                f"the hadith and none {'contradict' if supported else 'support'} it.",
+    )
+
+
+def _waves(ayahs, size: int = EARLY_EXIT_WAVE_SIZE):
+    ranked = sorted(ayahs, key=lambda ayah: ayah.score, reverse=True)
+    return [ranked[i:i + size] for i in range(0, len(ranked), size)]
+
+
+def _judge_early_exit(query: str, ayahs, hadith_result: dict):
+    for wave in _waves(ayahs):
+        filtered_ayahs = filter_relevant_ayahs(ayahs=wave, hadith_text=query, threshold=AYAH_SCORE_THRESHOLD)
+        _split_by_label(hadith_result, filtered_ayahs, classify_ayahs(query, filtered_ayahs))
+        label = _decisive_label(hadith_result)
+        if label:
+            return _speculative_verdict(hadith_result, label)
+    return None
+
+
+@traced("validate")
+def validate_hadith(query: str, mode: str = VALIDATION_MODE):
+    narrators , query = _extract(query)
     query_vector = get_embedding(query)
 
-    ayahs = search_ayahs(query_vector=query_vector, limit=15)
+    ayahs = retrieve_ayahs(query, query_vector)
+    ayahs = prefilter_ayahs(ayahs, query)
 
-    filtered_ayahs = filter_relevant_ayahs(ayahs=ayahs, hadith_text=query)
+    hadith_result = {
+        "hadith": query,
+        "supported": [],
+        "contradicted": []
+    }
+
+    verdict = None
+    if mode == "batched":
+        judgements = judge_ayahs(ayahs=ayahs, hadith_text=query)
+        _apply_judgements(hadith_result, ayahs, judgements, AYAH_SCORE_THRESHOLD)
+    elif mode == "early_exit":
+        verdict = _judge_early_exit(query, ayahs, hadith_result)
+    else:
+        filtered_ayahs = filter_relevant_ayahs(ayahs=ayahs, hadith_text=query, threshold=AYAH_SCORE_THRESHOLD)
+        labels = classify_ayahs(query, filtered_ayahs)
+        _split_by_label(hadith_result, filtered_ayahs, labels)
+
+    result = verdict or get_hadith_verdict_from_llm(hadith_result)
+    hadith_result['verdict'] = result.verdict
+    hadith_result['summary'] = result.summary
+    hadith_result['confidence'] = result.confidence
+    hadith_result['early_exit'] = verdict is not None
+
+    return QueryResponse(results=hadith_result)
 
+
+async def _aextract(query: str, use_cache: bool):
+    if not use_cache:
+        return await _aextract_uncached(query)
+    narrators, content = await result_cache.get_or_compute(
+        "extraction",
+        _cache_key(query, extraction_fingerprint()),
+        lambda: _aextract_uncached(query),
+        cacheable=lambda result: bool(result[1]),
+    )
+    return narrators, content
+
+
+async def avalidate_hadith(query: str, llm=None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                           mode: str = VALIDATION_MODE, use_cache: bool = RESULT_CACHE_ENABLED):
+    """
+    Async counterpart of `validate_hadith`; every network call is awaited so the event loop
+    is never blocked. In "per_ayah" mode the filter and classification calls run concurrently
+    (at most `max_concurrency` in flight) while the supported/contradicted lists keep the
+    retrieval order. In "batched" mode all ayahs are judged in one call. In "early_exit" mode the ayahs are processed best-first and the
+    pipeline stops, without the verdict call, once the first ayahs agree (see `_decisive_label`);
+    the response then has `early_exit` set.
+
+    With `use_cache`, the response is cached under the normalised hadith text and
+    `pipeline_fingerprint(mode)`; concurrent identical requests share one computation.
+    Responses marked `degraded` (some ayah calls failed) are not cached. When the LLM provider
+    is unavailable (open circuit, retries exhausted) LLMUnavailableError is raised instead.
+    """
+    if not use_cache:
+        return await _avalidate_hadith(query, llm, max_concurrency, mode, use_cache)
+    return await result_cache.get_or_compute(
+        "verdict",
+        _cache_key(query, pipeline_fingerprint(mode)),
+        lambda: _avalidate_hadith(query, llm, max_concurrency, mode, use_cache),
+        dumps=lambda response: response.model_dump_json(),
+        loads=QueryResponse.model_validate_json,
+        cacheable=_cacheable_verdict,
+    )
+
+
+@traced("validate")
+async def _avalidate_hadith(query: str, llm, max_concurrency: int, mode: str, use_cache: bool):
+    narrators, query = await _aextract(query, use_cache)
+    query_vector = await aget_embedding(query)
+
+    ayahs = await aretrieve_ayahs(query, query_vector)
+
+    return await _ajudge(query, ayahs, llm, max_concurrency, mode)
+
+
+async def _ajudge_early_exit(query: str, ayahs, hadith_result: dict, llm, max_concurrency: int, errors: list):
+    """
+    Scores and classifies the ayahs best-first, one wave at a time (calls within a wave run
+    concurrently), and returns a speculative verdict as soon as `_decisive_label` finds one.
+    Returns None when every wave was needed without a decisive signal.
+    """
+    for wave in _waves(ayahs):
+        filtered_ayahs = await afilter_relevant_ayahs(ayahs=wave, hadith_text=query, llm=llm,
+                                                      threshold=AYAH_SCORE_THRESHOLD,
+                                                      max_concurrency=max_concurrency, errors=errors)
+        labels = await aclassify_ayahs(query, filtered_ayahs, llm=llm,
+                                       max_concurrency=max_concurrency, errors=errors)
+        _split_by_label(hadith_result, filtered_ayahs, labels)
+        label = _decisive_label(hadith_result)
+        if label:
+            return _speculative_verdict(hadith_result, label)
+    return None
+
+
+async def _ajudge(query: str, ayahs, llm, max_concurrency: int, mode: str):
+    ayahs = await aprefilter_ayahs(ayahs, query)
     hadith_result = {
         "hadith": query,
         "supported": [],
         "contradicted": []
     }
 
-    for ayah in filtered_ayahs:
-      ayah_text = f"{ayah.english_translation} (Surah: {ayah.surah_name_english}, Ayah: {ayah.aya_number})"
-      label = check_relationship(query, ayah_text)
-      if label == "Supported":
-          hadith_result["supported"].append(ayah)
-      elif label == "Contradicted":
-          hadith_result["contradicted"].append(ayah)
+    verdict = None
+    errors = []
+    if mode == "batched":
+        judgements = await ajudge_ayahs(ayahs=ayahs, hadith_text=query, llm=llm, errors=errors)
+        _apply_judgements(hadith_result, ayahs, judgements, AYAH_SCORE_THRESHOLD)
+    elif mode == "early_exit":
+        verdict = await _ajudge_early_exit(query, ayahs, hadith_result, llm, max_concurrency, errors)
+    else:
+        filtered_ayahs = await afilter_relevant_ayahs(ayahs=ayahs, hadith_text=query, llm=llm,
+                                                      threshold=AYAH_SCORE_THRESHOLD,
+                                                      max_concurrency=max_concurrency, errors=errors)
+        labels = await aclassify_ayahs(query, filtered_ayahs, llm=llm,
+                                       max_concurrency=max_concurrency, errors=errors)
+        _split_by_label(hadith_result, filtered_ayahs, labels)
 
-    result = get_hadith_verdict_from_llm(hadith_result)
+    result = verdict or await aget_hadith_verdict_from_llm(hadith_result, llm=llm)
     hadith_result['verdict'] = result.verdict
     hadith_result['summary'] = result.summary
     hadith_result['confidence'] = result.confidence
+    hadith_result['early_exit'] = verdict is not None
+    hadith_result['degraded'] = bool(errors)
 
     return QueryResponse(results=hadith_result)
+
+
+@traced("validate_batch")
+async def avalidate_hadiths(queries: List[str], llm=None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                            mode: str = VALIDATION_MODE, use_cache: bool = RESULT_CACHE_ENABLED) -> List[Union[QueryResponse, BatchQueryError]]:
+    """
+    Validates a batch of hadiths for the batch API and offline jobs.
+
+    With `use_cache`, hadiths with a fresh cached verdict are served from it. The rest are
+    extracted concurrently, then embedded with batched `embed_documents` calls and searched with
+    one batched vector query; identical hadiths are embedded and searched once. The judgement
+    stage runs per hadith, and all LLM calls of the batch share `max_concurrency` slots.
+    Responses are returned in input order; a hadith that fails, or whose content could not be
+    extracted, gets a BatchQueryError in its place; an unavailable LLM provider fails the whole
+    batch with LLMUnavailableError. LLM calls are scheduled as "bulk", so interactive searches
+    keep part of the rate-limit budget.
+    """
+    with llm_priority("bulk"), llm_call_slots(max_concurrency):
+        return await _avalidate_hadiths(queries, llm, max_concurrency, mode, use_cache)
+
+
+async def _avalidate_hadiths(queries, llm, max_concurrency, mode, use_cache):
+    responses = [None] * len(queries)
+    keys = [_cache_key(query, pipeline_fingerprint(mode)) for query in queries]
+    if use_cache:
+        for i, key in enumerate(keys):
+            responses[i] = await result_cache.get("verdict", key, loads=QueryResponse.model_validate_json)
+    pending = [i for i, response in enumerate(responses) if response is None]
+
+    extracted = await map_bounded(lambda i: _aextract(queries[i], use_cache), pending, max_concurrency)
+    texts = {}
+    for i, result in zip(pending, extracted):
+        if isinstance(result, LLMUnavailableError):
+            raise result
+        if isinstance(result, BaseException):
+            responses[i] = BatchQueryError(error=f"Extraction error: {result!r}")
+        elif not result[1]:
+            responses[i] = BatchQueryError(error="No hadith content could be extracted")
+        else:
+            texts[i] = result[1]
+    if not texts:
+        return responses
+
+    indices = list(texts)
+    try:
+        vectors = await aget_embeddings([texts[i] for i in indices])
+        ayah_lists = await aretrieve_ayahs_batch([texts[i] for i in indices], vectors)
+    except Exception as e:
+        for i in indices:
+            responses[i] = BatchQueryError(error=f"Retrieval error: {e!r}")
+        return responses
+
+    judged = await map_bounded(
+        lambda item: _ajudge(texts[item[0]], item[1], llm, max_concurrency, mode),
+        list(zip(indices, ayah_lists)),
+        max_concurrency,
+    )
+    for i, response in zip(indices, judged):
+        if isinstance(response, LLMUnavailableError):
+            raise response
+        if isinstance(response, BaseException):
+            responses[i] = BatchQueryError(error=f"Validation error: {response!r}")
+            continue
+        responses[i] = response
+        if use_cache and _cacheable_verdict(response):
+            await result_cache.put("verdict", keys[i], response, dumps=lambda r: r.model_dump_json())
+    return responses
+
+
+async def _astream_labels(query: str, ayahs, llm, max_concurrency: int, errors: list):
+    """
+    Scores and classifies each ayah independently and yields (index, label) as soon as that
+    ayah is done; the label is None when the ayah fell below the relevance threshold.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def judge(index, ayah):
+        async with semaphore:
+            relevant = await afilter_relevant_ayahs(ayahs=[ayah], hadith_text=query, llm=llm,
+                                                    threshold=AYAH_SCORE_THRESHOLD, errors=errors)
+            labels = await aclassify_ayahs(query, relevant, llm=llm, errors=errors)
+        return index, labels[0] if labels else None
+
+    tasks = [asyncio.ensure_future(judge(i, ayah)) for i, ayah in enumerate(ayahs)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client may disconnect mid-stream; don't leave LLM calls running for nobody.
+        for task in tasks:
+            task.cancel()
+
+
+async def astream_validate_hadith(query: str, llm=None, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                                  mode: str = VALIDATION_MODE, use_cache: bool = RESULT_CACHE_ENABLED):
+    """
+    Runs the same pipeline as `avalidate_hadith` but yields (event, data) pairs as each stage
+    finishes: "narrators", "ayahs" (retrieved and pre-filtered), one "ayah" per judged ayah
+    (in completion order, with its `index` in the "ayahs" list) and finally "verdict" with the full
+    QueryResponse. With `use_cache`, a fresh cached verdict is replayed as the same events (its
+    "ayahs" are then only the supported and contradicted ones) and a new verdict is stored once
+    the stream completes.
+    """
+    key = _cache_key(query, pipeline_fingerprint(mode))
+    cached = await result_cache.get("verdict", key, loads=QueryResponse.model_validate_json) if use_cache else None
+    narrators, query = await _aextract(query, use_cache)
+    yield "narrators", {"hadith": query, "narrators": narrators}
+    if cached is not None:
+        judged = [(ayah, "Supported") for ayah in cached.results.supported]
+        judged += [(ayah, "Contradicted") for ayah in cached.results.contradicted]
+        yield "ayahs", {"ayahs": [ayah.model_dump() for ayah, _ in judged]}
+        for index, (ayah, label) in enumerate(judged):
+            yield "ayah", {"index": index, "ayah": ayah.model_dump(), "label": label}
+        yield "verdict", cached.model_dump()
+        return
+
+    query_vector = await aget_embedding(query)
+    ayahs = await aprefilter_ayahs(await aretrieve_ayahs(query, query_vector), query)
+    if mode == "early_exit":
+        ayahs = [ayah for wave in _waves(ayahs) for ayah in wave]
+    yield "ayahs", {"ayahs": [ayah.model_dump() for ayah in ayahs]}
+
+    hadith_result = {
+        "hadith": query,
+        "supported": [],
+        "contradicted": []
+    }
+
+    verdict = None
+    errors = []
+    if mode == "batched":
+        judgements = await ajudge_ayahs(ayahs=ayahs, hadith_text=query, llm=llm, errors=errors)
+        for j in judgements:
+            label = j.classification if j.score >= AYAH_SCORE_THRESHOLD else None
+            yield "ayah", {"index": j.ayah_id, "ayah": ayahs[j.ayah_id].model_dump(), "label": label}
+        _apply_judgements(hadith_result, ayahs, judgements, AYAH_SCORE_THRESHOLD)
+    else:
+        waves = _waves(ayahs) if mode == "early_exit" else [ayahs]
+        offset = 0
+        for wave in waves:
+            labels = [None] * len(wave)
+            async for i, label in _astream_labels(query, wave, llm, max_concurrency, errors):
+                labels[i] = label
+                yield "ayah", {"index": offset + i, "ayah": wave[i].model_dump(), "label": label}
+            offset += len(wave)
+            _split_by_label(hadith_result, wave, labels)
+            decisive = _decisive_label(hadith_result) if mode == "early_exit" else None
+            if decisive:
+                verdict = _speculative_verdict(hadith_result, decisive)
+                break
+
+    result = verdict or await aget_hadith_verdict_from_llm(hadith_result, llm=llm)
+    hadith_result['verdict'] = result.verdict
+    hadith_result['summary'] = result.summary
+    hadith_result['confidence'] = result.confidence
+    hadith_result['early_exit'] = verdict is not None
+    hadith_result['degraded'] = bool(errors)
+    response = QueryResponse(results=hadith_result)
+    if use_cache and _cacheable_verdict(response):
+        await result_cache.put("verdict", key, response, dumps=lambda r: r.model_dump_json())
+    yield "verdict", response.model_dump()
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+from ..config import (
+    RESULT_CACHE_BACKEND, RESULT_CACHE_REDIS_URL, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_TTL, RESULT_CACHE_STALE_TTL,
+)
+
+
+class InMemoryBackend:
+    """Process-local LRU backend. Values are strings; `ttl` is the hard expiry in seconds."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and time.time() > expires_at:
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        self._data[key] = (value, time.time() + ttl if ttl else None)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+
+class RedisBackend:
+    """Backend over any client with the redis.asyncio `get`/`set(..., ex=)` interface."""
+
+    def __init__(self, client, prefix: str = "hadith:"):
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        value = await self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode("utf-8")
+        return value
+
+    async def set(self, key: str, value: str, ttl: Optional[float] = None):
+        await self.client.set(self.prefix + key, value, ex=int(ttl) if ttl else None)
+
+
+class FakeRedis:
+    """In-process stand-in for redis.asyncio.Redis covering what RedisBackend uses; for local tests."""
+
+    def __init__(self):
+        self._data = {}
+
+    async def get(self, name):
+        entry = self._data.get(name)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and time.time() > expires_at:
+            del self._data[name]
+            return None
+        return value.encode("utf-8")
+
+    async def set(self, name, value, ex=None):
+        self._data[name] = (value, time.time() + ex if ex else None)
+        return True
+
+
+class ResultCache:
+    """
+    Async result cache with stale-while-revalidate and single-flight computation.
+
+    An entry is fresh for `fresh_ttl` seconds and may then be served stale for another
+    `stale_ttl` seconds while one background task recomputes it. Concurrent misses for the
+    same key share a single in-flight computation. Counters are kept per stage.
+    """
+
+    def __init__(self, backend, fresh_ttl: float, stale_ttl: float):
+        self.backend = backend
+        self.fresh_ttl = fresh_ttl
+        self.stale_ttl = stale_ttl
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, stage: str, counter: str):
+        stats = self._stats.setdefault(
+            stage, {"hits": 0, "stale_hits": 0, "misses": 0, "coalesced": 0, "refreshes": 0, "errors": 0}
+        )
+        stats[counter] += 1
+
+    async def get_or_compute(
+        self,
+        stage: str,
+        key: str,
+        compute: Callable[[], Awaitable[object]],
+        dumps: Callable[[object], str] = json.dumps,
+        loads: Callable[[str], object] = json.loads,
+        cacheable: Callable[[object], bool] = lambda value: True,
+    ):
+        key = f"{stage}:{key}"
+        raw = None
+        try:
+            raw = await self.backend.get(key)
+        except Exception as e:
+            self._count(stage, "errors")
+            print(f"Result cache read error ({stage}): {e}")
+
+        if raw is not None:
+            entry = json.loads(raw)
+            value = loads(entry["value"])
+            if time.time() - entry["created_at"] <= self.fresh_ttl:
+                self._count(stage, "hits")
+                return value
+            self._count(stage, "stale_hits")
+            if key not in self._inflight:
+                self._count(stage, "refreshes")
+                self._start(stage, key, compute, dumps, cacheable)
+            return value
+
+        if key in self._inflight:
+            self._count(stage, "coalesced")
+        else:
+            self._count(stage, "misses")
+            self._start(stage, key, compute, dumps, cacheable)
+        return await asyncio.shield(self._inflight[key])
+
+    async def get(self, stage: str, key: str, loads: Callable[[str], object] = json.loads):
+        """
+        The fresh value for `key`, or None, for callers that compute misses themselves and store
+        them with `put` (such as the batch API). Stale entries count as misses here.
+        """
+        key = f"{stage}:{key}"
+        try:
+            raw = await self.backend.get(key)
+        except Exception as e:
+            self._count(stage, "errors")
+            print(f"Result cache read error ({stage}): {e}")
+            raw = None
+        if raw is not None:
+            entry = json.loads(raw)
+            if time.time() - entry["created_at"] <= self.fresh_ttl:
+                self._count(stage, "hits")
+                return loads(entry["value"])
+        self._count(stage, "misses")
+        return None
+
+    async def put(self, stage: str, key: str, value, dumps: Callable[[object], str] = json.dumps):
+        await self._write(stage, f"{stage}:{key}", value, dumps)
+
+    async def _write(self, stage, key, value, dumps):
+        entry = json.dumps({"value": dumps(value), "created_at": time.time()})
+        try:
+            await self.backend.set(key, entry, ttl=self.fresh_ttl + self.stale_ttl)
+        except Exception as e:
+            self._count(stage, "errors")
+            print(f"Result cache write error ({stage}): {e}")
+
+    def _start(self, stage, key, compute, dumps, cacheable):
+        async def run():
+            try:
+                value = await compute()
+                if cacheable(value):
+                    await self._write(stage, key, value, dumps)
+                return value
+            finally:
+                self._inflight.pop(key, None)
+
+        task = asyncio.ensure_future(run())
+        # A background refresh nobody awaits must not log "exception was never retrieved".
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._inflight[key] = task
+
+    def stats(self) -> dict:
+        result = {}
+        for stage, counters in self._stats.items():
+            lookups = counters["hits"] + counters["stale_hits"] + counters["misses"] + counters["coalesced"]
+            served = counters["hits"] + counters["stale_hits"]
+            result[stage] = dict(counters, hit_rate=served / lookups if lookups else 0.0)
+        return result
+
+
+def _make_backend():
+    if RESULT_CACHE_BACKEND == "redis":
+        import redis.asyncio as redis
+
+        return RedisBackend(redis.from_url(RESULT_CACHE_REDIS_URL))
+    if RESULT_CACHE_BACKEND == "fakeredis":
+        return RedisBackend(FakeRedis())
+    return InMemoryBackend(RESULT_CACHE_MAX_ENTRIES)
+
+
+result_cache = ResultCache(_make_backend(), fresh_ttl=RESULT_CACHE_TTL, stale_ttl=RESULT_CACHE_STALE_TTL)
@@ -0,0 +1,26 @@
+import asyncio
+from typing import Awaitable, Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+async def map_bounded(
+    func: Callable[[T], Awaitable[R]],
+    items: Iterable[T],
+    max_concurrency: int,
+) -> List[object]:
+    """
+    Awaits func(item) for every item with at most `max_concurrency` calls in flight.
+
+    Results are returned in the same order as `items`. A call that raises does not cancel its
+    siblings; its exception is returned in its slot. LLM calls are bounded per attempt by the
+    scheduler's LLM_CALL_TIMEOUT rather than here.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(item):
+        async with semaphore:
+            return await func(item)
+
+    return await asyncio.gather(*(run(item) for item in items), return_exceptions=True)
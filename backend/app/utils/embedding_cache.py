@@ -0,0 +1,158 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+from .text import normalize_text
+from ..config import (
+    EMBEDDING_CACHE_MAX_ENTRIES, EMBEDDING_CACHE_TTL, EMBEDDING_CACHE_DISK_PATH, EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+)
+
+
+def embedding_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of float32 embeddings.
+
+    Keys are the SHA-256 of the model name and the normalised text, so the same hadith with
+    different whitespace, diacritics or punctuation hits the same entry. An in-process LRU tier
+    sits in front of an optional SQLite tier on disk; both honour `ttl` seconds (0 disables
+    expiry) and their own size limits.
+    """
+
+    def __init__(self, max_entries: int, ttl: float = 0, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self.disk_max_entries = disk_max_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._disk_puts = 0
+        if disk_path:
+            conn = self._connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS embeddings (
+                        key TEXT PRIMARY KEY,
+                        vector BLOB NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed ON embeddings (accessed_at)")
+            finally:
+                conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.disk_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return conn
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl) and now - created_at > self.ttl
+
+    def get(self, text: str, model: str) -> Optional[np.ndarray]:
+        key = embedding_key(text, model)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                vector, created_at = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return vector
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        if self.disk_path:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                    row = None
+                    with self._lock:
+                        self._counters["expired"] += 1
+                elif row is not None:
+                    conn.execute("UPDATE embeddings SET accessed_at = ? WHERE key = ?", (now, key))
+            finally:
+                conn.close()
+            if row is not None:
+                vector = np.frombuffer(row[0], dtype=np.float32)
+                with self._lock:
+                    self._counters["disk_hits"] += 1
+                    self._store_memory(key, vector, row[1])
+                return vector
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, text: str, model: str, vector) -> np.ndarray:
+        key = embedding_key(text, model)
+        vector = np.asarray(vector, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            self._store_memory(key, vector, now)
+        if self.disk_path:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, vector.tobytes(), now, now),
+                )
+                with self._lock:
+                    self._disk_puts += 1
+                    trim = self._disk_puts % 64 == 0
+                # Trimming scans the access index, so it is done every 64 writes rather than on each one.
+                if self.disk_max_entries and trim:
+                    conn.execute("""
+                        DELETE FROM embeddings WHERE key IN (
+                            SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                        )
+                    """, (self.disk_max_entries,))
+            finally:
+                conn.close()
+        return vector
+
+    def _store_memory(self, key, vector, created_at):
+        self._memory[key] = (vector, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.disk_path:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM embeddings")
+            finally:
+                conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=EMBEDDING_CACHE_MAX_ENTRIES,
+    ttl=EMBEDDING_CACHE_TTL,
+    disk_path=EMBEDDING_CACHE_DISK_PATH or None,
+    disk_max_entries=EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+)
@@ -1,11 +1,14 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
+from ..clients import registry
 from dotenv import load_dotenv
 from langchain_core.prompts import PromptTemplate
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import json
 import re
 import os
+from .tracing import traced
+from .llm_scheduler import scheduled, LLMUnavailableError
+from ..config import GEMINI_MODEL
 
 load_dotenv()
 
@@ -23,32 +26,56 @@ template = PromptTemplate(
     input_variables=['hadith_text']
 )
 
-def extract_narrators_chain_with_llm(hadith_text: str) -> List[str]:
-    llm = ChatGoogleGenerativeAI(model='gemini-2.5-pro',
-                                google_api_key = os.getenv("GOOGLE_API_KEY"))
+def _parse_response(response):
+    content = response.hadith_content
+    narators = response.narators_chain
+
+    if isinstance(narators, str):
+        try:
+            narrators = json.loads(narators)
+            if isinstance(narrators, list):
+                return narrators , content
+        except Exception:
+            narrators = [n.strip(' ",') for n in re.split(r'\n|,', narators) if n.strip()]
+            return narrators , content
+    elif isinstance(narators, list):
+        return narators , content
+    return [f"Unexpected narrators format: {type(narators)}"], content
+
+
+@traced("extraction")
+def extract_narrators_chain_with_llm(hadith_text: str) -> Tuple[List[str], str]:
+    llm = registry.gemini()
 
     prompt = template.invoke({
         'hadith_text': hadith_text
     })
 
     try:
-        structured_output = llm.with_structured_output(HadithOuput)
+        structured_output = scheduled(llm.with_structured_output(HadithOuput), "gemini", GEMINI_MODEL)
         response = structured_output.invoke(prompt)
-        content = response.hadith_content
-        narators = response.narators_chain
-
-        if isinstance(narators, str):
-            try:
-                narrators = json.loads(narators)
-                if isinstance(narrators, list):
-                    return narrators , content
-            except Exception:
-                narrators = [n.strip(' ",') for n in re.split(r'\n|,', narators) if n.strip()]
-                return narrators , content
-        elif isinstance(narators, list):
-            return narators , content
-        else:
-            return [f"Unexpected narrators format: {type(narators)}"]
+        return _parse_response(response)
+
+    except LLMUnavailableError:
+        raise
+    except Exception as e:
+        return [f"LLM extraction error: {str(e)}"], ""
+
+
+@traced("extraction")
+async def aextract_narrators_chain_with_llm(hadith_text: str) -> Tuple[List[str], str]:
+    llm = registry.gemini()
+
+    prompt = await template.ainvoke({
+        'hadith_text': hadith_text
+    })
+
+    try:
+        structured_output = scheduled(llm.with_structured_output(HadithOuput), "gemini", GEMINI_MODEL)
+        response = await structured_output.ainvoke(prompt)
+        return _parse_response(response)
 
+    except LLMUnavailableError:
+        raise
     except Exception as e:
-        return [f"LLM extraction error: {str(e)}"]
+        return [f"LLM extraction error: {str(e)}"], ""
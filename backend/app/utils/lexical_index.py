@@ -0,0 +1,114 @@
+import math
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from .text import normalize_text
+from .local_index import get_local_index
+from ..models.query import AyahResult
+
+
+def tokenize(text: str) -> List[str]:
+    return normalize_text(text).split()
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over ayah documents.
+
+    Each document is the English translation plus the diacritic-free Arabic text, so both
+    English and Arabic hadith wording can match. Postings are stored as NumPy arrays and a
+    query only touches the postings of its own terms.
+    """
+
+    def __init__(self, documents: Sequence[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(documents)
+        postings = defaultdict(lambda: ([], []))
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for row, document in enumerate(documents):
+            counts = Counter(tokenize(document))
+            lengths[row] = sum(counts.values())
+            for term, tf in counts.items():
+                postings[term][0].append(row)
+                postings[term][1].append(tf)
+
+        self.lengths = lengths
+        self.avg_length = float(lengths.mean()) if self.size else 0.0
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray, float]] = {}
+        for term, (rows, tfs) in postings.items():
+            df = len(rows)
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            self.postings[term] = (np.array(rows, dtype=np.int32), np.array(tfs, dtype=np.float32), idf)
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Returns up to `limit` (row, BM25 score) pairs, best first; rows with no matching term are skipped."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self.postings:
+                continue
+            rows, tfs, idf = self.postings[term]
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[rows] / self.avg_length)
+            scores[rows] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        top = matched[np.argsort(-scores[matched])[:limit]]
+        return [(int(row), float(scores[row])) for row in top]
+
+
+def ayah_key(ayah: AyahResult):
+    return ayah.surah_name_english, ayah.aya_number
+
+
+def fuse_rrf(rankings: Sequence[Sequence[AyahResult]], limit: int, k: int = 60) -> List[AyahResult]:
+    """
+    Reciprocal-rank fusion: each ayah scores sum(1 / (k + rank)) over the rankings it appears in.
+    The returned ayahs keep the `score` of their first occurrence (the vector similarity when
+    the vector ranking is passed first).
+    """
+    fused = {}
+    ayahs = {}
+    for ranking in rankings:
+        for rank, ayah in enumerate(ranking, start=1):
+            key = ayah_key(ayah)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            ayahs.setdefault(key, ayah)
+    ordered = sorted(fused, key=fused.get, reverse=True)[:limit]
+    return [ayahs[key] for key in ordered]
+
+
+_lexical = None
+_lexical_lock = threading.Lock()
+
+
+def get_lexical_index() -> LexicalIndex:
+    """Builds the BM25 index from the local snapshot's payload columns on first use."""
+    global _lexical
+    with _lexical_lock:
+        if _lexical is None:
+            payload = get_local_index().payload
+            documents = [
+                f"{english} {arabic}"
+                for english, arabic in zip(payload["english_translation"], payload["arabic_diacritics"])
+            ]
+            _lexical = LexicalIndex(documents)
+        return _lexical
+
+
+def lexical_search(query_text: str, query_vector: List[float], limit: int) -> List[AyahResult]:
+    """
+    BM25 hits as AyahResults. Their `score` is the cosine similarity to `query_vector`, computed
+    from the local snapshot, so lexical-only hits stay comparable with vector hits downstream.
+    """
+    index = get_local_index()
+    hits = get_lexical_index().search(query_text, limit)
+    if not hits:
+        return []
+    rows = np.array([row for row, _ in hits])
+    query = np.array(query_vector, dtype=np.float32)
+    query /= max(float(np.linalg.norm(query)), 1e-12)
+    similarities = np.asarray(index.vectors[rows]) @ query
+    return [index.result_for_row(int(row), float(score)) for row, score in zip(rows, similarities)]
@@ -0,0 +1,391 @@
+import asyncio
+import contextvars
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Optional, Tuple
+from langchain_core.language_models import BaseLanguageModel
+from langchain_core.runnables import RunnableLambda
+from .metrics import metrics, RETRIES
+from .tracing import llm_metrics
+from ..config import (
+    LLM_SCHEDULER_ENABLED, OPENAI_RPM, OPENAI_TPM, GEMINI_RPM, GEMINI_TPM, LLM_RATE_LIMITS,
+    LLM_EXPECTED_OUTPUT_TOKENS, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX,
+    LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET, LLM_BULK_RESERVE, LLM_CALL_TIMEOUT,
+)
+
+QUEUE_WAIT = metrics.histogram(
+    "hadith_llm_queue_wait_seconds", "Time LLM calls waited for rate-limit capacity.", ["limiter", "priority"]
+)
+REJECTIONS = metrics.counter("hadith_llm_circuit_rejections_total", "Calls refused by an open circuit.", ["limiter"])
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+_RETRYABLE_NAMES = ("RateLimit", "ResourceExhausted", "ServiceUnavailable", "Timeout", "Connection", "InternalServer")
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("llm_priority", default="interactive")
+_slots: contextvars.ContextVar[Optional[asyncio.Semaphore]] = contextvars.ContextVar("llm_call_slots", default=None)
+
+
+class LLMUnavailableError(RuntimeError):
+    """The provider could not serve a call: its circuit is open or every retry failed."""
+
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+
+def raise_if_unavailable(results):
+    """
+    Re-raises the first LLMUnavailableError among `map_bounded` results. Other failures only
+    degrade a verdict, but with the provider down the rest of the request would fail the same way.
+    """
+    for result in results:
+        if isinstance(result, LLMUnavailableError):
+            raise result
+
+
+@contextmanager
+def llm_priority(level: str):
+    """LLM calls made inside the block (including tasks it starts) are scheduled as `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def llm_call_slots(limit: int):
+    """
+    Async LLM calls made inside the block (including tasks it starts) share `limit` slots,
+    however many levels of bounded fan-out they are nested in.
+    """
+    token = _slots.set(asyncio.Semaphore(max(1, limit)))
+    try:
+        yield
+    finally:
+        _slots.reset(token)
+
+
+def _call_slot():
+    slots = _slots.get()
+    return slots if slots is not None else nullcontext()
+
+
+def status_code(error) -> Optional[int]:
+    for attr in ("status_code", "code", "status"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    return getattr(getattr(error, "response", None), "status_code", None)
+
+
+def is_retryable(error) -> bool:
+    if status_code(error) in RETRYABLE_STATUS:
+        return True
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    return any(name in type(error).__name__ for name in _RETRYABLE_NAMES)
+
+
+def retry_after(error) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute up to one minute's worth; 0 means unlimited."""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, floor: float) -> float:
+        """Seconds until `amount` can be taken while leaving `floor` (a fraction of capacity) in the bucket."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single request bigger than the bucket would otherwise never fit.
+        needed = min(amount, self.capacity * (1 - floor)) + floor * self.capacity
+        return max(0.0, (needed - self.level) / self.rate)
+
+    def take(self, amount: float):
+        if self.rate > 0:
+            self.level -= amount
+
+
+class CircuitBreaker:
+    """
+    Closed until `threshold` consecutive failures, then open for `reset_timeout` seconds, after
+    which one probe call is let through (half-open); its outcome closes or re-opens the circuit.
+    A probe that reports no outcome within another `reset_timeout` is replaced by a new one.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            since = self.opened_at if self.state == "open" else self.probe_started
+            if now - since >= self.reset_timeout:
+                self.state = "half_open"
+                self.probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def record_abandoned(self):
+        """A call was cancelled; if it was the probe, re-open rather than stay half-open."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+class Limiter:
+    """
+    Rate limits, retries and circuit breaking for one (provider, model). Each async attempt is
+    bounded by `call_timeout` seconds, excluding the wait for capacity and the backoff; sync
+    attempts rely on the client's own request timeout.
+    """
+
+    def __init__(self, key: str, rpm: int, tpm: int, max_retries: int = LLM_MAX_RETRIES,
+                 backoff_base: float = LLM_BACKOFF_BASE, backoff_max: float = LLM_BACKOFF_MAX,
+                 bulk_reserve: float = LLM_BULK_RESERVE, call_timeout: float = LLM_CALL_TIMEOUT):
+        self.key = key
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.breaker = CircuitBreaker(LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bulk_reserve = bulk_reserve
+        self.call_timeout = call_timeout
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "retries": 0, "failures": 0, "rejections": 0, "throttled_seconds": 0.0}
+
+    def _try_acquire(self, tokens: int, priority: str) -> float:
+        """Takes one request and `tokens` tokens and returns 0, or returns how long to wait first."""
+        floor = self.bulk_reserve if priority == "bulk" else 0.0
+        with self._lock:
+            wait = max(self.requests.wait_time(1, floor), self.tokens.wait_time(tokens, floor))
+            if wait == 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+            return wait
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self._count("rejections")
+            REJECTIONS.inc(limiter=self.key)
+            raise CircuitOpenError(f"Circuit for {self.key} is open after repeated failures")
+
+    def _backoff(self, attempt: int, error) -> float:
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        hint = retry_after(error)
+        return max(delay, hint) if hint is not None else delay
+
+    def _count(self, counter: str, amount: float = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def _failed(self, attempt: int, error) -> Optional[float]:
+        """Records a failed attempt; returns the backoff before the next one, or None to give up."""
+        if not is_retryable(error):
+            # The provider answered; this is a problem with the request, not with the provider.
+            self.breaker.record_success()
+            return None
+        self._count("failures")
+        self.breaker.record_failure()
+        if attempt >= self.max_retries:
+            return None
+        self._count("retries")
+        RETRIES.inc(operation=self.key)
+        return self._backoff(attempt, error)
+
+    def _give_up(self, attempt: int, error):
+        if is_retryable(error):
+            raise LLMUnavailableError(f"{self.key} still failing after {attempt + 1} attempts: {error!r}") from error
+        raise error
+
+    def _waited(self, started: float, priority: str):
+        waited = time.monotonic() - started
+        self._count("throttled_seconds", waited)
+        QUEUE_WAIT.observe(waited, limiter=self.key, priority=priority)
+
+    def run(self, call, tokens: int, priority: Optional[str] = None):
+        priority = priority or _priority.get()
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            started = time.monotonic()
+            while (wait := self._try_acquire(tokens, priority)) > 0:
+                time.sleep(wait)
+            self._waited(started, priority)
+            self._count("calls")
+            try:
+                result = call()
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    self._give_up(attempt, e)
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.record_abandoned()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def arun(self, call, tokens: int, priority: Optional[str] = None):
+        priority = priority or _priority.get()
+        for attempt in range(self.max_retries + 1):
+            self._check_breaker()
+            started = time.monotonic()
+            while (wait := self._try_acquire(tokens, priority)) > 0:
+                await asyncio.sleep(wait)
+            self._waited(started, priority)
+            self._count("calls")
+            try:
+                async with _call_slot():
+                    result = await asyncio.wait_for(call(), self.call_timeout) if self.call_timeout else await call()
+            except Exception as e:
+                delay = self._failed(attempt, e)
+                if delay is None:
+                    self._give_up(attempt, e)
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled, e.g. because the client went away.
+                self.breaker.record_abandoned()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._counters)
+        stats["circuit"] = self.breaker.state
+        return stats
+
+
+def _parse_overrides(spec: str) -> Dict[str, Tuple[int, int]]:
+    overrides = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, limits = item.partition("=")
+        rpm, _, tpm = limits.partition("/")
+        overrides[model.strip()] = (int(rpm or 0), int(tpm or 0))
+    return overrides
+
+
+PROVIDER_LIMITS = {"openai": (OPENAI_RPM, OPENAI_TPM), "gemini": (GEMINI_RPM, GEMINI_TPM)}
+
+
+class LLMScheduler:
+    """
+    Process-wide registry of one `Limiter` per (provider, model), so every call to the same
+    model shares its budget whichever module makes it.
+    """
+
+    def __init__(self, overrides: Dict[str, Tuple[int, int]]):
+        self.overrides = overrides
+        self._limiters: Dict[str, Limiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, provider: str, model: str) -> Limiter:
+        key = f"{provider}:{model}"
+        with self._lock:
+            if key not in self._limiters:
+                short_model = model.split("/")[-1]
+                rpm, tpm = self.overrides.get(short_model) or PROVIDER_LIMITS.get(provider, (0, 0))
+                self._limiters[key] = Limiter(key, rpm, tpm)
+            return self._limiters[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {key: limiter.stats() for key, limiter in limiters.items()}
+
+
+scheduler = LLMScheduler(_parse_overrides(LLM_RATE_LIMITS))
+
+
+def provider_of(llm) -> str:
+    name = type(llm).__name__
+    if "Google" in name or "Gemini" in name:
+        return "gemini"
+    if "OpenAI" in name:
+        return "openai"
+    return "other"
+
+
+def _estimate_tokens(prompt) -> int:
+    from ..rag.prompt_budget import count_tokens
+
+    text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+    return count_tokens(text) + LLM_EXPECTED_OUTPUT_TOKENS
+
+
+def _with_llm_metrics(runnable):
+    """Models built by the client registry report to `llm_metrics` already; injected ones do not."""
+    if isinstance(runnable, BaseLanguageModel) and llm_metrics not in (runnable.callbacks or []):
+        return runnable.with_config(callbacks=[llm_metrics])
+    return runnable
+
+
+def scheduled(runnable, provider: Optional[str] = None, model: Optional[str] = None):
+    """
+    Wraps an LLM (or any runnable calling one) so that each call goes through the shared
+    scheduler: it waits for RPM/TPM capacity at the current `llm_priority`, is retried with
+    backoff on retryable errors and fails fast with CircuitOpenError while the circuit is open.
+    A call that is still failing when its retries run out raises LLMUnavailableError.
+    Async calls inside `llm_call_slots` also hold one of its slots while they run, and each async
+    attempt is bounded by LLM_CALL_TIMEOUT, with the scheduler disabled too. A bare model without
+    the `llm_metrics` callback gets it, so its calls are timed and traced too.
+    """
+    target = _with_llm_metrics(runnable)
+    if not LLM_SCHEDULER_ENABLED:
+        async def aunscheduled(prompt, config=None):
+            async with _call_slot():
+                call = target.ainvoke(prompt, config)
+                return await asyncio.wait_for(call, LLM_CALL_TIMEOUT) if LLM_CALL_TIMEOUT else await call
+
+        return RunnableLambda(target.invoke, afunc=aunscheduled, name="unscheduled")
+    from ..rag.judgement_cache import model_name
+
+    limiter = scheduler.limiter(provider or provider_of(runnable), model or model_name(runnable))
+
+    def invoke(prompt, config=None):
+        return limiter.run(lambda: target.invoke(prompt, config), _estimate_tokens(prompt))
+
+    async def ainvoke(prompt, config=None):
+        return await limiter.arun(lambda: target.ainvoke(prompt, config), _estimate_tokens(prompt))
+
+    return RunnableLambda(invoke, afunc=ainvoke, name=f"scheduled:{limiter.key}")
@@ -0,0 +1,130 @@
+import json
+import os
+import sys
+import threading
+from typing import List
+import numpy as np
+from ..models.query import AyahResult
+from ..config import LOCAL_INDEX_PATH, QDRANT_COLLECTION
+
+PAYLOAD_COLUMNS = ["english_translation", "surah_name_english", "aya_number", "arabic_diacritics"]
+
+
+def export_snapshot(client, path: str = LOCAL_INDEX_PATH, collection: str = QDRANT_COLLECTION,
+                    batch_size: int = 256) -> int:
+    """
+    Writes every point of a Qdrant collection to a local snapshot directory:
+
+    - vectors.f32   row-major float32 matrix of L2-normalised vectors (memory-mapped on load)
+    - payload.npz   one array per payload column, in the same row order
+    - meta.json     row count, dimension and source collection
+    """
+    vectors = []
+    columns = {name: [] for name in PAYLOAD_COLUMNS}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for point in points:
+            vectors.append(point.vector)
+            columns["english_translation"].append(point.payload["english_translation"])
+            columns["surah_name_english"].append(point.payload["surah_name_english"])
+            columns["aya_number"].append(point.payload["aya_number"])
+            columns["arabic_diacritics"].append(point.payload.get("arabic_diacritics", ""))
+        if offset is None:
+            break
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+    os.makedirs(path, exist_ok=True)
+    matrix.tofile(os.path.join(path, "vectors.f32"))
+    np.savez(
+        os.path.join(path, "payload.npz"),
+        english_translation=np.array(columns["english_translation"], dtype=str),
+        surah_name_english=np.array(columns["surah_name_english"], dtype=str),
+        aya_number=np.array(columns["aya_number"], dtype=np.int32),
+        arabic_diacritics=np.array(columns["arabic_diacritics"], dtype=str),
+    )
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"count": matrix.shape[0], "dim": matrix.shape[1], "collection": collection}, f)
+    return matrix.shape[0]
+
+
+class LocalIndex:
+    """
+    Exact cosine-similarity search over a snapshot written by `export_snapshot`.
+
+    The Quran has 6,236 ayahs, so a brute-force matrix-vector product over the memory-mapped
+    vectors takes a few milliseconds and needs no approximate index. Scores are cosine
+    similarities, the same scale as a Qdrant collection with cosine distance.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.vectors = np.memmap(
+            os.path.join(path, "vectors.f32"), dtype=np.float32, mode="r",
+            shape=(self.meta["count"], self.meta["dim"]),
+        )
+        with np.load(os.path.join(path, "payload.npz"), allow_pickle=False) as payload:
+            self.payload = {name: payload[name] for name in PAYLOAD_COLUMNS}
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def result_for_row(self, row: int, score: float) -> AyahResult:
+        return AyahResult(
+            score=score,
+            english_translation=str(self.payload["english_translation"][row]),
+            surah_name_english=str(self.payload["surah_name_english"][row]),
+            aya_number=int(self.payload["aya_number"][row]),
+            arabic_diacritics=str(self.payload["arabic_diacritics"][row]),
+        )
+
+    def top_k(self, scores: np.ndarray, limit: int) -> np.ndarray:
+        limit = min(limit, len(scores))
+        rows = np.argpartition(-scores, limit - 1)[:limit]
+        return rows[np.argsort(-scores[rows])]
+
+    def search(self, query_vector: List[float], limit: int = 15) -> List[AyahResult]:
+        query = np.array(query_vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.vectors @ query
+        return [self.result_for_row(row, float(scores[row])) for row in self.top_k(scores, limit)]
+
+    def search_batch(self, query_vectors: List[List[float]], limit: int = 15) -> List[List[AyahResult]]:
+        """Searches many queries with a single matrix product."""
+        queries = np.array(query_vectors, dtype=np.float32)
+        queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+        scores = queries @ self.vectors.T
+        return [
+            [self.result_for_row(row, float(row_scores[row])) for row in self.top_k(row_scores, limit)]
+            for row_scores in scores
+        ]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_local_index() -> LocalIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LocalIndex(LOCAL_INDEX_PATH)
+        return _index
+
+
+if __name__ == "__main__":
+    # python -m app.utils.local_index [snapshot_dir]
+    from ..clients import registry
+
+    target = sys.argv[1] if len(sys.argv) > 1 else LOCAL_INDEX_PATH
+    count = export_snapshot(registry.qdrant(), target)
+    print(f"Exported {count} ayahs from {QDRANT_COLLECTION} to {target}")
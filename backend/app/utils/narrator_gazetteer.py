@@ -0,0 +1,292 @@
+import functools
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from ..config import GAZETTEER_PATH, GAZETTEER_MAX_DISTANCE
+
+# Spelling variants of the same word in transliterated and Arabic names.
+_TOKEN_FORMS = {
+    "bin": "ibn", "b": "ibn", "ben": "ibn", "abi": "abu", "aba": "abu",
+    "ابن": "بن", "ابي": "ابو", "ابا": "ابو",
+    "abdullah": "abd allah", "abdallah": "abd allah",
+}
+_ARTICLES = {"al", "el", "as", "ash", "at", "ath", "ad", "adh", "az", "ar", "an", "ul", "ur"}
+_ABD = re.compile(r"^abd(?:ul|ur|ar|as|al|el|an|u)$")
+_DOUBLED = re.compile(r"([a-z])\1")
+_FINAL_H = re.compile(r"([aeiou])h$")
+# Latin accents, harakat, tatweel and the apostrophes of transliteration ("'Umar", "Mas'ud").
+_MARKS = re.compile("[\u0300-\u036f\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640ʿʾ'`‘’]")
+_SEPARATORS = re.compile(r"[\W_]+")
+_LETTERS = str.maketrans({"ى": "ي", "ة": "ه"})
+
+
+@functools.lru_cache(maxsize=65536)
+def _token_forms(token: str) -> Tuple[str, ...]:
+    token = _TOKEN_FORMS.get(token, token)
+    if token in _ARTICLES:
+        return ()
+    if _ABD.match(token):
+        return ("abd",)
+    if token.startswith("ال") and token != "الله" and len(token) > 3:
+        return (token[2:],)
+    if token.isascii():
+        token = _FINAL_H.sub(r"\1", _DOUBLED.sub(r"\1", token)).replace("ay", "ai").replace("aw", "au")
+    return tuple(token.split())
+
+
+def name_tokens(name: str) -> List[str]:
+    """
+    Normalised tokens of a narrator name, so that spelling variants compare equal: diacritics,
+    case and apostrophes removed, "bin"/"ibn" and "abi"/"abu" unified, articles ("al-", "ال")
+    dropped, doubled Latin letters collapsed and a final "h" after a vowel removed.
+    """
+    text = name if name.isascii() else unicodedata.normalize("NFKD", name)
+    text = _MARKS.sub("", text).lower().translate(_LETTERS)
+    return [form for token in _SEPARATORS.sub(" ", text).split() for form in _token_forms(token)]
+
+
+def name_key(name: str) -> str:
+    return " ".join(name_tokens(name))
+
+
+def _segments(length: int, parts: int) -> List[Tuple[int, int]]:
+    bounds = [length * i // parts for i in range(parts + 1)]
+    return list(zip(bounds, bounds[1:]))
+
+
+def bounded_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance (with adjacent transpositions) between `a` and `b`, or `limit + 1` once it
+    exceeds `limit`. The common prefix and suffix are skipped and only the diagonal band of
+    width `limit` is computed.
+    """
+    over = limit + 1
+    if abs(len(a) - len(b)) > limit:
+        return over
+    prefix = len(os.path.commonprefix([a, b]))
+    a, b = a[prefix:], b[prefix:]
+    suffix = len(os.path.commonprefix([a[::-1], b[::-1]]))
+    if suffix:
+        a, b = a[:-suffix], b[:-suffix]
+    if not a or not b:
+        return min(max(len(a), len(b)), over)
+
+    previous2 = None
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        if i <= limit:
+            current[0] = i
+        row_min = current[0]
+        char, last = a[i - 1], a[i - 2] if i > 1 else None
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            value = previous[j - 1] if char == b[j - 1] else previous[j - 1] + 1
+            if previous[j] + 1 < value:
+                value = previous[j] + 1
+            if current[j - 1] + 1 < value:
+                value = current[j - 1] + 1
+            if previous2 is not None and j > 1 and char == b[j - 2] and last == b[j - 1] and previous2[j - 2] + 1 < value:
+                value = previous2[j - 2] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > limit:
+            return over
+        previous2, previous = previous, current
+    return min(previous[-1], over)
+
+
+def allowed_distance(token: str, max_distance: int = GAZETTEER_MAX_DISTANCE) -> int:
+    """Short name parts tolerate fewer edits, so that e.g. "anas" never resolves to "nafi" or "amr" to "umar"."""
+    if len(token) <= 4:
+        return 0
+    return min(max_distance, 1 if len(token) <= 8 else max_distance)
+
+
+class _SegmentIndex:
+    """
+    Words indexed by their length and their split into `parts` segments: a word within `limit`
+    edits of another keeps at least `parts - limit` of its segments intact, found within `limit`
+    characters of their place.
+    """
+
+    def __init__(self, words: Sequence[str], parts: int):
+        self.words = list(words)
+        self.parts = parts
+        self._index: Dict[Tuple[int, int, str], List[int]] = defaultdict(list)
+        for position, word in enumerate(self.words):
+            for part, (start, end) in enumerate(_segments(len(word), parts)):
+                self._index[(len(word), part, word[start:end])].append(position)
+
+    def near(self, word: str, limit: int) -> Dict[str, int]:
+        """Indexed words within `limit` edits of `word`, with their distance."""
+        needed = self.parts - limit
+        found_words = {}
+        for length in range(len(word) - limit, len(word) + limit + 1):
+            sets = []
+            for part, (start, end) in enumerate(_segments(length, self.parts)):
+                found = set()
+                for shift in range(-limit, limit + 1):
+                    if 0 <= start + shift and end + shift <= len(word):
+                        found.update(self._index.get((length, part, word[start + shift:end + shift]), ()))
+                sets.append(found)
+            # A word in at least `needed` of the sets is in one of the `parts - needed + 1` smallest.
+            sets.sort(key=len)
+            seen = set()
+            for found in sets[:self.parts - needed + 1]:
+                for position in found - seen:
+                    seen.add(position)
+                    if sum(position in other for other in sets) < needed:
+                        continue
+                    candidate = self.words[position]
+                    d = bounded_distance(word, candidate, limit)
+                    if d <= limit:
+                        found_words[candidate] = d
+        return found_words
+
+
+class Narrator:
+    def __init__(self, id: str, name_en: str, name_ar: str, aliases: Sequence[str] = ()):
+        self.id = id
+        self.name_en = name_en
+        self.name_ar = name_ar
+        self.aliases = list(aliases)
+
+    def names(self) -> List[str]:
+        return [self.name_en, self.name_ar, *self.aliases]
+
+
+class Resolution:
+    """A name resolved to a narrator, with the edit distance of the match; `ambiguous` if several tied."""
+
+    def __init__(self, name: str, narrator: Narrator, distance: int, ambiguous: bool):
+        self.name = name
+        self.narrator = narrator
+        self.distance = distance
+        self.ambiguous = ambiguous
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "narrator_id": self.narrator.id,
+            "canonical_name": self.narrator.name_en,
+            "canonical_name_ar": self.narrator.name_ar,
+            "distance": self.distance,
+            "ambiguous": self.ambiguous,
+        }
+
+
+class NarratorGazetteer:
+    """
+    Known narrators indexed by the normalised key of every name and alias. Exact keys are a
+    dict lookup. Fuzzy matching works per name part, never across a whole "x ibn y" compound:
+    each part of the name may be `allowed_distance(part)` edits from the part in the same place
+    of a known key, `max_distance` edits in all. Near parts come from a segment index over the
+    vocabulary of name parts. A fuzzy match is rejected when another narrator's key is within one
+    edit of as close, since the two names then differ by little more than a misspelling.
+    """
+
+    def __init__(self, narrators: Sequence[Narrator], max_distance: int = GAZETTEER_MAX_DISTANCE):
+        self.narrators = list(narrators)
+        self.max_distance = max_distance
+        self._keys: Dict[str, List[int]] = defaultdict(list)
+        for index, narrator in enumerate(self.narrators):
+            for name in narrator.names():
+                key = name_key(name)
+                if key and index not in self._keys[key]:
+                    self._keys[key].append(index)
+        # (number of parts, place, part) -> keys with that part in that place.
+        self._by_part: Dict[Tuple[int, int, str], List[str]] = defaultdict(list)
+        self._key_parts = {key: key.split() for key in self._keys}
+        for key, parts in self._key_parts.items():
+            for place, part in enumerate(parts):
+                self._by_part[(len(parts), place, part)].append(key)
+        self._parts = {part for parts in self._key_parts.values() for part in parts}
+        self._vocabulary = _SegmentIndex(sorted(self._parts), max_distance + 3)
+        self._near_parts = functools.lru_cache(maxsize=65536)(self._near_part)
+        self.resolve = functools.lru_cache(maxsize=65536)(self._resolve)
+
+    @classmethod
+    def from_file(cls, path: str, max_distance: int = GAZETTEER_MAX_DISTANCE) -> "NarratorGazetteer":
+        with open(path, encoding="utf-8") as f:
+            return cls([Narrator(**entry) for entry in json.load(f)], max_distance)
+
+    def _near_part(self, part: str, slack: int) -> Dict[str, int]:
+        limit = allowed_distance(part, self.max_distance) + slack
+        if limit == 0:
+            return {part: 0} if part in self._parts else {}
+        return self._vocabulary.near(part, limit)
+
+    def _fuzzy(self, key: str, slack: int = 0) -> Dict[str, int]:
+        """
+        Known keys with as many parts as `key`, each part near enough, within `max_distance` in
+        all; `slack` more edits are allowed per part and in all, to look for rivals of a match.
+        """
+        parts = key.split()
+        limit = self.max_distance + slack
+        nears = [self._near_parts(part, slack) for part in parts]
+        if not all(nears):
+            return {}
+        # Start from the place whose near parts are in the fewest keys; "ibn" is in most of them.
+        sizes = [sum(len(self._by_part.get((len(parts), place, part), ())) for part in near)
+                 for place, near in enumerate(nears)]
+        first = sizes.index(min(sizes))
+        distances = {candidate: d for part, d in nears[first].items()
+                     for candidate in self._by_part.get((len(parts), first, part), ())}
+        for place, near in enumerate(nears):
+            if place == first:
+                continue
+            distances = {candidate: total + near[self._key_parts[candidate][place]]
+                         for candidate, total in distances.items()
+                         if self._key_parts[candidate][place] in near
+                         and total + near[self._key_parts[candidate][place]] <= limit}
+        return distances
+
+    def _resolve(self, name: str) -> Optional[Resolution]:
+        key = name_key(name)
+        if not key:
+            return None
+        if key in self._keys:
+            matches = sorted(self._keys[key])
+            return Resolution(name, self.narrators[matches[0]], 0, len(matches) > 1)
+        distances = self._fuzzy(key)
+        if not distances:
+            return None
+        best = min(distances.values())
+        matches = sorted({i for candidate, d in distances.items() if d == best for i in self._keys[candidate]})
+        rivals = {i for candidate, d in self._fuzzy(key, slack=1).items() if d <= best + 1
+                  for i in self._keys[candidate]}
+        if len(rivals) > 1:
+            # e.g. a misspelt name halfway between two narrators: better unresolved than wrong.
+            return None
+        return Resolution(name, self.narrators[matches[0]], best, False)
+
+    def resolve_chain(self, names: Sequence[str]) -> List[Optional[dict]]:
+        """One resolution (as a dict) or None per extracted name, for attaching to extraction results."""
+        resolved = []
+        for name in names:
+            resolution = self.resolve(name) if isinstance(name, str) else None
+            resolved.append(resolution.to_dict() if resolution else None)
+        return resolved
+
+    def stats(self) -> dict:
+        info = self.resolve.cache_info()
+        return {"narrators": len(self.narrators), "keys": len(self._keys), "parts": len(self._vocabulary.words),
+                "cache_hits": info.hits, "cache_misses": info.misses}
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> NarratorGazetteer:
+    """Loads GAZETTEER_PATH on first use."""
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = NarratorGazetteer.from_file(GAZETTEER_PATH)
+        return _gazetteer
@@ -1,46 +1,115 @@
+import asyncio
 import os
 import numpy as np
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from qdrant_client import QdrantClient
 from typing import List
 from ..models.query import AyahResult
+from ..clients import registry
+from qdrant_client import models
+from ..config import EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, QDRANT_COLLECTION, VECTOR_BACKEND
+from ..config import RETRIEVAL_MODE, RETRIEVAL_LIMIT, RETRIEVAL_CANDIDATES, RRF_K
+from .local_index import get_local_index
+from .embedding_cache import embedding_cache, embedding_key
+from .tracing import span, traced
 
 
 load_dotenv()
 
-embedding_client = OpenAIEmbeddings(
-    model="text-embedding-ada-002",
-    openai_api_key=os.getenv("OPENAI_API_KEY")
-);
-
 
 def get_embedding(text):
-    try:
-        embedding = embedding_client.embed_query(text)
-        return list(np.array(embedding, dtype=np.float32))
-    except Exception as e:
-        print("Error while getting embedding:", e)
-        return None
+    with span("embedding", model=EMBEDDING_MODEL) as s:
+        cached = embedding_cache.get(text, EMBEDDING_MODEL)
+        s.set("cache_hit", cached is not None)
+        if cached is not None:
+            return list(cached)
+        try:
+            embedding = registry.embeddings().embed_query(text)
+            return list(embedding_cache.put(text, EMBEDDING_MODEL, embedding))
+        except Exception as e:
+            print("Error while getting embedding:", e)
+            return None
+
+
+async def _off_loop(func, *args):
+    """Runs an embedding cache call in a thread when it may touch the SQLite tier."""
+    if not embedding_cache.disk_path:
+        return func(*args)
+    return await asyncio.to_thread(func, *args)
+
+
+async def aget_embedding(text):
+    with span("embedding", model=EMBEDDING_MODEL) as s:
+        cached = await _off_loop(embedding_cache.get, text, EMBEDDING_MODEL)
+        s.set("cache_hit", cached is not None)
+        if cached is not None:
+            return list(cached)
+        try:
+            embedding = await registry.embeddings().aembed_query(text)
+            return list(await _off_loop(embedding_cache.put, text, EMBEDDING_MODEL, embedding))
+        except Exception as e:
+            print("Error while getting embedding:", e)
+            return None
+
+
+def _unique_uncached(texts):
+    """Returns ({text index: cached vector}, {key: first text with that key}) for a batch."""
+    cached = {}
+    pending = {}
+    for i, text in enumerate(texts):
+        key = embedding_key(text, EMBEDDING_MODEL)
+        if key in pending:
+            continue
+        vector = embedding_cache.get(text, EMBEDDING_MODEL)
+        if vector is None:
+            pending[key] = text
+        else:
+            cached[key] = vector
+    return cached, pending
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def get_embeddings(texts: List[str], chunk_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+    """
+    Embeds a batch of texts. Texts that normalise to the same cache key are embedded once,
+    cached vectors are reused, and the rest go to `embed_documents` in chunks of `chunk_size`.
+    """
+    vectors, pending = _unique_uncached(texts)
+    keys = list(pending)
+    for chunk in _chunks(keys, chunk_size):
+        with span("embedding_batch", model=EMBEDDING_MODEL, size=len(chunk)):
+            embedded = registry.embeddings().embed_documents([pending[key] for key in chunk])
+        for key, embedding in zip(chunk, embedded):
+            vectors[key] = embedding_cache.put(pending[key], EMBEDDING_MODEL, embedding)
+    return [list(vectors[embedding_key(text, EMBEDDING_MODEL)]) for text in texts]
 
 
+def _put_chunk(vectors, pending, chunk, embedded):
+    for key, embedding in zip(chunk, embedded):
+        vectors[key] = embedding_cache.put(pending[key], EMBEDDING_MODEL, embedding)
+
+
+async def aget_embeddings(texts: List[str], chunk_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+    vectors, pending = await _off_loop(_unique_uncached, texts)
+    keys = list(pending)
+    for chunk in _chunks(keys, chunk_size):
+        with span("embedding_batch", model=EMBEDDING_MODEL, size=len(chunk)):
+            embedded = await registry.embeddings().aembed_documents([pending[key] for key in chunk])
+        await _off_loop(_put_chunk, vectors, pending, chunk, embedded)
+    return [list(vectors[embedding_key(text, EMBEDDING_MODEL)]) for text in texts]
+
 
 def get_qdrant_client():
-    return QdrantClient(
-        url=os.getenv("QDRANT_URL"),
-        api_key=os.getenv("QDRANT_API_KEY"),
-        prefer_grpc=False,
-        timeout=30.0
-    )
+    return registry.qdrant()
 
 
-def search_ayahs(query_vector: List[float], limit: int = 15) -> List[AyahResult]:
-    client = get_qdrant_client()
-    search_response = client.search(
-        collection_name="quran_embeddings",
-        query_vector=query_vector,
-        limit=limit
-    )
+def get_async_qdrant_client():
+    return registry.async_qdrant()
+
+
+def _to_ayah_results(search_response) -> List[AyahResult]:
     return [
         AyahResult(
             score=hit.score,
@@ -52,3 +121,116 @@ def search_ayahs(query_vector: List[float], limit: int = 15) -> List[AyahResult]
         for hit in search_response
     ]
 
+
+def search_ayahs(query_vector: List[float], limit: int = 15) -> List[AyahResult]:
+    with span("vector_search", backend=VECTOR_BACKEND):
+        if VECTOR_BACKEND == "local":
+            return get_local_index().search(query_vector, limit)
+        client = get_qdrant_client()
+        search_response = client.search(
+            collection_name=QDRANT_COLLECTION,
+            query_vector=query_vector,
+            limit=limit
+        )
+        return _to_ayah_results(search_response)
+
+
+async def asearch_ayahs(query_vector: List[float], limit: int = 15) -> List[AyahResult]:
+    with span("vector_search", backend=VECTOR_BACKEND):
+        if VECTOR_BACKEND == "local":
+            # A brute-force search over 6,236 vectors takes a few ms; not worth a thread hop.
+            return get_local_index().search(query_vector, limit)
+        client = get_async_qdrant_client()
+        search_response = await client.search(
+            collection_name=QDRANT_COLLECTION,
+            query_vector=query_vector,
+            limit=limit
+        )
+        return _to_ayah_results(search_response)
+
+
+def _dedupe_vectors(query_vectors):
+    """Returns (unique vectors, index into them for every input vector)."""
+    unique = {}
+    positions = []
+    for vector in query_vectors:
+        key = np.asarray(vector, dtype=np.float32).tobytes()
+        positions.append(unique.setdefault(key, len(unique)))
+    return [np.frombuffer(key, dtype=np.float32).tolist() for key in unique], positions
+
+
+def _search_requests(vectors, limit):
+    return [models.SearchRequest(vector=vector, limit=limit, with_payload=True) for vector in vectors]
+
+
+def search_ayahs_batch(query_vectors: List[List[float]], limit: int = 15) -> List[List[AyahResult]]:
+    """One result list per query vector; identical vectors are searched once."""
+    vectors, positions = _dedupe_vectors(query_vectors)
+    if not vectors:
+        return []
+    if VECTOR_BACKEND == "local":
+        results = get_local_index().search_batch(vectors, limit)
+    else:
+        responses = get_qdrant_client().search_batch(
+            collection_name=QDRANT_COLLECTION,
+            requests=_search_requests(vectors, limit)
+        )
+        results = [_to_ayah_results(response) for response in responses]
+    return [results[p] for p in positions]
+
+
+async def asearch_ayahs_batch(query_vectors: List[List[float]], limit: int = 15) -> List[List[AyahResult]]:
+    vectors, positions = _dedupe_vectors(query_vectors)
+    if not vectors:
+        return []
+    if VECTOR_BACKEND == "local":
+        results = get_local_index().search_batch(vectors, limit)
+    else:
+        responses = await get_async_qdrant_client().search_batch(
+            collection_name=QDRANT_COLLECTION,
+            requests=_search_requests(vectors, limit)
+        )
+        results = [_to_ayah_results(response) for response in responses]
+    return [results[p] for p in positions]
+
+
+def _hybrid(query_text, query_vector, vector_hits, limit):
+    from .lexical_index import fuse_rrf, lexical_search
+
+    with span("lexical_search"):
+        lexical_hits = lexical_search(query_text, query_vector, RETRIEVAL_CANDIDATES)
+    return fuse_rrf([vector_hits, lexical_hits], limit=limit, k=RRF_K)
+
+
+@traced("retrieval")
+def retrieve_ayahs(query_text: str, query_vector: List[float], limit: int = RETRIEVAL_LIMIT,
+                   mode: str = RETRIEVAL_MODE) -> List[AyahResult]:
+    """
+    Candidate ayahs for a hadith. "vector" mode is a plain `search_ayahs`; "hybrid" mode fuses
+    the top RETRIEVAL_CANDIDATES vector and BM25 hits with reciprocal-rank fusion.
+    """
+    if mode != "hybrid":
+        return search_ayahs(query_vector=query_vector, limit=limit)
+    vector_hits = search_ayahs(query_vector=query_vector, limit=RETRIEVAL_CANDIDATES)
+    return _hybrid(query_text, query_vector, vector_hits, limit)
+
+
+@traced("retrieval")
+async def aretrieve_ayahs(query_text: str, query_vector: List[float], limit: int = RETRIEVAL_LIMIT,
+                          mode: str = RETRIEVAL_MODE) -> List[AyahResult]:
+    if mode != "hybrid":
+        return await asearch_ayahs(query_vector=query_vector, limit=limit)
+    vector_hits = await asearch_ayahs(query_vector=query_vector, limit=RETRIEVAL_CANDIDATES)
+    return _hybrid(query_text, query_vector, vector_hits, limit)
+
+
+@traced("retrieval_batch")
+async def aretrieve_ayahs_batch(query_texts: List[str], query_vectors: List[List[float]],
+                                limit: int = RETRIEVAL_LIMIT, mode: str = RETRIEVAL_MODE) -> List[List[AyahResult]]:
+    if mode != "hybrid":
+        return await asearch_ayahs_batch(query_vectors, limit=limit)
+    vector_hits = await asearch_ayahs_batch(query_vectors, limit=RETRIEVAL_CANDIDATES)
+    return [
+        _hybrid(text, vector, hits, limit)
+        for text, vector, hits in zip(query_texts, query_vectors, vector_hits)
+    ]
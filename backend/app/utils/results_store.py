@@ -0,0 +1,161 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Iterable, Iterator, Optional
+from ..config import RESULTS_DB_PATH
+
+LEGACY_FILES = {
+    "closed_source": "closed_source_models_results.json",
+    "open_source": "open_source_models_results.json",
+}
+
+
+class ResultsStore:
+    """
+    Append-only store for extraction results, backed by SQLite in WAL mode.
+
+    Appends are a single INSERT per batch instead of a rewrite of the whole history, readers
+    never block writers, and several uvicorn workers can write to the same file safely
+    (SQLite serialises the writers; `busy_timeout` makes them wait rather than fail).
+    Every operation opens its own short-lived connection so the store can be used from any
+    thread, including the thread pool that drives streamed responses.
+    """
+
+    def __init__(self, path: str, page_size: int = 500):
+        self.path = path
+        self.page_size = page_size
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    record TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS results_source_id ON results (source, id)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS migrations (
+                    path TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    records INTEGER NOT NULL,
+                    migrated_at REAL NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout=30000")
+        return _Closing(conn)
+
+    def append(self, source: str, records: Iterable[dict]) -> int:
+        now = time.time()
+        rows = [(source, now, json.dumps(record, ensure_ascii=False)) for record in records]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.executemany("INSERT INTO results (source, created_at, record) VALUES (?, ?, ?)", rows)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def count(self, source: str) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM results WHERE source = ?", (source,)).fetchone()[0]
+
+    def iter(self, source: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[dict]:
+        """Yields records in insertion order, fetching `page_size` rows per query."""
+        remaining = limit
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT id FROM results WHERE source = ? ORDER BY id LIMIT 1 OFFSET ?", (source, offset)
+            ).fetchone()
+        if row is None:
+            return
+        last_id = row[0] - 1
+
+        while remaining is None or remaining > 0:
+            page = self.page_size if remaining is None else min(self.page_size, remaining)
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT id, record FROM results WHERE source = ? AND id > ? ORDER BY id LIMIT ?",
+                    (source, last_id, page),
+                ).fetchall()
+            if not rows:
+                return
+            for row_id, record in rows:
+                yield json.loads(record)
+            last_id = rows[-1][0]
+            if remaining is not None:
+                remaining -= len(rows)
+
+    def migrate_json(self, source: str, json_path: str) -> int:
+        """One-shot import of a legacy JSON array file; a file that was already imported is skipped."""
+        key = os.path.abspath(json_path)
+        if not os.path.exists(json_path):
+            return 0
+        with self._connect() as conn:
+            if conn.execute("SELECT 1 FROM migrations WHERE path = ?", (key,)).fetchone():
+                return 0
+        with open(json_path, "r", encoding="utf-8") as f:
+            records = json.load(f)
+
+        now = time.time()
+        rows = [(source, now, json.dumps(record, ensure_ascii=False)) for record in records]
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM migrations WHERE path = ?", (key,)).fetchone():
+                    conn.execute("ROLLBACK")
+                    return 0
+                conn.executemany("INSERT INTO results (source, created_at, record) VALUES (?, ?, ?)", rows)
+                conn.execute(
+                    "INSERT INTO migrations (path, source, records, migrated_at) VALUES (?, ?, ?, ?)",
+                    (key, source, len(rows), now),
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        print(f"Migrated {len(rows)} records from {json_path} into {self.path}")
+        return len(rows)
+
+
+class _Closing:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_results_store() -> ResultsStore:
+    """Returns the shared store, importing the legacy JSON results files the first time."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ResultsStore(RESULTS_DB_PATH)
+            for source, json_path in LEGACY_FILES.items():
+                _store.migrate_json(source, json_path)
+        return _store
+
+
+if __name__ == "__main__":
+    # python -m app.utils.results_store [db_path]
+    store = ResultsStore(sys.argv[1] if len(sys.argv) > 1 else RESULTS_DB_PATH)
+    for source, json_path in LEGACY_FILES.items():
+        migrated = store.migrate_json(source, json_path)
+        print(f"{source}: {migrated} new records, {store.count(source)} total")
@@ -0,0 +1,56 @@
+import re
+import unicodedata
+
+_PUNCTUATION = {"P", "S"}
+_WHITESPACE = re.compile(r"\s+")
+# Tanween, harakat, shadda, sukun, superscript alef, tatweel and Quranic annotation marks.
+_HARAKAT = re.compile("[\u0610-\u061A\u064B-\u065F\u0670\u0640\u06D6-\u06ED]")
+# Letter variants that spelling and transliteration use interchangeably.
+_FOLDED_LETTERS = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي",
+    "‘": "'", "’": "'", "`": "'", "ʿ": "'", "ʾ": "'",
+}
+
+
+def strip_diacritics(text: str) -> str:
+    """Removes Arabic harakat, tatweel, Latin accents and transliteration marks ("ʿ", "ʾ") from `text`."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if unicodedata.category(c) not in ("Mn", "Lm"))
+
+
+def strip_harakat(text: str) -> str:
+    """Removes Arabic vowel marks only, keeping hamza forms and every letter intact; for display and prompts."""
+    return _HARAKAT.sub("", text)
+
+
+def fold_with_offsets(text: str) -> tuple[str, list[int]]:
+    """
+    Lower-cased `text` with harakat removed and alef, ya and apostrophe variants unified, for
+    diacritic-insensitive matching. `offsets[i]` is the index in `text` of folded character i,
+    with `len(text)` appended so that folded spans map back to original ones.
+    """
+    chars = []
+    offsets = []
+    for i, c in enumerate(text):
+        if _HARAKAT.match(c):
+            continue
+        c = _FOLDED_LETTERS.get(c, c)
+        lower = c.lower()
+        chars.append(lower if len(lower) == 1 else c)
+        offsets.append(i)
+    offsets.append(len(text))
+    return "".join(chars), offsets
+
+
+def fold(text: str) -> str:
+    return fold_with_offsets(text)[0]
+
+
+def normalize_text(text: str) -> str:
+    """
+    Canonical form of a hadith or name used for cache keys and matching: diacritics and
+    punctuation removed, case folded and whitespace collapsed.
+    """
+    text = strip_diacritics(text or "")
+    text = "".join(" " if unicodedata.category(c)[0] in _PUNCTUATION else c for c in text)
+    return _WHITESPACE.sub(" ", text).strip().casefold()
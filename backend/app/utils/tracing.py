@@ -0,0 +1,187 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from .metrics import STAGE_SECONDS, CACHE_LOOKUPS, LLM_SECONDS, LLM_TOKENS, STAGE_TOKENS
+from ..config import TRACING_EXPORTER, TRACING_SERVICE_NAME
+
+
+class Span:
+    """Attributes collected while a stage runs; numeric ones added with `add` accumulate."""
+
+    def __init__(self, stage: str, attributes: dict):
+        self.stage = stage
+        self.attributes = dict(attributes)
+        self._lock = threading.Lock()
+
+    def set(self, key: str, value):
+        with self._lock:
+            self.attributes[key] = value
+
+    def add(self, key: str, amount: float):
+        with self._lock:
+            self.attributes[key] = self.attributes.get(key, 0) + amount
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("hadith_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+def _init_otel():
+    """Returns (tracer, exporter) for TRACING_EXPORTER, or (None, None) when tracing is off."""
+    if not TRACING_EXPORTER:
+        return None, None
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor, SimpleSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": TRACING_SERVICE_NAME}))
+    if TRACING_EXPORTER == "memory":
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        exporter = InMemorySpanExporter()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+    elif TRACING_EXPORTER == "otlp":
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    else:
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+        exporter = ConsoleSpanExporter()
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    return provider.get_tracer("app.tracing"), exporter
+
+
+# `span_exporter` is the InMemorySpanExporter when TRACING_EXPORTER="memory".
+tracer, span_exporter = _init_otel()
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Times a pipeline stage or external call into `hadith_stage_duration_seconds`.
+
+    The yielded Span collects attributes such as token counts; a `cache_hit` attribute, or
+    `cache_hits`/`cache_misses` counts, also go to `hadith_stage_cache_lookups_total`. Spans nest through a context variable, so
+    LLM callbacks attribute their token counts to the innermost open span. With
+    TRACING_EXPORTER set, an OpenTelemetry span is emitted as well.
+    """
+    record = Span(stage, attributes)
+    token = _current.set(record)
+    status = "ok"
+    start = time.perf_counter()
+    with tracer.start_as_current_span(stage) if tracer else nullcontext() as otel_span:
+        try:
+            yield record
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, status=status)
+            _count_cache_lookups(record)
+            if otel_span is not None:
+                for key, value in record.attributes.items():
+                    otel_span.set_attribute(key, value)
+            _current.reset(token)
+
+
+def _count_cache_lookups(record: Span):
+    attributes = record.attributes
+    if "cache_hit" in attributes:
+        CACHE_LOOKUPS.inc(stage=record.stage, result="hit" if attributes["cache_hit"] else "miss")
+    if attributes.get("cache_hits"):
+        CACHE_LOOKUPS.inc(attributes["cache_hits"], stage=record.stage, result="hit")
+    if attributes.get("cache_misses"):
+        CACHE_LOOKUPS.inc(attributes["cache_misses"], stage=record.stage, result="miss")
+
+
+def traced(stage: str):
+    """Decorator running a sync or async function inside `span(stage)`."""
+    def decorate(func):
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """LangChain callback recording duration, status and token usage of every LLM call."""
+
+    # Cheap bookkeeping only, so it runs on the event loop instead of in an executor.
+    run_inline = True
+
+    def __init__(self):
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id, kwargs):
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or params.get("_type") or "unknown"
+        with self._lock:
+            self._started[run_id] = (model, time.perf_counter(), current_span())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, kwargs)
+
+    def _finish(self, run_id, status):
+        with self._lock:
+            started = self._started.pop(run_id, None)
+        if started is None:
+            return None, None
+        model, start, parent = started
+        LLM_SECONDS.observe(time.perf_counter() - start, model=model, status=status)
+        return model, parent
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        model, parent = self._finish(run_id, "ok")
+        if model is None:
+            return
+        tokens_in, tokens_out = _token_usage(response)
+        LLM_TOKENS.inc(tokens_in, model=model, direction="input")
+        LLM_TOKENS.inc(tokens_out, model=model, direction="output")
+        if parent is not None:
+            STAGE_TOKENS.inc(tokens_in, stage=parent.stage, direction="input")
+            STAGE_TOKENS.inc(tokens_out, stage=parent.stage, direction="output")
+            parent.add("llm_calls", 1)
+            parent.add("tokens_in", tokens_in)
+            parent.add("tokens_out", tokens_out)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, "error")
+
+
+def _token_usage(response):
+    """(input, output) token counts from an LLMResult, for both OpenAI and Gemini replies."""
+    tokens_in = tokens_out = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                tokens_in += usage.get("input_tokens", 0)
+                tokens_out += usage.get("output_tokens", 0)
+    if not (tokens_in or tokens_out):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens_in = usage.get("prompt_tokens", 0)
+        tokens_out = usage.get("completion_tokens", 0)
+    return tokens_in, tokens_out
+
+
+llm_metrics = LLMMetricsHandler()
@@ -0,0 +1,48 @@
+"""
+Compares the "per_ayah", "batched" and "early_exit" validation modes against stubbed backends.
+
+For each mode it validates the same hadiths one after another and reports mean and p95 latency
+and LLM calls per request. The fake model labels every ayah "Supported", so "early_exit" stops
+after its first wave; the numbers are its best case.
+
+    cd backend && python -m benchmarks.early_exit --requests 20 --llm-latency 0.05
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.rag.judgement_cache import judgement_cache
+from app.services.quran_services import avalidate_hadith
+from .fakes import FakeBackends, FakeChatModel
+
+
+async def run_mode(mode: str, args):
+    llm = FakeChatModel(latency=args.llm_latency)
+    latencies = []
+    early = 0
+    for i in range(args.requests):
+        start = time.perf_counter()
+        response = await avalidate_hadith(f"Hadith number {i}", llm=llm, mode=mode, use_cache=False)
+        latencies.append(time.perf_counter() - start)
+        early += response.results.early_exit
+    p95 = sorted(latencies)[max(0, int(len(latencies) * 0.95) - 1)]
+    return statistics.mean(latencies), p95, llm.calls / args.requests, early / args.requests
+
+
+async def main(args):
+    # Memoised judgements would hide the LLM calls being measured.
+    judgement_cache.path = None
+    with FakeBackends().patched():
+        print(f"{'mode':>12} {'mean ms':>10} {'p95 ms':>10} {'llm calls':>10} {'early exit':>11}")
+        for mode in args.modes:
+            mean, p95, calls, early = await run_mode(mode, args)
+            print(f"{mode:>12} {mean * 1000:>10.1f} {p95 * 1000:>10.1f} {calls:>10.1f} {early:>11.0%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["per_ayah", "batched", "early_exit"])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
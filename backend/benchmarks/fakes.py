@@ -0,0 +1,177 @@
+"""
+Deterministic stand-ins for the LLM, embedding and Qdrant backends used by the benchmarks.
+Every fake sleeps for a configurable latency so that concurrency effects are visible.
+"""
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import List
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.models.query import AyahResult
+from app.rag.prompt_budget import count_tokens
+
+
+def fake_reply(prompt_text: str) -> str:
+    """Returns a well-formed answer for whichever of the app's prompts `prompt_text` is."""
+    if "Only respond with a number from 1 to 10" in prompt_text:
+        return "Score: 8"
+    if "several Quranic ayahs" in prompt_text:
+        ids = [int(i) for i in re.findall(r"^\[(\d+)\]", prompt_text, flags=re.MULTILINE)]
+        return json.dumps({"judgements": [
+            {"ayah_id": i, "score": 8, "classification": "Supported" if i % 3 else "Weak Support"}
+            for i in ids
+        ]})
+    if "specific Quranic ayah" in prompt_text:
+        return json.dumps({"classification": "Supported"})
+    return json.dumps({"confidence": 0.9, "verdict": "Valid", "summary": "Supported by the given ayahs."})
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers every app prompt after `latency` seconds, plus `per_token_latency` per prompt token
+    to model prefill cost. Reports token usage like a real provider and totals it in `input_tokens`.
+    """
+    latency: float = 0.05
+    per_token_latency: float = 0.0
+    calls: int = 0
+    input_tokens: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _prompt(self, messages):
+        text = "\n".join(str(m.content) for m in messages)
+        return text, count_tokens(text)
+
+    def _result(self, text, tokens) -> ChatResult:
+        self.calls += 1
+        self.input_tokens += tokens
+        reply = fake_reply(text)
+        usage = {"input_tokens": tokens, "output_tokens": count_tokens(reply), "total_tokens": tokens + count_tokens(reply)}
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=reply, usage_metadata=usage))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text, tokens = self._prompt(messages)
+        time.sleep(self.latency + self.per_token_latency * tokens)
+        return self._result(text, tokens)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        text, tokens = self._prompt(messages)
+        await asyncio.sleep(self.latency + self.per_token_latency * tokens)
+        return self._result(text, tokens)
+
+
+def fake_vector(text: str, dim: int = 1536) -> List[float]:
+    seed = hashlib.sha256(text.encode("utf-8")).digest()
+    return [seed[i % len(seed)] / 255.0 for i in range(dim)]
+
+
+def fake_ayahs(limit: int = 15) -> List[AyahResult]:
+    return [
+        AyahResult(
+            score=1.0 - i * 0.02,
+            english_translation=f"Fake translation of ayah {i + 1}.",
+            surah_name_english="Al-Baqarah",
+            aya_number=i + 1,
+            arabic_diacritics="",
+        )
+        for i in range(limit)
+    ]
+
+
+class FakeNERPipeline:
+    """
+    Stand-in for a transformers NER pipeline. Called with a string it returns one entity list,
+    with a list it returns one per input; each call sleeps `latency` plus `per_item` per input.
+    "dslim" tags capitalised words as PER, "camel" tags the words after a narrator connector as PERS.
+    """
+
+    def __init__(self, kind: str, latency: float = 0.02, per_item: float = 0.002):
+        self.kind = kind
+        self.latency = latency
+        self.per_item = per_item
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _entities(self, text: str):
+        if self.kind == "dslim":
+            names = re.findall(r"\b[A-Z][a-z]+(?:[ -](?:ibn|bin|[A-Z][a-z]+))*", text)
+            return [{"entity_group": "PER", "word": name, "score": 0.99} for name in names]
+        words = text.split()[1:3]
+        return [{"entity_group": "PERS", "word": word, "score": 0.99} for word in words]
+
+    def __call__(self, inputs, batch_size=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        items = [inputs] if isinstance(inputs, str) else list(inputs)
+        time.sleep(self.latency + self.per_item * len(items))
+        results = [self._entities(text) for text in items]
+        return results[0] if isinstance(inputs, str) else results
+
+
+def install_fake_ner(latency: float = 0.02, per_item: float = 0.002):
+    """Registers fake "dslim" and "camel" pipelines in MODEL_CACHE for the rest of the process."""
+    from app.rag.open_source_models import MODEL_CACHE
+    pipelines = {kind: FakeNERPipeline(kind, latency, per_item) for kind in ("dslim", "camel")}
+    for kind, pipeline in pipelines.items():
+        MODEL_CACHE.register(kind, lambda pipeline=pipeline: pipeline)
+    return pipelines
+
+
+class FakeBackends:
+    """Latencies (in seconds) and call counters for the non-LLM stages of `avalidate_hadith`."""
+
+    def __init__(self, extraction_latency=0.2, embedding_latency=0.05, search_latency=0.02):
+        self.extraction_latency = extraction_latency
+        self.embedding_latency = embedding_latency
+        self.search_latency = search_latency
+        self.calls = {"extraction": 0, "embedding": 0, "search": 0}
+
+    def extract_narrators_chain_with_llm(self, hadith_text):
+        self.calls["extraction"] += 1
+        time.sleep(self.extraction_latency)
+        return ["Narrator A", "Narrator B"], hadith_text
+
+    async def aextract_narrators_chain_with_llm(self, hadith_text):
+        self.calls["extraction"] += 1
+        await asyncio.sleep(self.extraction_latency)
+        return ["Narrator A", "Narrator B"], hadith_text
+
+    async def aget_embedding(self, text):
+        self.calls["embedding"] += 1
+        await asyncio.sleep(self.embedding_latency)
+        return fake_vector(text)
+
+    async def aretrieve_ayahs(self, query_text, query_vector, limit=15):
+        self.calls["search"] += 1
+        await asyncio.sleep(self.search_latency)
+        return fake_ayahs(limit)
+
+    @contextmanager
+    def patched(self):
+        """Swaps the fakes into quran_services and, for the sync LLM extractor, the extraction routes."""
+        from app.services import quran_services
+        from app.routes import extraction
+        targets = [
+            (quran_services, "aextract_narrators_chain_with_llm"),
+            (quran_services, "aget_embedding"),
+            (quran_services, "aretrieve_ayahs"),
+            (extraction, "extract_narrators_chain_with_llm"),
+        ]
+        originals = [(module, name, getattr(module, name)) for module, name in targets]
+        try:
+            for module, name in targets:
+                setattr(module, name, getattr(self, name))
+            yield self
+        finally:
+            for module, name, original in originals:
+                setattr(module, name, original)
@@ -0,0 +1,72 @@
+"""
+Lookup latency of the narrator gazetteer at rijal-list scale.
+
+Builds a gazetteer of the seed narrators plus `--size` synthetic ones (names composed from
+common ism, nasab and nisba parts) and times, per lookup: exact names, names with one or two
+spelling edits (fuzzy, cache cleared first), repeats of those (served by the cache) and
+unknown names.
+
+    cd backend && python -m benchmarks.gazetteer --size 30000
+"""
+import argparse
+import itertools
+import random
+import time
+
+from app.config import GAZETTEER_PATH
+from app.utils.narrator_gazetteer import Narrator, NarratorGazetteer
+
+ISMS = ["Muhammad", "Ahmad", "Abdullah", "Ubaydullah", "Yahya", "Sulayman", "Ibrahim", "Ismail", "Yusuf",
+        "Hisham", "Hammad", "Sufyan", "Umar", "Uthman", "Ali", "Hasan", "Husayn", "Khalid", "Sa'id", "Zayd",
+        "Abd al-Rahman", "Abd al-Malik", "Abd al-Aziz", "Ja'far", "Musa", "Isa", "Harun", "Mahmud", "Bakr", "Salim"]
+NISBAS = ["al-Basri", "al-Kufi", "al-Madani", "al-Makki", "al-Shami", "al-Misri", "al-Baghdadi", "al-Ansari",
+          "al-Azdi", "al-Thaqafi", "al-Qurashi", "al-Hashimi", "al-Tamimi", "al-Asadi", "al-Makhzumi"]
+
+
+def synthetic(size: int):
+    names = (f"{a} ibn {b} {nisba}" for a, b, nisba in itertools.product(ISMS, ISMS, NISBAS))
+    names = itertools.chain(names, (f"{a} ibn {b} ibn {c} {n}" for a, b, c, n in itertools.product(ISMS, ISMS, ISMS, NISBAS)))
+    return [Narrator(f"synthetic_{i}", name, "") for i, name in zip(range(size), names)]
+
+
+def misspell(name: str, rng: random.Random, edits: int) -> str:
+    chars = list(name)
+    for _ in range(edits):
+        i = rng.randrange(1, len(chars) - 1)
+        if chars[i].isalpha():
+            chars[i] = rng.choice("aiuey")
+    return "".join(chars)
+
+
+def per_lookup(gazetteer, names):
+    start = time.perf_counter()
+    hits = sum(gazetteer.resolve(name) is not None for name in names)
+    return (time.perf_counter() - start) / len(names) * 1e6, hits
+
+
+def main(args):
+    rng = random.Random(0)
+    seed = NarratorGazetteer.from_file(GAZETTEER_PATH).narrators
+    start = time.perf_counter()
+    gazetteer = NarratorGazetteer(seed + synthetic(args.size))
+    print(f"built {gazetteer.stats()['keys']} keys in {time.perf_counter() - start:.2f}s")
+
+    sample = rng.sample(gazetteer.narrators, min(args.lookups, len(gazetteer.narrators)))
+    exact = [n.name_en for n in sample]
+    fuzzy = [misspell(name, rng, rng.choice((1, 2))) for name in exact]
+    unknown = [f"Zzyzx ibn Qwerty {i}" for i in range(len(exact))]
+
+    print(f"{'lookups':<10} {'µs each':>9} {'resolved':>9}")
+    for label, names in (("exact", exact), ("fuzzy", fuzzy), ("cached", fuzzy), ("unknown", unknown)):
+        if label in ("exact", "fuzzy"):
+            gazetteer.resolve.cache_clear()
+            gazetteer._near_parts.cache_clear()
+        micros, hits = per_lookup(gazetteer, names)
+        print(f"{label:<10} {micros:>9.1f} {hits:>5}/{len(names)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=30000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    main(parser.parse_args())
@@ -0,0 +1,69 @@
+"""
+Which isnad extraction tier serves each hadith, and what the cascade saves over LLM-only extraction.
+
+Runs extract_chain over the samples in Input_samples.md, their diacritic-free forms, and a
+few isnad shapes the rules are less sure of ("Narrated X:" with no chain, free text). NER and
+the LLM are the fakes from `benchmarks.fakes`, with `--ner-latency` and `--llm-latency`.
+Reports, per tier, the hadiths it served and their mean latency, then the cascade's mean
+latency against calling the LLM for every hadith.
+
+    cd backend && python -m benchmarks.isnad_tiers --llm-latency 2.0
+"""
+import argparse
+import collections
+import statistics
+import time
+
+from app.rag.isnad_cascade import extract_chain
+from app.rag.isnad_parser import parse_isnad
+from app.utils.text import strip_harakat
+from .fakes import install_fake_ner
+from .samples import load_texts
+
+HARDER = [
+    "Narrated 'Umar bin Al-Khattab: I heard Allah's Messenger (ﷺ) saying, \"The reward of deeds depends upon the intentions.\"",
+    "Narrated Abu Huraira: The Prophet said, \"Faith consists of more than sixty branches.\"",
+    "The believer is like a date palm; its leaves do not fall.",
+]
+
+
+def texts():
+    arabic = load_texts("arabic")
+    return arabic + [strip_harakat(t) for t in arabic] + load_texts("english") + HARDER
+
+
+def main(args):
+    install_fake_ner(latency=args.ner_latency)
+
+    def llm(text):
+        time.sleep(args.llm_latency)
+        return ["Narrator A", "Narrator B"], text
+
+    served = collections.defaultdict(list)
+    for text in texts() * args.repeat:
+        start = time.perf_counter()
+        result = extract_chain(text, llm=llm)
+        served[result.tier].append(time.perf_counter() - start)
+
+    total = sum(len(latencies) for latencies in served.values())
+    print(f"{'tier':<9} {'served':>7} {'share':>7} {'mean ms':>9}")
+    for tier in ("rules", "gazetteer", "ner", "llm"):
+        latencies = served.get(tier, [])
+        mean = statistics.mean(latencies) * 1000 if latencies else 0.0
+        print(f"{tier:<9} {len(latencies):>7} {len(latencies) / total:>7.0%} {mean:>9.2f}")
+    cascade = statistics.mean([latency for latencies in served.values() for latency in latencies])
+    print(f"mean per hadith: cascade {cascade * 1000:.1f} ms, LLM only {args.llm_latency * 1000:.1f} ms")
+
+    sample = load_texts("arabic")[0]
+    start = time.perf_counter()
+    for _ in range(1000):
+        parse_isnad(sample)
+    print(f"parse_isnad: {(time.perf_counter() - start) * 1000:.3f} µs per Arabic hadith")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ner-latency", type=float, default=0.05)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    main(parser.parse_args())
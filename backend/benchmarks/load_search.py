@@ -0,0 +1,60 @@
+"""
+Load benchmark for POST /api/quran/search against stubbed backends.
+
+Runs N concurrent clients through the ASGI app in-process and reports requests/sec for each
+concurrency level. Because every backend is awaited, throughput should scale roughly linearly
+with the number of clients until the LLM concurrency bound is reached.
+
+    cd backend && python -m benchmarks.load_search --concurrency 1 4 16 --requests 64
+"""
+import argparse
+import asyncio
+import functools
+import time
+
+import httpx
+
+from app.main import app
+from app.routes import quran
+from .fakes import FakeBackends, FakeChatModel
+
+
+async def run_level(concurrency: int, total: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker():
+            while not queue.empty():
+                i = queue.get_nowait()
+                response = await client.post("/api/quran/search", json={"query": f"Hadith number {i}"})
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return total / (time.perf_counter() - start)
+
+
+async def main(args):
+    llm = FakeChatModel(latency=args.llm_latency)
+    backends = FakeBackends()
+    original = quran.avalidate_hadith
+    quran.avalidate_hadith = functools.partial(original, llm=llm, use_cache=False)
+    try:
+        with backends.patched():
+            print(f"{'clients':>8} {'req/s':>10}")
+            for level in args.concurrency:
+                rps = await run_level(level, args.requests)
+                print(f"{level:>8} {rps:>10.2f}")
+    finally:
+        quran.avalidate_hadith = original
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    asyncio.run(main(parser.parse_args()))
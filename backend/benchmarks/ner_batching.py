@@ -0,0 +1,65 @@
+"""
+Compares per-phrase and batched CAMeL-Lab NER inference on the Arabic samples in Input_samples.md.
+
+The samples are repeated `--repeat` times to simulate a collection. The per-phrase run calls the
+pipeline once per narrator phrase, as extract_narrator_chain used to; the batched runs send every
+phrase through extract_narrator_chains. Outputs are checked to be identical.
+
+By default the pipeline is the fake from benchmarks.fakes, which charges `--latency` per
+forward pass plus `--per-item` per input, so the benchmark runs offline. `--real-model` loads
+the CAMeL-Lab model instead (needs transformers and the model weights).
+
+    cd backend && python -m benchmarks.ner_batching --repeat 50 --batch-sizes 1 8 16 32
+    cd backend && python -m benchmarks.ner_batching --real-model
+"""
+import argparse
+import time
+
+from app.rag.open_source_models import (
+    MODEL_CACHE, extract_narrator_chains, merge_tokens, split_narrator_phrases,
+)
+from .fakes import install_fake_ner
+from .samples import load_texts
+
+
+def per_phrase(texts):
+    ner_pipeline = MODEL_CACHE.get("camel")
+    chains = []
+    for text in texts:
+        chain = []
+        for phrase in split_narrator_phrases(text):
+            chain.extend(merge_tokens(ner_pipeline(phrase)))
+        chains.append(chain)
+    return chains
+
+
+def main(args):
+    if not args.real_model:
+        install_fake_ner(latency=args.latency, per_item=args.per_item)
+    texts = load_texts("arabic", repeat=args.repeat)
+    phrases = sum(len(split_narrator_phrases(t)) for t in texts)
+    MODEL_CACHE.get("camel")
+
+    start = time.perf_counter()
+    baseline = per_phrase(texts)
+    baseline_s = time.perf_counter() - start
+    print(f"{len(texts)} hadiths, {phrases} phrases")
+    print(f"{'mode':<16} {'seconds':>10} {'phrases/s':>10} {'speedup':>8}")
+    print(f"{'per-phrase':<16} {baseline_s:>10.3f} {phrases / baseline_s:>10.1f} {1.0:>8.2f}")
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        chains = extract_narrator_chains(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        assert chains == baseline, f"batched output differs at batch_size={batch_size}"
+        print(f"{f'batch={batch_size}':<16} {elapsed:>10.3f} {phrases / elapsed:>10.1f} {baseline_s / elapsed:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 16, 32])
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--per-item", type=float, default=0.002)
+    parser.add_argument("--real-model", action="store_true", help="use the CAMeL-Lab model instead of the fake")
+    main(parser.parse_args())
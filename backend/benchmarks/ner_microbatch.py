@@ -0,0 +1,68 @@
+"""
+Throughput of the NER routes' extractors under concurrency, with and without micro-batching.
+
+`--concurrency` threads each call extract_isnad (dslim, English samples) or
+extract_narrator_chain (CAMeL, Arabic samples) `--requests` times in total, as concurrent
+requests to /extract_narrators_ner_dslim and /extract_narrators_ner_CAMel_Lab would. The
+fake pipelines charge `--latency` per forward pass plus `--per-item` per input, which is
+roughly how a CPU BERT pass scales. Every window in `--windows-ms` is run; 0 means no batching.
+Reports throughput, p95 latency, forward passes and mean batch size.
+
+    cd backend && python -m benchmarks.ner_microbatch --concurrency 16 --windows-ms 0 5 10 20
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.rag.open_source_models import NER_BATCHERS, extract_isnad, extract_narrator_chain
+from .fakes import install_fake_ner
+from .samples import load_texts
+from .suite import percentile
+
+TARGETS = {
+    "dslim": (extract_isnad, "english"),
+    "camel": (extract_narrator_chain, "arabic"),
+}
+
+
+def run(name, window_ms, pipelines, args):
+    extract, language = TARGETS[name]
+    texts = load_texts(language, repeat=args.requests)[:args.requests]
+    batcher = NER_BATCHERS[name]
+    batcher.window = window_ms / 1000
+    before = batcher.stats()
+    pipelines[name].calls = 0
+
+    def timed(text):
+        start = time.perf_counter()
+        extract(text)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(timed, texts))
+    elapsed = time.perf_counter() - start
+    after = batcher.stats()
+    batches = after["batches"] - before["batches"]
+    mean_batch = (after["items"] - before["items"]) / batches if batches else 0.0
+    print(f"{name:<6} {window_ms:>6.0f} {len(texts) / elapsed:>8.1f} {percentile(latencies, 0.95) * 1000:>8.1f} "
+          f"{pipelines[name].calls:>7} {mean_batch:>7.1f}")
+
+
+def main(args):
+    pipelines = install_fake_ner(latency=args.latency, per_item=args.per_item)
+    print(f"{'model':<6} {'win ms':>6} {'req/s':>8} {'p95 ms':>8} {'passes':>7} {'batch':>7}")
+    for name in args.models:
+        for window_ms in args.windows_ms:
+            run(name, window_ms, pipelines, args)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["dslim", "camel"], choices=list(TARGETS))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--windows-ms", type=float, nargs="+", default=[0, 5, 10, 20])
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--per-item", type=float, default=0.002)
+    main(parser.parse_args())
@@ -0,0 +1,79 @@
+"""
+Tokens and latency saved by prompt compaction.
+
+Runs `avalidate_hadith` over the English samples in Input_samples.md twice, with
+PROMPT_COMPACTION off and on. Retrieval returns realistic ayahs: long translations, fully
+diacritised Arabic and one duplicate. The fake LLM charges `--per-token-latency` seconds per
+prompt token, so shorter prompts also finish sooner. Reports prompt tokens and mean latency
+per request, and the share saved.
+
+    cd backend && python -m benchmarks.prompt_budget --per-token-latency 0.00005
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ["JUDGEMENT_CACHE_PATH"] = ""
+
+from app.models.query import AyahResult
+from app.rag import prompt_budget
+from app.services.quran_services import avalidate_hadith
+from .fakes import FakeBackends, FakeChatModel
+from .samples import load_texts
+
+
+def realistic_ayahs(limit: int):
+    english = load_texts("english")
+    arabic = load_texts("arabic")
+    ayahs = [
+        AyahResult(
+            score=0.9 - i * 0.01,
+            english_translation=" ".join([english[i % len(english)]] * 2),
+            surah_name_english="Al-Baqarah",
+            aya_number=i + 1,
+            arabic_diacritics=arabic[i % len(arabic)],
+        )
+        for i in range(limit - 1)
+    ]
+    return ayahs + [ayahs[0]]
+
+
+class RealisticBackends(FakeBackends):
+    async def aretrieve_ayahs(self, query_text, query_vector, limit=15):
+        self.calls["search"] += 1
+        await asyncio.sleep(self.search_latency)
+        return realistic_ayahs(limit)
+
+
+async def run(compaction: bool, texts, args):
+    prompt_budget.PROMPT_COMPACTION = compaction
+    llm = FakeChatModel(latency=args.llm_latency, per_token_latency=args.per_token_latency)
+    latencies = []
+    for text in texts:
+        start = time.perf_counter()
+        await avalidate_hadith(text, llm=llm, use_cache=False)
+        latencies.append(time.perf_counter() - start)
+    return llm.input_tokens / len(texts), statistics.mean(latencies)
+
+
+async def main(args):
+    texts = load_texts("english", repeat=args.repeat)
+    with RealisticBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        full_tokens, full_latency = await run(False, texts, args)
+        compact_tokens, compact_latency = await run(True, texts, args)
+
+    print(f"{'prompts':<10} {'tokens/req':>11} {'mean ms':>9}")
+    print(f"{'full':<10} {full_tokens:>11.0f} {full_latency * 1000:>9.1f}")
+    print(f"{'compact':<10} {compact_tokens:>11.0f} {compact_latency * 1000:>9.1f}")
+    print(f"saved {1 - compact_tokens / full_tokens:.1%} of prompt tokens, "
+          f"{(full_latency - compact_latency) * 1000:.1f} ms per request")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--llm-latency", type=float, default=0.02)
+    parser.add_argument("--per-token-latency", type=float, default=0.00005)
+    asyncio.run(main(parser.parse_args()))
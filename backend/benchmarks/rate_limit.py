@@ -0,0 +1,147 @@
+"""
+Pacing of LLM calls by the shared scheduler against a fake OpenAI-compatible server.
+
+The fake server answers POST /v1/chat/completions in-process (through httpx's ASGI transport)
+and allows `--server-limit` requests per `--window` seconds. Over that it returns 429 with a
+Retry-After header, as the providers do. With `--outage` it returns 503 for that many seconds
+after `--outage-at`, so the circuit breaker can be seen to open and recover.
+
+Interactive and bulk callers are fired together, once with the scheduler bypassed and once
+through `scheduled()`, as the app wraps its models. The scheduler's request bucket is sized to the server's window. Reports, per
+priority, successes, errors and latency, then the server's 429s and the limiter's retries
+and circuit rejections.
+
+    cd backend && python -m benchmarks.rate_limit --interactive 20 --bulk 80 --server-limit 20 --window 2
+"""
+import argparse
+import asyncio
+import collections
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_openai import ChatOpenAI
+
+from app.utils.llm_scheduler import Limiter, TokenBucket, llm_priority, scheduled, scheduler
+from .fakes import fake_reply
+from .suite import percentile
+
+PROMPT = ChatPromptTemplate.from_template("Only respond with a number from 1 to 10. Hadith: {hadith}")
+
+
+class FakeOpenAIServer:
+    """Sliding-window rate limit, an optional outage, a fixed latency and counters of what it answered."""
+
+    def __init__(self, limit: int, window: float, outage_at: float = 0.0, outage: float = 0.0, latency: float = 0.0):
+        self.limit = limit
+        self.window = window
+        self.outage_at = outage_at
+        self.outage = outage
+        self.latency = latency
+        self.started = time.monotonic()
+        self.accepted = collections.deque()
+        self.counts = collections.Counter()
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self.completions)
+
+    async def completions(self, request: Request):
+        body = await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        now = time.monotonic()
+        if self.outage and self.outage_at <= now - self.started < self.outage_at + self.outage:
+            self.counts["503"] += 1
+            return JSONResponse(status_code=503, content={"error": {"message": "Service unavailable"}})
+        while self.accepted and now - self.accepted[0] >= self.window:
+            self.accepted.popleft()
+        if len(self.accepted) >= self.limit:
+            self.counts["429"] += 1
+            retry_after = self.window - (now - self.accepted[0])
+            return JSONResponse(
+                status_code=429, headers={"retry-after": f"{retry_after:.2f}"},
+                content={"error": {"message": "Rate limit reached", "type": "requests"}},
+            )
+        self.accepted.append(now)
+        self.counts["200"] += 1
+        prompt = "\n".join(str(m.get("content", "")) for m in body["messages"])
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": body["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": fake_reply(prompt)},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 20, "completion_tokens": 3, "total_tokens": 23},
+        }
+
+
+def fake_llm(server: FakeOpenAIServer, model: str = "fake") -> ChatOpenAI:
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app))
+    return ChatOpenAI(model=model, base_url="http://fake/v1", api_key="x", http_async_client=client, max_retries=0)
+
+
+def sized_limiter(model: str, limit: int, window: float) -> Limiter:
+    """The shared scheduler's limiter for `model`, with its request bucket sized to the server's window."""
+    limiter = scheduler.limiter("openai", model)
+    limiter.requests = TokenBucket(limit * 60 / window)
+    limiter.requests.capacity = limiter.requests.level = float(limit)
+    limiter.tokens = TokenBucket(0)
+    return limiter
+
+
+async def call(chain, priority: str, results):
+    with llm_priority(priority):
+        start = time.perf_counter()
+        try:
+            await chain.ainvoke({"hadith": "Actions are judged by intentions."})
+            outcome = "ok"
+        except Exception as e:
+            outcome = type(e).__name__
+        results[priority].append((outcome, time.perf_counter() - start))
+
+
+async def run(use_scheduler: bool, args):
+    server = FakeOpenAIServer(args.server_limit, args.window, args.outage_at, args.outage)
+    llm = fake_llm(server)
+    limiter = sized_limiter("fake", args.server_limit, args.window)
+    chain = PROMPT | (scheduled(llm) if use_scheduler else llm)
+
+    results = collections.defaultdict(list)
+    calls = [call(chain, "interactive", results) for _ in range(args.interactive)]
+    calls += [call(chain, "bulk", results) for _ in range(args.bulk)]
+    start = time.perf_counter()
+    await asyncio.gather(*calls)
+    elapsed = time.perf_counter() - start
+    await llm.http_async_client.aclose()
+    return results, server.counts, limiter.stats() if use_scheduler else None, elapsed
+
+
+def report(name, results, counts, stats, elapsed):
+    print(f"\n{name} ({elapsed:.1f}s)")
+    print(f"{'priority':<12} {'ok':>5} {'errors':>7} {'p50 s':>7} {'p95 s':>7}  error types")
+    for priority in ("interactive", "bulk"):
+        rows = results[priority]
+        ok = [latency for outcome, latency in rows if outcome == "ok"]
+        errors = collections.Counter(outcome for outcome, _ in rows if outcome != "ok")
+        latencies = [latency for _, latency in rows]
+        print(f"{priority:<12} {len(ok):>5} {sum(errors.values()):>7} {percentile(latencies, 0.5):>7.2f} "
+              f"{percentile(latencies, 0.95):>7.2f}  {dict(errors) or ''}")
+    print(f"server: {dict(counts)}")
+    if stats:
+        print(f"limiter: retries={stats['retries']} rejections={stats['rejections']} "
+              f"throttled={stats['throttled_seconds']:.1f}s circuit={stats['circuit']}")
+
+
+async def main(args):
+    for name, use_scheduler in (("unscheduled", False), ("scheduled", True)):
+        report(name, *await run(use_scheduler, args))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--interactive", type=int, default=20)
+    parser.add_argument("--bulk", type=int, default=80)
+    parser.add_argument("--server-limit", type=int, default=20, help="requests allowed per window")
+    parser.add_argument("--window", type=float, default=2.0, help="seconds")
+    parser.add_argument("--outage-at", type=float, default=0.0, help="seconds after start")
+    parser.add_argument("--outage", type=float, default=0.0, help="seconds of 503s; 0 for none")
+    asyncio.run(main(parser.parse_args()))
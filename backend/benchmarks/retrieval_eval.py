@@ -0,0 +1,62 @@
+"""
+Retrieval evaluation: recall@k of vector-only vs hybrid (vector + BM25, RRF) retrieval.
+
+Input is a JSONL file of labelled hadiths:
+
+    {"query": "<hadith text>", "relevant": [["Al-Baqarah", 183], ["Al-Baqarah", 185]]}
+
+Queries are embedded with the app's (cached) embedding client, and both modes retrieve from the
+configured vector backend. For every k the harness reports mean recall, and it reports the
+smallest hybrid k that matches vector-only recall at --baseline-k. Each ayah dropped from the
+candidate set saves one filter call in per_ayah mode.
+
+    cd backend && python -m benchmarks.retrieval_eval labelled.jsonl --ks 5 8 10 15
+"""
+import argparse
+import json
+import statistics
+
+from app.utils.query_ayahs import get_embeddings, retrieve_ayahs
+
+
+def recall(hits, relevant):
+    found = {(h.surah_name_english, h.aya_number) for h in hits}
+    return len(found & relevant) / len(relevant) if relevant else 0.0
+
+
+def main(args):
+    with open(args.path, encoding="utf-8") as f:
+        items = [json.loads(line) for line in f if line.strip()]
+    relevant = [{(surah, int(aya)) for surah, aya in item["relevant"]} for item in items]
+    vectors = get_embeddings([item["query"] for item in items])
+
+    table = {}
+    for mode in ("vector", "hybrid"):
+        for k in sorted(set(args.ks) | {args.baseline_k}):
+            scores = [
+                recall(retrieve_ayahs(item["query"], vector, limit=k, mode=mode), rel)
+                for item, vector, rel in zip(items, vectors, relevant)
+            ]
+            table[mode, k] = statistics.mean(scores)
+
+    print(f"{len(items)} labelled hadiths")
+    print(f"{'k':>4} {'vector':>8} {'hybrid':>8}")
+    for k in sorted(set(args.ks) | {args.baseline_k}):
+        print(f"{k:>4} {table['vector', k]:>8.3f} {table['hybrid', k]:>8.3f}")
+
+    target = table["vector", args.baseline_k]
+    matching = [k for k in sorted(set(args.ks)) if table["hybrid", k] >= target]
+    if matching:
+        saved = args.baseline_k - matching[0]
+        print(f"hybrid@{matching[0]} matches vector@{args.baseline_k} recall ({target:.3f}): "
+              f"{saved} fewer filter calls per request ({saved / args.baseline_k:.0%} of the filter stage)")
+    else:
+        print(f"no evaluated hybrid k reaches vector@{args.baseline_k} recall ({target:.3f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--ks", type=int, nargs="+", default=[5, 8, 10, 15])
+    parser.add_argument("--baseline-k", type=int, default=15)
+    main(parser.parse_args())
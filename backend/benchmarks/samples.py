@@ -0,0 +1,18 @@
+import json
+import os
+import re
+from typing import List
+
+SAMPLES_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "Input_samples.md")
+
+
+def load_samples(path: str = SAMPLES_PATH) -> List[dict]:
+    """Parses the JSON request bodies ({"hadith_text", "language"}) out of Input_samples.md."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    return [json.loads(block) for block in re.findall(r"^\{.*?^\}", text, flags=re.MULTILINE | re.DOTALL)]
+
+
+def load_texts(language: str, repeat: int = 1) -> List[str]:
+    texts = [s["hadith_text"] for s in load_samples() if s.get("language") == language]
+    return texts * repeat
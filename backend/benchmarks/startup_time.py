@@ -0,0 +1,66 @@
+"""
+Startup-time benchmark for the app package.
+
+Each scenario runs in a fresh interpreter so that nothing is already imported:
+
+- import:          `import app.main` only (NER models are loaded lazily, so none are touched)
+- warmup:          import, then load the dslim and CAMeL-Lab pipelines (models present in the HF cache)
+- warmup-offline:  import, then try to load them with an empty HF cache and HF_HUB_OFFLINE=1
+                   (models absent; loading fails fast and the app keeps serving)
+
+    cd backend && python -m benchmarks.startup_time --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SNIPPET = """
+import json, time
+start = time.perf_counter()
+import app.main
+imported = time.perf_counter() - start
+warm = 0.0
+if {warmup}:
+    from app.rag.open_source_models import MODEL_CACHE
+    start = time.perf_counter()
+    MODEL_CACHE.warmup(["dslim", "camel"])
+    warm = time.perf_counter() - start
+    loaded = MODEL_CACHE.loaded()
+else:
+    loaded = []
+print(json.dumps({{"import": imported, "warmup": warm, "loaded": loaded}}))
+"""
+
+
+def run(warmup: bool, env: dict) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", SNIPPET.format(warmup=warmup)],
+        capture_output=True, text=True, env=env, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(args):
+    offline_env = dict(os.environ, HF_HUB_OFFLINE="1", HF_HOME=tempfile.mkdtemp())
+    scenarios = [
+        ("import", False, dict(os.environ)),
+        ("warmup", True, dict(os.environ)),
+        ("warmup-offline", True, offline_env),
+    ]
+    print(f"{'scenario':<16} {'import s':>10} {'warmup s':>10}  loaded")
+    for name, warmup, env in scenarios:
+        results = [run(warmup, env) for _ in range(args.runs)]
+        imported = statistics.median(r["import"] for r in results)
+        warm = statistics.median(r["warmup"] for r in results)
+        print(f"{name:<16} {imported:>10.3f} {warm:>10.3f}  {','.join(results[-1]['loaded']) or '-'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    main(parser.parse_args())
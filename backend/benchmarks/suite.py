@@ -0,0 +1,189 @@
+"""
+Offline benchmark suite: validation, NER extraction and the HTTP routes against fake backends.
+
+Every LLM, embedding, Qdrant and NER call is served by the fakes in `benchmarks.fakes` with the
+injected latencies below, so the suite needs no network, API keys or model downloads. Caches
+that would persist between runs are turned off and results go to a temporary SQLite file.
+
+For each target and concurrency level it reports p50/p95/p99 latency, throughput, fake backend
+calls per request and the process's peak RSS so far. `--json` writes the numbers to a file;
+`--compare` checks them against such a file and exits non-zero when a p95 regresses by more
+than `--tolerance`.
+
+    cd backend && python -m benchmarks.suite --concurrency 1 8 32 --requests 64
+    cd backend && python -m benchmarks.suite --json baseline.json
+    cd backend && python -m benchmarks.suite --compare baseline.json --tolerance 0.2
+"""
+import os
+import tempfile
+
+# Must be set before anything under `app` reads its config.
+os.environ.setdefault("RESULTS_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="hadith-bench-"), "results.db"))
+os.environ["JUDGEMENT_CACHE_PATH"] = ""
+os.environ["EMBEDDING_CACHE_DISK_PATH"] = ""
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+os.environ["NER_WARMUP"] = ""
+
+import argparse
+import asyncio
+import functools
+import json
+import resource
+import sys
+import time
+
+import httpx
+
+from app.main import app
+from app.rag.open_source_models import extract_isnad, extract_narrator_chain
+from app.routes import quran
+from app.services.quran_services import avalidate_hadith
+from .fakes import FakeBackends, FakeChatModel, install_fake_ner
+from .samples import load_texts
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.llm = FakeChatModel(latency=args.llm_latency)
+        self.backends = FakeBackends(
+            extraction_latency=args.extraction_latency,
+            embedding_latency=args.embedding_latency,
+            search_latency=args.search_latency,
+        )
+        self.ner = install_fake_ner(latency=args.ner_latency)
+        self.english = load_texts("english") or ["Narrated Abu Hurairah: the Prophet said, \"Be kind.\""]
+        self.arabic = load_texts("arabic") or ["حَدَّثَنَا مُحَمَّدُ عَنْ أَبِي هُرَيْرَةَ قَالَ رَسُولُ اللَّهِ"]
+        self.client = None
+
+    def calls(self) -> int:
+        return self.llm.calls + sum(self.backends.calls.values()) + sum(p.calls for p in self.ner.values())
+
+    def targets(self):
+        english, arabic = self.english, self.arabic
+
+        async def post(path, body):
+            response = await self.client.post(path, json=body)
+            response.raise_for_status()
+
+        return {
+            "validate_hadith": lambda i: avalidate_hadith(
+                f"{english[i % len(english)]} #{i}", llm=self.llm, use_cache=False),
+            "extract_isnad": lambda i: asyncio.to_thread(extract_isnad, english[i % len(english)]),
+            "extract_narrator_chain": lambda i: asyncio.to_thread(extract_narrator_chain, arabic[i % len(arabic)]),
+            "POST /api/quran/search": lambda i: post(
+                "/api/quran/search", {"query": f"{english[i % len(english)]} #{i}"}),
+            "POST /api/extraction/extract_narrators_llm": lambda i: post(
+                "/api/extraction/extract_narrators_llm", {"hadith_text": english[i % len(english)], "language": "english"}),
+            "POST /api/extraction/extract_narrators_ner_dslim": lambda i: post(
+                "/api/extraction/extract_narrators_ner_dslim", {"hadith_text": english[i % len(english)], "language": "english"}),
+            "POST /api/extraction/extract_narrators_ner_CAMel_Lab": lambda i: post(
+                "/api/extraction/extract_narrators_ner_CAMel_Lab", {"hadith_text": arabic[i % len(arabic)], "language": "arabic"}),
+        }
+
+    async def run_level(self, target, concurrency: int) -> dict:
+        total = self.args.requests
+        latencies = []
+        next_index = iter(range(total))
+        calls_before = self.calls()
+
+        async def worker():
+            for i in next_index:
+                start = time.perf_counter()
+                await target(i)
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        return {
+            "concurrency": concurrency,
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+            "rps": total / elapsed,
+            "calls_per_request": (self.calls() - calls_before) / total,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    async def run(self) -> dict:
+        results = {}
+        original = quran.avalidate_hadith
+        quran.avalidate_hadith = functools.partial(original, llm=self.llm, use_cache=False)
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                self.client = client
+                with self.backends.patched():
+                    for name, target in self.targets().items():
+                        if self.args.only and not any(pattern in name for pattern in self.args.only):
+                            continue
+                        results[name] = [await self.run_level(target, level) for level in self.args.concurrency]
+                        report(name, results[name])
+        finally:
+            quran.avalidate_hadith = original
+        return results
+
+
+def report(name, levels):
+    print(f"\n{name}")
+    print(f"{'clients':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'calls/req':>10} {'peak MB':>9}")
+    for r in levels:
+        print(f"{r['concurrency']:>8} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} "
+              f"{r['rps']:>9.1f} {r['calls_per_request']:>10.1f} {r['peak_rss_mb']:>9.1f}")
+
+
+def compare(results, baseline_path, tolerance) -> list:
+    """Returns a message for every (target, concurrency) whose p95 grew by more than `tolerance`."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, levels in results.items():
+        previous = {r["concurrency"]: r for r in baseline.get(name, [])}
+        for r in levels:
+            before = previous.get(r["concurrency"])
+            if before and r["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                regressions.append(
+                    f"{name} @ {r['concurrency']} clients: p95 {before['p95_ms']:.1f} -> {r['p95_ms']:.1f} ms"
+                )
+    return regressions
+
+
+def main(args):
+    results = asyncio.run(Suite(args).run())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for message in regressions:
+            print(f"REGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--only", nargs="+", help="run only targets whose name contains one of these strings")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--extraction-latency", type=float, default=0.2)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--search-latency", type=float, default=0.02)
+    parser.add_argument("--ner-latency", type=float, default=0.02)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="baseline written by --json to check p95 regressions against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    main(parser.parse_args())
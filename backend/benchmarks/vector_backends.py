@@ -0,0 +1,66 @@
+"""
+Recall/latency comparison of the Qdrant and local vector backends.
+
+Queries are ayah vectors from the local snapshot with Gaussian noise added, so no embedding
+calls are needed. Exact brute-force neighbours over the snapshot are the ground truth; each
+backend reports recall@k against them plus p50/p95 latency per query.
+
+    cd backend && python -m app.utils.local_index            # export the snapshot once
+    cd backend && python -m benchmarks.vector_backends --queries 200 --k 15
+"""
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from app.clients import registry
+from app.config import QDRANT_COLLECTION
+from app.utils.local_index import get_local_index
+
+
+def percentile(values, p):
+    return float(np.percentile(values, p)) if values else 0.0
+
+
+def main(args):
+    index = get_local_index()
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(index), size=args.queries, replace=False)
+    queries = np.asarray(index.vectors[rows]) + rng.normal(0, args.noise, size=(args.queries, index.meta["dim"]))
+    queries = queries.astype(np.float32)
+
+    truth = []
+    for query in queries:
+        scores = index.vectors @ (query / np.linalg.norm(query))
+        truth.append({(str(index.payload["surah_name_english"][r]), int(index.payload["aya_number"][r]))
+                      for r in index.top_k(scores, args.k)})
+
+    def local(query):
+        return index.search(query.tolist(), args.k)
+
+    client = registry.qdrant()
+
+    def qdrant(query):
+        from app.utils.query_ayahs import _to_ayah_results
+        return _to_ayah_results(client.search(collection_name=QDRANT_COLLECTION, query_vector=query.tolist(), limit=args.k))
+
+    print(f"{'backend':<8} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, search in (("local", local), ("qdrant", qdrant)):
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = {(h.surah_name_english, h.aya_number) for h in hits}
+            recalls.append(len(found & expected) / len(expected))
+        print(f"{name:<8} {statistics.mean(recalls):>10.3f} {percentile(latencies, 50):>8.2f} {percentile(latencies, 95):>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--noise", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    main(parser.parse_args())
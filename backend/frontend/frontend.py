@@ -1,8 +1,37 @@
+import json
 import streamlit as st
 import requests
 
 # Define base URL
 BASE_URL = "http://127.0.0.1:8000"
+# (connect, read) timeouts in seconds; for the stream the read timeout applies between events
+REQUEST_TIMEOUT = (5, 120)
+
+
+def iter_sse(response):
+    """Yields (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:"):].strip())
+
+
+def display_ayahs(ayahs, title):
+    if ayahs:
+        st.markdown(f"### {title}")
+        for ayah in ayahs:
+            st.markdown(f"**Surah:** {ayah['surah_name_english']} - Ayah {ayah['aya_number']}")
+            st.markdown(f"**Score:** {ayah['score']:.4f}")
+            st.markdown(f"**Arabic:** {ayah['arabic_diacritics']}")
+            st.markdown(f"**English Translation:** {ayah['english_translation']}")
+            st.markdown("---")
+
 # Create two columns for the grid layout
 col1, col2 = st.columns(2)
 
@@ -17,40 +46,49 @@ with col1:
         if not query.strip():
             st.warning("Please enter a Hadith.")
         else:
-            url = f"{BASE_URL}/api/quran/search"
+            url = f"{BASE_URL}/api/quran/search_stream"
             payload = {"query": query}
             try:
-                response = requests.post(url, json=payload)
-                if response.status_code == 200:
-                    data = response.json()
-                    result = data["results"]
-    
-                    st.success("Hadith validated successfully!")
+                with requests.post(url, json=payload, stream=True, timeout=REQUEST_TIMEOUT) as response:
+                    if response.status_code == 200:
+                        status = st.status("Validating hadith...", expanded=True)
+                        result = None
+                        for event, data in iter_sse(response):
+                            if event == "narrators":
+                                status.write(f"**Narrators:** {', '.join(data['narrators']) or 'None found'}")
+                            elif event == "ayahs":
+                                total = len(data["ayahs"])
+                                done = 0
+                                progress = status.progress(0.0, text=f"Retrieved {total} ayahs")
+                            elif event == "ayah":
+                                done += 1
+                                ayah = data["ayah"]
+                                progress.progress(done / max(total, 1), text=f"Checked {done}/{total} ayahs")
+                                if data["label"]:
+                                    status.write(f"{ayah['surah_name_english']} {ayah['aya_number']}: {data['label']}")
+                            elif event == "verdict":
+                                result = data["results"]
+                            elif event == "error":
+                                st.error(f"Error: {data['error']}")
+                        status.update(label="Done" if result else "Failed", state="complete" if result else "error")
     
-                    st.markdown(f"### Hadith")
-                    st.markdown(result["hadith"])
+                        if result:
+                            st.success("Hadith validated successfully!")
     
-                    st.markdown(f"### Verdict")
-                    st.markdown(f"**{result['verdict']} ⇒ Confidence: {result['confidence']}**")
+                            st.markdown(f"### Hadith")
+                            st.markdown(result["hadith"])
     
-                    st.markdown(f"### Summary")
-                    st.markdown(result["summary"])
+                            st.markdown(f"### Verdict")
+                            st.markdown(f"**{result['verdict']} ⇒ Confidence: {result['confidence']}**")
     
-                    def display_ayahs(ayahs, title):
-                        if ayahs:
-                            st.markdown(f"### {title}")
-                            for ayah in ayahs:
-                                st.markdown(f"**Surah:** {ayah['surah_name_english']} - Ayah {ayah['aya_number']}")
-                                st.markdown(f"**Score:** {ayah['score']:.4f}")
-                                st.markdown(f"**Arabic:** {ayah['arabic_diacritics']}")
-                                st.markdown(f"**English Translation:** {ayah['english_translation']}")
-                                st.markdown("---")
+                            st.markdown(f"### Summary")
+                            st.markdown(result["summary"])
     
-                    display_ayahs(result["supported"], "Supported Ayahs")
-                    display_ayahs(result["contradicted"], "Contradicted Ayahs")
+                            display_ayahs(result["supported"], "Supported Ayahs")
+                            display_ayahs(result["contradicted"], "Contradicted Ayahs")
     
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
+                    else:
+                        st.error(f"Error: {response.status_code} - {response.text}")
             except Exception as e:
                 st.error(f"Failed to connect to backend: {e}")
 
@@ -69,7 +107,7 @@ with col2:
             url = f"{BASE_URL}/api/extraction/extract_narrators_ner_dslim"
             payload = {"hadith_text": hadith_text, "language": "english"}
             try:
-                response = requests.post(url, json=payload)
+                response = requests.post(url, json=payload, timeout=REQUEST_TIMEOUT)
                 if response.status_code == 200:
                     data = response.json()
                     st.success("Narrators chain extracted successfully!")
@@ -86,7 +124,7 @@ with col2:
             url = f"{BASE_URL}/api/extraction/extract_narrators_ner_CAMel_Lab"
             payload = {"hadith_text": hadith_text, "language": "arabic"}
             try:
-                response = requests.post(url, json=payload)
+                response = requests.post(url, json=payload, timeout=REQUEST_TIMEOUT)
                 if response.status_code == 200:
                     data = response.json()
                     st.success("Narrators chain extracted successfully!")
@@ -103,7 +141,7 @@ with col2:
             url = f"{BASE_URL}/api/extraction/extract_narrators_llm"
             payload = {"hadith_text": hadith_text, "language": language}
             try:
-                response = requests.post(url, json=payload)
+                response = requests.post(url, json=payload, timeout=REQUEST_TIMEOUT)
                 if response.status_code == 200:
                     data = response.json()
                     st.success("Narrators chain extracted successfully!")
@@ -0,0 +1,22 @@
+"""
+Shared setup for the test suite: every LLM, embedding, Qdrant and NER call goes to the fakes in
+`benchmarks.fakes`, caches that would persist between runs are off and results go to a
+temporary SQLite file.
+
+    cd backend && python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+
+# Must be set before anything under `app` reads its config.
+os.environ.setdefault("RESULTS_DB_PATH", os.path.join(tempfile.mkdtemp(prefix="hadith-tests-"), "results.db"))
+os.environ["JUDGEMENT_CACHE_PATH"] = ""
+os.environ["EMBEDDING_CACHE_DISK_PATH"] = ""
+os.environ["RESULT_CACHE_ENABLED"] = "false"
+os.environ["NER_WARMUP"] = ""
+os.environ["TRACING_EXPORTER"] = "memory"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
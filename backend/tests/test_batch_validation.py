@@ -0,0 +1,95 @@
+import asyncio
+
+from app.models.query import BatchQueryError, QueryResponse
+from app.services import quran_services
+from app.services.result_cache import FakeRedis, RedisBackend, ResultCache
+from benchmarks.fakes import FakeBackends, FakeChatModel, fake_ayahs, fake_vector
+
+
+class TrackingChatModel(FakeChatModel):
+    """Fake model that records the most calls it ever had in flight at once."""
+    in_flight: int = 0
+    peak: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await super()._agenerate(messages, stop, run_manager, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+def _run(monkeypatch, queries, llm, use_cache=False, max_concurrency=5):
+    embedded = []
+
+    async def aextract(hadith_text):
+        if "FAIL" in hadith_text:
+            raise RuntimeError("extraction failed")
+        return ["Narrator A"], "" if "EMPTY" in hadith_text else hadith_text
+
+    async def aget_embeddings(texts):
+        embedded.extend(texts)
+        return [fake_vector(text) for text in texts]
+
+    async def aretrieve_ayahs_batch(texts, vectors):
+        return [fake_ayahs(6) for _ in texts]
+
+    with FakeBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        monkeypatch.setattr(quran_services, "aextract_narrators_chain_with_llm", aextract)
+        monkeypatch.setattr(quran_services, "aget_embeddings", aget_embeddings)
+        monkeypatch.setattr(quran_services, "aretrieve_ayahs_batch", aretrieve_ayahs_batch)
+        responses = asyncio.run(quran_services.avalidate_hadiths(
+            queries, llm=llm, mode="per_ayah", use_cache=use_cache, max_concurrency=max_concurrency))
+    return responses, embedded
+
+
+def test_failed_and_empty_extractions_are_per_item_errors(monkeypatch):
+    queries = ["Hadith one.", "FAIL hadith.", "EMPTY hadith.", "Hadith four."]
+    responses, embedded = _run(monkeypatch, queries, FakeChatModel(latency=0))
+    assert isinstance(responses[0], QueryResponse) and isinstance(responses[3], QueryResponse)
+    assert isinstance(responses[1], BatchQueryError) and "extraction failed" in responses[1].error
+    assert isinstance(responses[2], BatchQueryError)
+    assert embedded == ["Hadith one.", "Hadith four."]
+
+
+def test_llm_calls_share_one_bound(monkeypatch):
+    llm = TrackingChatModel(latency=0.01)
+    queries = [f"Hadith number {i}." for i in range(6)]
+    responses, _ = _run(monkeypatch, queries, llm, max_concurrency=3)
+    assert all(isinstance(r, QueryResponse) for r in responses)
+    assert llm.peak <= 3
+
+
+def test_verdicts_are_read_from_and_written_to_the_cache(monkeypatch):
+    monkeypatch.setattr(quran_services, "result_cache",
+                        ResultCache(RedisBackend(FakeRedis()), fresh_ttl=60, stale_ttl=60))
+    llm = FakeChatModel(latency=0)
+    queries = ["Hadith one.", "Hadith two."]
+    first, _ = _run(monkeypatch, queries, llm, use_cache=True)
+    calls = llm.calls
+    second, embedded = _run(monkeypatch, queries, llm, use_cache=True)
+    assert llm.calls == calls and embedded == []
+    assert [r.results.hadith for r in second] == [r.results.hadith for r in first]
+
+
+def test_stream_replays_a_cached_verdict(monkeypatch):
+    monkeypatch.setattr(quran_services, "result_cache",
+                        ResultCache(RedisBackend(FakeRedis()), fresh_ttl=60, stale_ttl=60))
+    llm = FakeChatModel(latency=0)
+
+    async def collect():
+        return [event async for event in quran_services.astream_validate_hadith(
+            "Hadith one.", llm=llm, mode="per_ayah", use_cache=True)]
+
+    async def aextract(hadith_text):
+        return ["Narrator A"], hadith_text
+
+    with FakeBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        monkeypatch.setattr(quran_services, "aextract_narrators_chain_with_llm", aextract)
+        first = asyncio.run(collect())
+        calls = llm.calls
+        second = asyncio.run(collect())
+    assert llm.calls == calls
+    assert [name for name, _ in second][:2] == ["narrators", "ayahs"]
+    assert second[-1] == first[-1]
@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from app.services.quran_services import avalidate_hadith
+from app.utils.concurrency import map_bounded
+from benchmarks.fakes import FakeBackends, FakeChatModel
+
+
+def test_results_keep_input_order():
+    async def slow_echo(item):
+        await asyncio.sleep(0.01 * (5 - item))
+        return item
+
+    assert asyncio.run(map_bounded(slow_echo, range(5), max_concurrency=5)) == [0, 1, 2, 3, 4]
+
+
+def test_concurrency_is_bounded():
+    running = peak = 0
+
+    async def work(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return item
+
+    asyncio.run(map_bounded(work, range(10), max_concurrency=3))
+    assert peak == 3
+
+
+def test_failure_does_not_cancel_siblings():
+    finished = []
+
+    async def work(item):
+        if item == 0:
+            raise ValueError("bad item")
+        await asyncio.sleep(0.02)
+        finished.append(item)
+        return item
+
+    results = asyncio.run(map_bounded(work, range(4), max_concurrency=4))
+    assert isinstance(results[0], ValueError)
+    assert results[1:] == [1, 2, 3]
+    assert sorted(finished) == [1, 2, 3]
+
+
+def test_per_ayah_pipeline_keeps_retrieval_order():
+    llm = FakeChatModel(latency=0.01)
+    with FakeBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        response = asyncio.run(avalidate_hadith("Actions are judged by intentions.", llm=llm,
+                                                mode="per_ayah", use_cache=False))
+    supported = [ayah.aya_number for ayah in response.results.supported]
+    assert supported == sorted(supported) and len(supported) > 1
+    assert response.results.verdict == "Valid"
+
+
+def test_per_ayah_calls_run_concurrently():
+    llm = FakeChatModel(latency=0.05)
+    with FakeBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        start = time.perf_counter()
+        asyncio.run(avalidate_hadith("Actions are judged by intentions.", llm=llm, mode="per_ayah",
+                                     max_concurrency=15, use_cache=False))
+        elapsed = time.perf_counter() - start
+    # A filter and a classification call per ayah plus the verdict, if run one at a time.
+    assert llm.calls > 3
+    assert elapsed < llm.calls * llm.latency / 2
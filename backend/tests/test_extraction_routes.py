@@ -0,0 +1,63 @@
+import asyncio
+import json
+
+import httpx
+
+from app.main import app
+from app.routes import extraction
+from benchmarks.fakes import install_fake_ner
+
+install_fake_ner(latency=0, per_item=0)
+
+
+async def _post(path, content, content_type="application/x-ndjson"):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(path, content=content, headers={"content-type": content_type})
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_batch_null_language_is_a_per_item_error():
+    body = "\n".join(json.dumps(item) for item in [
+        {"hadith_text": "Narrated Abu Huraira: The Prophet said, \"Be kind.\"", "language": None},
+        {"hadith_text": "Narrated Abu Huraira: The Prophet said, \"Be kind.\""},
+    ])
+    response = asyncio.run(_post("/api/extraction/extract_narrators_batch?extractor=dslim", body))
+    assert response.status_code == 200
+    first, second = _lines(response)
+    assert first["index"] == 0 and "error" in first
+    assert second["index"] == 1 and "narrators_chain" in second
+
+
+class FailingStore:
+    """Results store whose reads fail after `good` records."""
+
+    def __init__(self, good):
+        self.good = good
+
+    def iter(self, source, offset=0, limit=None):
+        for i in range(self.good):
+            yield {"hadith_text": f"record {i}"}
+        raise OSError("database disk image is malformed")
+
+
+async def _get(path):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path)
+
+
+def test_store_failure_before_streaming_is_an_error_body(monkeypatch):
+    monkeypatch.setattr(extraction, "get_results_store", lambda: FailingStore(0))
+    response = asyncio.run(_get("/api/extraction/all_narrators_from_ner"))
+    assert "Results store read error" in response.json()["error"]
+
+
+def test_store_failure_while_streaming_ends_the_array_with_an_error(monkeypatch):
+    monkeypatch.setattr(extraction, "get_results_store", lambda: FailingStore(2))
+    records = asyncio.run(_get("/api/extraction/all_narrators_from_llm")).json()
+    assert [r.get("hadith_text") for r in records[:2]] == ["record 0", "record 1"]
+    assert "Results store read error" in records[2]["error"]
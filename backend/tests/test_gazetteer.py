@@ -0,0 +1,31 @@
+from app.utils.narrator_gazetteer import Narrator, NarratorGazetteer, get_gazetteer, name_key
+
+
+def test_spelling_variants_share_a_key():
+    assert name_key("'Abdullah bin 'Umar") == name_key("Abd Allah ibn Umar")
+    assert name_key("Abu Hurayrah") == name_key("abu hurayra")
+
+
+def test_exact_and_fuzzy_matches():
+    gazetteer = get_gazetteer()
+    assert gazetteer.resolve("Ibn Umar").narrator.id == "ibn_umar"
+    fuzzy = gazetteer.resolve("Abu Hureira")
+    assert fuzzy.narrator.id == "abu_hurayrah" and fuzzy.distance == 1 and not fuzzy.ambiguous
+
+
+def test_ibn_amr_is_not_ibn_umar():
+    gazetteer = get_gazetteer()
+    assert gazetteer.resolve("Abdullah ibn Amr") is None
+    assert gazetteer.resolve("عبد الله بن عمرو") is None
+
+
+def test_fuzzy_match_between_two_narrators_is_rejected():
+    gazetteer = NarratorGazetteer([
+        Narrator("a", "Sulayman ibn Harbin", ""),
+        Narrator("b", "Sulayman ibn Harbun", ""),
+    ])
+    assert gazetteer.resolve("Sulayman ibn Harbin").narrator.id == "a"
+    # One edit from either.
+    assert gazetteer.resolve("Sulayman ibn Harbon") is None
+    # One edit from "a" but only two from "b": still too close to call.
+    assert gazetteer.resolve("Sulayman ibn Harbint") is None
@@ -0,0 +1,56 @@
+import asyncio
+
+from app.config import ISNAD_MIN_CONFIDENCE
+from app.rag import isnad_cascade
+from app.rag.isnad_cascade import _gazetteer_tier, aextract_chain, extract_chain
+from app.rag.isnad_parser import parse_isnad
+from benchmarks.fakes import install_fake_ner
+
+install_fake_ner(latency=0, per_item=0)
+
+
+def test_chain_of_known_narrators_is_served_by_the_gazetteer():
+    result = extract_chain("narrated to us muhammad bin bashshar, from ghundar, from shu'bah, "
+                           "that the prophet said: actions are judged by intentions.")
+    assert result.tier == "gazetteer" and result.confidence == 1.0
+    assert result.narrators == ["muhammad bin bashshar", "ghundar", "shu'bah"]
+
+
+def test_unknown_narrator_is_kept_and_the_chain_not_accepted():
+    parsed = parse_isnad("narrated to us muhammad bin bashshar, from ghundar, from qays ibn abi hazim, "
+                         "from shu'bah, that the prophet said: actions are judged by intentions.")
+    narrators, confidence = _gazetteer_tier(parsed)
+    assert narrators == ["muhammad bin bashshar", "ghundar", "qays ibn abi hazim", "shu'bah"]
+    assert confidence < ISNAD_MIN_CONFIDENCE
+    # Known names are raised so that the NER tier only re-extracts the unknown one.
+    assert [s.confidence >= ISNAD_MIN_CONFIDENCE for s in parsed.spans] == [True, True, False, True]
+
+
+def test_uncertain_span_goes_on_to_ner():
+    result = extract_chain("Yahya related to me from Malik from Ibn Shihab from Urwa that Aisha said: "
+                           "The Messenger of Allah prayed in his house.")
+    assert result.tier == "ner"
+    assert result.narrators == ["Yahya", "Malik", "Ibn Shihab", "Urwa", "Aisha"]
+
+
+def test_ner_is_skipped_when_only_the_llm_can_supply_the_matn(monkeypatch):
+    calls = []
+
+    def ner_tier(parsed, text):
+        calls.append("ner")
+        return parsed.narrators, 1.0
+
+    def llm(text):
+        calls.append("llm")
+        return ["Abu Hurairah"], "faith has sixty branches"
+
+    async def allm(text):
+        return llm(text)
+
+    monkeypatch.setattr(isnad_cascade, "_ner_tier", ner_tier)
+    text = "Narrated Abu Hurairah from the Prophet who said that faith has sixty branches"
+    assert extract_chain(text, llm=llm).tier == "llm"
+    assert asyncio.run(aextract_chain(text, llm=allm)).tier == "llm"
+    assert calls == ["llm", "llm"]
+    # Without an LLM, NER is still the last resort.
+    assert extract_chain(text).tier == "ner" and calls[-1] == "ner"
@@ -0,0 +1,67 @@
+from app.config import ISNAD_MIN_CONFIDENCE
+from app.rag.isnad_parser import parse_isnad, span_confidence
+
+BUKHARI_1 = (
+    "حَدَّثَنَا الْحُمَيْدِيُّ عَبْدُ اللَّهِ بْنُ الزُّبَيْرِ، قَالَ حَدَّثَنَا سُفْيَانُ، قَالَ حَدَّثَنَا يَحْيَى بْنُ سَعِيدٍ "
+    "الأَنْصَارِيُّ، عَنْ عَلْقَمَةَ بْنِ وَقَّاصٍ اللَّيْثِيِّ، عَنْ عُمَرَ بْنِ الْخَطَّابِ، قَالَ سَمِعْتُ رَسُولَ اللَّهِ "
+    "صلى الله عليه وسلم يَقُولُ إِنَّمَا الأَعْمَالُ بِالنِّيَّاتِ"
+)
+BUKHARI_1_BARE = (
+    "حدثنا الحميدي عبد الله بن الزبير، قال حدثنا سفيان، قال حدثنا يحيى بن سعيد الأنصاري، عن علقمة بن وقاص "
+    "الليثي، عن عمر بن الخطاب، قال سمعت رسول الله صلى الله عليه وسلم يقول إنما الأعمال بالنيات"
+)
+
+
+def test_english_chain_and_matn():
+    parsed = parse_isnad("Narrated to us Muhammad bin Bashshar, from Ghundar, from Shu'bah, "
+                         "that the Prophet said: Actions are judged by intentions.")
+    assert parsed.narrators == ["Muhammad bin Bashshar", "Ghundar", "Shu'bah"]
+    assert parsed.matn == "Actions are judged by intentions"
+    assert parsed.confidence == 1.0
+
+
+def test_related_to_me_is_a_connector_and_leftover_phrases_lower_confidence():
+    parsed = parse_isnad("Yahya related to me from Malik from Ibn Shihab from Urwa that Aisha said: "
+                         "The Messenger of Allah prayed in his house.")
+    assert parsed.narrators[:3] == ["Yahya", "Malik", "Ibn Shihab"]
+    # "Urwa that Aisha" is two narrators joined by a phrase the parser does not split on.
+    assert parsed.spans[3].confidence < ISNAD_MIN_CONFIDENCE
+    assert parsed.confidence < ISNAD_MIN_CONFIDENCE
+    assert parsed.matn.startswith("The Messenger of Allah prayed")
+
+
+def test_arabic_chain_parses_alike_with_and_without_harakat():
+    vocalised, bare = parse_isnad(BUKHARI_1), parse_isnad(BUKHARI_1_BARE)
+    assert vocalised.language == bare.language == "arabic"
+    assert bare.narrators == ["الحميدي عبد الله بن الزبير", "سفيان", "يحيى بن سعيد الأنصاري",
+                              "علقمة بن وقاص الليثي", "عمر بن الخطاب"]
+    assert len(vocalised.narrators) == 5 and vocalised.narrators[-1] == "عُمَرَ بْنِ الْخَطَّابِ"
+    assert bare.matn == "إنما الأعمال بالنيات" and vocalised.matn == "إِنَّمَا الأَعْمَالُ بِالنِّيَّاتِ"
+    assert vocalised.confidence == bare.confidence == 1.0
+    assert BUKHARI_1_BARE[bare.matn_start:].startswith("سمعت رسول الله")
+
+
+def test_arabic_span_with_leftover_phrase_is_low_confidence():
+    parsed = parse_isnad("حدثنا قتيبة عن مالك أنه بلغه أن رسول الله قال الدين النصيحة")
+    assert parsed.narrators == ["قتيبة", "مالك أنه بلغه"]
+    assert parsed.confidence < ISNAD_MIN_CONFIDENCE
+
+
+def test_missing_matn_boundary_lowers_confidence():
+    parsed = parse_isnad("Narrated Abu Hurairah from the Prophet who said that faith has sixty branches")
+    assert parsed.matn_start is None and parsed.matn == ""
+    assert parsed.matn_confidence == 0.5
+    assert parsed.confidence < ISNAD_MIN_CONFIDENCE
+
+
+def test_text_without_a_chain_has_no_confidence():
+    parsed = parse_isnad("Actions are judged by intentions.")
+    assert parsed.confidence == 0.0
+
+
+def test_span_confidence_penalises_function_words():
+    assert span_confidence("Ibn Shihab", "english") == 1.0
+    assert span_confidence("Yahya related to me", "english") < ISNAD_MIN_CONFIDENCE
+    assert span_confidence("ghundar", "english") < ISNAD_MIN_CONFIDENCE
+    assert span_confidence("عمر بن الخطاب", "arabic") == 1.0
+    assert span_confidence("مالك أنه بلغه", "arabic") < ISNAD_MIN_CONFIDENCE
@@ -0,0 +1,49 @@
+import asyncio
+import sqlite3
+
+from app.rag.judgement_cache import JudgementCache
+from benchmarks.fakes import fake_ayahs
+
+
+def test_round_trip(tmp_path):
+    cache = JudgementCache(str(tmp_path / "judgements.db"), max_entries=100)
+    ayahs = fake_ayahs(3)
+
+    async def scenario():
+        await cache.aput_many("score", "Hadith text", [(ayahs[0], 8), (ayahs[2], 3)], "v1", "model")
+        return (await cache.aget_many("score", "hadith  TEXT", ayahs, "v1", "model"),
+                await cache.aget_many("score", "Hadith text", ayahs, "v2", "model"))
+
+    same, other_version = asyncio.run(scenario())
+    assert same == {0: 8, 2: 3}
+    assert other_version == {}
+
+
+def test_locked_database_does_not_block_the_event_loop(tmp_path):
+    path = str(tmp_path / "judgements.db")
+    cache = JudgementCache(path, max_entries=100)
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN EXCLUSIVE")
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        ticking = asyncio.ensure_future(ticker())
+        put = asyncio.ensure_future(cache.aput_many("score", "Hadith", [(fake_ayahs(1)[0], 9)], "v1", "model"))
+        await asyncio.sleep(0.3)
+        assert not put.done()
+        writer.execute("ROLLBACK")
+        await put
+        ticking.cancel()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        writer.close()
+    assert ticks >= 10
+    assert asyncio.run(cache.aget_many("score", "Hadith", fake_ayahs(1), "v1", "model")) == {0: 9}
@@ -0,0 +1,163 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.main import app
+from app.routes import quran
+from app.utils import llm_scheduler
+from app.services.quran_services import avalidate_hadith
+from app.utils.llm_scheduler import (
+    CircuitBreaker, CircuitOpenError, LLMUnavailableError, llm_priority, scheduled, scheduler,
+)
+from benchmarks.fakes import FakeBackends, FakeChatModel
+from benchmarks.rate_limit import PROMPT, FakeOpenAIServer, fake_llm, sized_limiter
+
+INPUT = {"hadith": "Actions are judged by intentions."}
+
+
+def _setup(model, server, limit=100, window=1.0, threshold=100, reset=0.2, max_retries=4):
+    """A real `scheduled(llm)` chain against `server`, through the shared scheduler's limiter for `model`."""
+    limiter = sized_limiter(model, limit, window)
+    limiter.backoff_base, limiter.backoff_max = 0.01, 0.05
+    limiter.max_retries = max_retries
+    limiter.breaker = CircuitBreaker(threshold, reset)
+    return PROMPT | scheduled(fake_llm(server, model)), limiter
+
+
+def test_429s_are_retried_after_backoff():
+    server = FakeOpenAIServer(limit=2, window=0.2)
+    chain, limiter = _setup("backoff", server, limit=20)
+
+    async def scenario():
+        return await asyncio.gather(*(chain.ainvoke(INPUT) for _ in range(6)))
+
+    assert len(asyncio.run(scenario())) == 6
+    assert server.counts["429"] > 0 and server.counts["200"] == 6
+    assert limiter.stats()["retries"] == server.counts["429"]
+    assert limiter.breaker.state == "closed"
+
+
+def test_circuit_opens_then_half_opens_and_closes():
+    server = FakeOpenAIServer(limit=100, window=1.0, outage=0.3)
+    chain, limiter = _setup("breaker", server, threshold=2, reset=0.3, max_retries=1)
+
+    async def scenario():
+        with pytest.raises(LLMUnavailableError):
+            await chain.ainvoke(INPUT)
+        assert limiter.breaker.state == "open" and server.counts["503"] == 2
+        with pytest.raises(CircuitOpenError):
+            await chain.ainvoke(INPUT)
+        assert server.counts["503"] == 2
+        await asyncio.sleep(0.35)
+        # The outage is over: the half-open probe succeeds and closes the circuit.
+        await chain.ainvoke(INPUT)
+
+    asyncio.run(scenario())
+    assert limiter.breaker.state == "closed"
+    assert limiter.stats()["rejections"] == 1
+
+
+def test_cancelled_probe_reopens_the_circuit():
+    server = FakeOpenAIServer(limit=100, window=1.0, latency=1.0)
+    chain, limiter = _setup("probe", server, threshold=1, reset=0.1)
+    limiter.breaker.record_failure()
+
+    async def scenario():
+        await asyncio.sleep(0.1)
+        probe = asyncio.ensure_future(chain.ainvoke(INPUT))
+        await asyncio.sleep(0.05)
+        assert limiter.breaker.state == "half_open"
+        probe.cancel()
+        await asyncio.gather(probe, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert limiter.breaker.state == "open"
+
+
+def test_stuck_probe_is_replaced_after_the_reset_timeout():
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == "half_open"
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+
+
+def test_timeout_applies_per_attempt():
+    server = FakeOpenAIServer(limit=100, window=1.0, latency=0.3)
+    chain, limiter = _setup("slow", server, max_retries=2)
+    limiter.call_timeout = 0.05
+
+    start = time.perf_counter()
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(chain.ainvoke(INPUT))
+    # Three attempts, each abandoned after 0.05 s rather than waiting out the server's latency.
+    assert time.perf_counter() - start < 0.6
+    assert limiter.stats()["calls"] == 3
+
+
+def test_timeout_applies_with_the_scheduler_disabled(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_SCHEDULER_ENABLED", False)
+    monkeypatch.setattr(llm_scheduler, "LLM_CALL_TIMEOUT", 0.05)
+    chain = PROMPT | scheduled(FakeChatModel(latency=0.3))
+
+    start = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(chain.ainvoke(INPUT))
+    assert time.perf_counter() - start < 0.2
+
+def test_bulk_calls_leave_the_reserve_to_interactive_ones():
+    server = FakeOpenAIServer(limit=100, window=1.0)
+    # Ten requests a minute, half of which bulk traffic may not take.
+    chain, limiter = _setup("reserve", server, limit=10, window=60.0)
+    limiter.bulk_reserve = 0.5
+
+    async def bulk_call():
+        with llm_priority("bulk"):
+            return await chain.ainvoke(INPUT)
+
+    async def scenario():
+        await asyncio.gather(*(bulk_call() for _ in range(5)))
+        waiting = asyncio.ensure_future(bulk_call())
+        await asyncio.wait_for(chain.ainvoke(INPUT), 1.0)
+        assert not waiting.done()
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert server.counts["200"] == 6
+
+
+class DownChatModel(FakeChatModel):
+    """A provider that cannot be reached."""
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        raise ConnectionError("provider down")
+
+
+def test_unavailable_provider_fails_the_validation_instead_of_degrading_it():
+    limiter = scheduler.limiter("other", "DownChatModel")
+    limiter.backoff_base, limiter.backoff_max, limiter.max_retries = 0.001, 0.001, 1
+    with FakeBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(avalidate_hadith("Actions are judged by intentions.", llm=DownChatModel(latency=0),
+                                         mode="per_ayah", use_cache=False))
+
+
+def test_unavailable_provider_is_a_503(monkeypatch):
+    async def down(query):
+        raise CircuitOpenError("Circuit for openai:gpt-4o-mini is open after repeated failures")
+
+    monkeypatch.setattr(quran, "avalidate_hadith", down)
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/quran/search", json={"query": "Actions are judged by intentions."})
+
+    response = asyncio.run(post())
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+from app.rag.micro_batcher import MicroBatcher
+
+
+class Recorder:
+    """`run_batch` that upper-cases its inputs, records each batch and fails any batch holding "bad"."""
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, items):
+        with self.lock:
+            self.batches.append(list(items))
+        if "bad" in items:
+            raise ValueError("cannot run 'bad'")
+        return [item.upper() for item in items]
+
+
+def test_inputs_within_the_window_share_a_batch():
+    run = Recorder()
+    batcher = MicroBatcher("window", run, window=0.2, max_size=32)
+    results = {}
+
+    def caller(name):
+        results[name] = batcher.map([f"{name}-1", f"{name}-2"])
+
+    threads = [threading.Thread(target=caller, args=(name,)) for name in ("a", "b", "c")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(run.batches) == 1 and len(run.batches[0]) == 6
+    assert results == {name: [f"{name.upper()}-1", f"{name.upper()}-2"] for name in ("a", "b", "c")}
+
+
+def test_batches_are_cut_at_max_size_in_submission_order():
+    run = Recorder()
+    batcher = MicroBatcher("size", run, window=0.2, max_size=3)
+    items = [f"item{i}" for i in range(7)]
+    assert batcher.map(items) == [item.upper() for item in items]
+    assert run.batches == [items[0:3], items[3:6], items[6:]]
+    assert batcher.stats()["max_batch"] == 3
+
+
+def test_failed_batch_only_fails_the_bad_input():
+    run = Recorder()
+    batcher = MicroBatcher("failure", run, window=0.2, max_size=32)
+    futures = [batcher.submit(item) for item in ("first", "bad", "last")]
+    assert futures[0].result() == "FIRST" and futures[2].result() == "LAST"
+    with pytest.raises(ValueError):
+        futures[1].result()
+    assert run.batches[0] == ["first", "bad", "last"]
+    assert batcher.stats()["failed_batches"] == 1
+
+
+def test_without_a_window_each_call_runs_directly():
+    run = Recorder()
+    batcher = MicroBatcher("direct", run, window=0, max_size=32)
+    assert batcher.map(["x", "y"]) == ["X", "Y"]
+    assert run.batches == [["x", "y"]]
@@ -0,0 +1,34 @@
+from app.models.query import AyahResult
+from app.rag.prefilter import largest_gap_cutoff, prefilter_ayahs
+
+
+def _ayah(number, score):
+    return AyahResult(score=score, english_translation=f"Ayah {number}", surah_name_english="Al-Baqarah",
+                      aya_number=number, arabic_diacritics="")
+
+
+def test_largest_gap_cutoff():
+    assert largest_gap_cutoff([0.9, 0.88, 0.5, 0.48], min_keep=1, max_keep=10) == 2
+    assert largest_gap_cutoff([0.9, 0.88, 0.5, 0.48], min_keep=3, max_keep=10) == 3
+    assert largest_gap_cutoff([0.9, 0.9, 0.9], min_keep=1, max_keep=10) == 3
+
+
+def test_largest_gap_cutoff_without_a_minimum_does_not_wrap():
+    # With min_keep=0 the first "gap" used to be scores[-1] - scores[0].
+    assert largest_gap_cutoff([0.2, 0.19, 0.9], min_keep=0, max_keep=10) == 1
+    assert largest_gap_cutoff([0.9, 0.2], min_keep=0, max_keep=10) == 1
+
+
+def test_cutoff_keeps_fused_order_without_a_reranker():
+    # Hybrid retrieval's RRF order, which is not the order of the vector similarity scores.
+    fused = [_ayah(1, 0.70), _ayah(2, 0.90), _ayah(3, 0.60), _ayah(4, 0.95)]
+    kept = prefilter_ayahs(fused, "hadith", min_score=0, adaptive=False, max_candidates=2)
+    assert [ayah.aya_number for ayah in kept] == [1, 2]
+
+
+def test_adaptive_cutoff_without_a_reranker_gaps_on_sorted_scores():
+    # The fused order's scores are not monotonic; the gap is still found on the sorted scores
+    # (0.95, 0.90 | 0.50, 0.45) and the survivors keep their fused order.
+    fused = [_ayah(1, 0.50), _ayah(2, 0.90), _ayah(3, 0.45), _ayah(4, 0.95)]
+    kept = prefilter_ayahs(fused, "hadith", min_score=0, adaptive=True, max_candidates=10, min_candidates=1)
+    assert [ayah.aya_number for ayah in kept] == [2, 4]
@@ -0,0 +1,33 @@
+from app.rag import prompt_budget
+from app.rag.ayah_filter import prompt as filter_prompt
+from app.rag.judgement_cache import prompt_version
+from app.services.quran_services import pipeline_fingerprint
+
+
+class OfflineTiktoken:
+    """tiktoken without network access: loading any encoding fails like a failed BPE download."""
+
+    def encoding_for_model(self, model):
+        raise ConnectionError("Failed to resolve 'openaipublic.blob.core.windows.net'")
+
+    get_encoding = encoding_for_model
+
+
+def test_token_counts_fall_back_to_estimate_offline(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "tiktoken", OfflineTiktoken())
+    prompt_budget._encoding.cache_clear()
+    try:
+        text = "word " * 400
+        assert prompt_budget.count_tokens(text) == prompt_budget.estimate_tokens(text)
+        assert prompt_budget.truncate_tokens(text, 50).endswith("…")
+    finally:
+        prompt_budget._encoding.cache_clear()
+
+
+def test_compaction_settings_change_cache_keys(monkeypatch):
+    version, fingerprint = prompt_version(filter_prompt), pipeline_fingerprint("per_ayah")
+    monkeypatch.setattr(prompt_budget, "PROMPT_HADITH_MAX_TOKENS", prompt_budget.PROMPT_HADITH_MAX_TOKENS + 1)
+    assert prompt_version(filter_prompt) != version
+    assert pipeline_fingerprint("per_ayah") != fingerprint
+    monkeypatch.setattr(prompt_budget, "PROMPT_ARABIC", "none")
+    assert pipeline_fingerprint("per_ayah") != fingerprint
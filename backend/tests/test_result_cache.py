@@ -0,0 +1,120 @@
+import asyncio
+
+from app.services import quran_services
+from app.services import result_cache as result_cache_module
+from app.services.result_cache import FakeRedis, RedisBackend, ResultCache
+from benchmarks.fakes import FakeBackends, FakeChatModel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def _cache(fresh_ttl=60, stale_ttl=60):
+    return ResultCache(RedisBackend(FakeRedis()), fresh_ttl=fresh_ttl, stale_ttl=stale_ttl)
+
+
+def test_fake_redis_expires_entries(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache_module, "time", clock)
+    backend = RedisBackend(FakeRedis())
+
+    async def scenario():
+        await backend.set("key", "value", ttl=10)
+        assert await backend.get("key") == "value"
+        clock.now += 11
+        assert await backend.get("key") is None
+
+    asyncio.run(scenario())
+
+
+def test_hits_and_single_flight():
+    cache = _cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"verdict": "Valid"}
+
+    async def scenario():
+        first = await asyncio.gather(*(cache.get_or_compute("verdict", "k", compute) for _ in range(5)))
+        second = await cache.get_or_compute("verdict", "k", compute)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert first == [{"verdict": "Valid"}] * 5 and second == {"verdict": "Valid"}
+    assert cache.stats()["verdict"]["coalesced"] == 4
+    assert cache.stats()["verdict"]["hits"] == 1
+
+
+def test_stale_entry_is_served_while_refreshing(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(result_cache_module, "time", clock)
+    cache = _cache(fresh_ttl=10, stale_ttl=100)
+    values = iter(["old", "new"])
+
+    async def compute():
+        return next(values)
+
+    async def scenario():
+        assert await cache.get_or_compute("verdict", "k", compute) == "old"
+        clock.now += 20
+        assert await cache.get_or_compute("verdict", "k", compute) == "old"
+        await asyncio.sleep(0)
+        return await cache.get_or_compute("verdict", "k", compute)
+
+    assert asyncio.run(scenario()) == "new"
+    assert cache.stats()["verdict"]["refreshes"] == 1
+
+
+def test_uncacheable_values_are_recomputed():
+    cache = _cache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return ""
+
+    async def scenario():
+        for _ in range(2):
+            await cache.get_or_compute("verdict", "k", compute, cacheable=bool)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+class BrokenClassifier(FakeChatModel):
+    """Answers every prompt except the per-ayah classification one, which gets unparseable text."""
+
+    def _result(self, text, tokens):
+        if "specific Quranic ayah" in text:
+            text = "no classification here"
+        return super()._result(text, tokens)
+
+
+def test_degraded_verdicts_are_recomputed_and_clean_ones_served_from_cache(monkeypatch):
+    broken = BrokenClassifier(latency=0)
+    monkeypatch.setattr(quran_services, "result_cache", _cache())
+    good = FakeChatModel(latency=0)
+
+    async def run_twice(llm):
+        calls = []
+        for _ in range(2):
+            response = await quran_services.avalidate_hadith(
+                "Actions are judged by intentions.", llm=llm, mode="per_ayah", use_cache=True)
+            calls.append(llm.calls)
+        return response, calls
+
+    with FakeBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        degraded, degraded_calls = asyncio.run(run_twice(broken))
+        monkeypatch.setattr(quran_services, "result_cache", _cache())
+        clean, clean_calls = asyncio.run(run_twice(good))
+
+    assert degraded.results.degraded and degraded_calls[1] > degraded_calls[0]
+    assert not clean.results.degraded and clean_calls[1] == clean_calls[0]
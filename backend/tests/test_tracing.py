@@ -0,0 +1,45 @@
+import asyncio
+
+from app.services.quran_services import avalidate_hadith
+from app.utils.tracing import span, span_exporter
+from benchmarks.fakes import FakeBackends, FakeChatModel
+
+
+def _validate(llm):
+    span_exporter.clear()
+    with FakeBackends(extraction_latency=0, embedding_latency=0, search_latency=0).patched():
+        asyncio.run(avalidate_hadith("Actions are judged by intentions.", llm=llm, mode="per_ayah", use_cache=False))
+    return {s.name: s for s in span_exporter.get_finished_spans()}
+
+
+def test_stages_nest_under_the_request_span():
+    spans = _validate(FakeChatModel(latency=0))
+    root = spans["validate"]
+    assert root.parent is None
+    for stage in ("isnad", "prefilter", "filter", "classify", "verdict"):
+        assert spans[stage].parent.span_id == root.context.span_id
+        assert spans[stage].context.trace_id == root.context.trace_id
+
+
+def test_llm_tokens_are_attributed_to_the_calling_stage():
+    # An injected model, not one built by the client registry with the metrics callback.
+    llm = FakeChatModel(latency=0)
+    spans = _validate(llm)
+    stages = [spans[stage].attributes for stage in ("filter", "classify", "verdict")]
+    assert sum(attributes["llm_calls"] for attributes in stages) == llm.calls
+    assert sum(attributes["tokens_in"] for attributes in stages) == llm.input_tokens
+    assert spans["verdict"].attributes["llm_calls"] == 1
+    assert "llm_calls" not in spans["validate"].attributes
+
+
+def test_span_records_errors_and_restores_the_parent():
+    span_exporter.clear()
+    try:
+        with span("outer"):
+            with span("inner", size=3):
+                raise ValueError("boom")
+    except ValueError:
+        pass
+    spans = {s.name: s for s in span_exporter.get_finished_spans()}
+    assert spans["inner"].parent.span_id == spans["outer"].context.span_id
+    assert spans["inner"].attributes["size"] == 3